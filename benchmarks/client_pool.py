@@ -0,0 +1,68 @@
+"""First-request latency with a client per session vs the shared client pool.
+
+A local OpenAI compatible server streams a short chat completion; every new connection
+waits `HANDSHAKE` seconds first, standing in for the TCP + TLS handshake to a remote
+endpoint. A session runs `TURNS` agent turns. With a client per session (as before),
+the first turn of every session pays for the handshake. With the shared pool, only the
+first session does, or none of them after `prewarm`.
+
+    python benchmarks/client_pool.py
+"""
+import asyncio
+import time
+
+from pydantic_ai import Agent
+
+from voice_agent_flow.llms import ClientPool
+
+from fakes import FakeOpenAIServer
+
+HANDSHAKE = 0.05
+TURNS = 3
+SESSIONS = 20
+
+
+async def session(pool: ClientPool, base_url: str) -> float:
+    """Seconds to the first text of the session's first turn."""
+    agent = Agent(pool.openai_compatible("fake", base_url))
+    first = None
+    for _ in range(TURNS):
+        start = time.perf_counter()
+        async with agent.run_stream("你好") as result:
+            async for _ in result.stream_text(delta=True):
+                if first is None:
+                    first = time.perf_counter() - start
+    return first
+
+
+async def main():
+    server = FakeOpenAIServer(handshake=HANDSHAKE)
+    base_url = await server.start()
+
+    firsts = []
+    for _ in range(SESSIONS):
+        pool = ClientPool()
+        firsts.append(await session(pool, base_url))
+        await pool.aclose()
+    print(f"client per session: first turn {sum(firsts) / SESSIONS * 1e3:5.1f} ms on average")
+
+    for prewarm in (False, True):
+        pool = ClientPool()
+        pool.openai_compatible("fake", base_url)
+        if prewarm:
+            await pool.prewarm(connections=4)
+        firsts = [await session(pool, base_url) for _ in range(SESSIONS)]
+        label = "shared pool, prewarmed" if prewarm else "shared pool"
+        print(f"{label:>22}: first turn {sum(firsts) / SESSIONS * 1e3:5.1f} ms on average")
+
+    # concurrent sessions share the keep-alive connections
+    await asyncio.gather(*(session(pool, base_url) for _ in range(SESSIONS)))
+    for stats in pool.stats().values():
+        print(f"after {SESSIONS} concurrent sessions: {stats}")
+    await pool.aclose()
+
+    await server.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
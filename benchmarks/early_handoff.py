@@ -0,0 +1,50 @@
+"""How much earlier `HandoffPending` arrives than `AgentHandoff`.
+
+A fake model streams the structured output `{"name_confirmed": ..., "reason": "..."}`
+four characters at a time, one chunk every 15 ms. `transfer()` is only called once every
+field has a finished value, so the lead is the time from the end of the last value to
+the end of the run: a few ms.
+
+    python benchmarks/early_handoff.py
+"""
+import asyncio
+import time
+
+from pydantic import BaseModel
+from pydantic_ai import Agent
+
+from voice_agent_flow.agents import SingleAgentRunner
+from voice_agent_flow.agents.events import EventType
+
+from fakes import handoff_model
+
+ARGS = '{"name_confirmed": true, "reason": "客户确认了姓名，并且同意继续回答关于贷款用途和收入情况的问题"}'
+
+
+class NameConfirmed(BaseModel):
+    name_confirmed: bool
+    reason: str = ""
+
+    def transfer(self):
+        return "financial_support_inquiry" if self.name_confirmed else "hangup"
+
+
+async def main(runs: int = 5):
+    leads = []
+    for _ in range(runs):
+        model = handoff_model(ARGS, first_token_delay=0.2, chunk=4, chunk_delay=0.015)
+        runner = SingleAgentRunner(Agent(model, output_type=NameConfirmed | str, name="customer_name_inquiry"))
+        start = time.perf_counter()
+        pending = handoff = None
+        async for result in runner.run(prompt="是的，我是"):
+            if result.event_type == EventType.HandoffPending:
+                pending = time.perf_counter() - start
+            elif result.event_type == EventType.AgentHandoff:
+                handoff = time.perf_counter() - start
+        leads.append(handoff - pending)
+    print(f"HandoffPending after {pending * 1e3:.0f} ms, AgentHandoff after {handoff * 1e3:.0f} ms")
+    print(f"lead: {min(leads) * 1e3:.0f}-{max(leads) * 1e3:.0f} ms over {runs} runs")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
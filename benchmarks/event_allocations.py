@@ -0,0 +1,74 @@
+"""Objects built per streamed chunk by `SingleAgentRunner`.
+
+Compares the default runner with one that skips empty deltas and is subscribed to text
+events only, and the size of one text event (`AgentResult` + `AgentTextStream`) with the
+previous, non-slotted dataclasses.
+
+    python benchmarks/event_allocations.py
+"""
+import asyncio
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from pydantic_ai import Agent
+
+from voice_agent_flow.agents import SingleAgentRunner
+from voice_agent_flow.agents.events import AgentResult, AgentTextStream, EventType
+
+from fakes import text_model
+
+
+@dataclass
+class LegacyTextStream:
+    status: Optional[str] = None
+    delta: str = ''
+    offset: int = 0
+
+
+@dataclass
+class LegacyResult:
+    event: object = None
+    event_type: str = ''
+    finish_reason: str = ''
+    last_agent_name: str = ''
+
+
+def deep_size(obj) -> int:
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+async def run(runner: SingleAgentRunner) -> tuple[int, float]:
+    emitted = 0
+    start = time.perf_counter()
+    async for _ in runner.run(prompt="hi"):
+        emitted += 1
+    return emitted, time.perf_counter() - start
+
+
+async def main(chunks: int = 20000):
+    # every other chunk is empty, as with providers that stream keep-alive or role-only chunks
+    stream = ["字" if i % 2 else "" for i in range(chunks)]
+
+    default = SingleAgentRunner(Agent(text_model(stream), output_type=str))
+    lean = SingleAgentRunner(
+        Agent(text_model(stream), output_type=str),
+        skip_empty_deltas=True,
+        event_types={EventType.AgentTextStream},
+    )
+    for name, runner in (("default", default), ("skip empty, text only", lean)):
+        emitted, elapsed = await run(runner)
+        print(f"{name:>22}: {emitted} results for {chunks} chunks in {elapsed * 1e3:.0f} ms")
+
+    slotted = AgentResult(event=AgentTextStream(delta="字"), event_type=EventType.AgentTextStream)
+    legacy = LegacyResult(event=LegacyTextStream(delta="字"), event_type=EventType.AgentTextStream)
+    print(f"one text event: slotted {deep_size(slotted) + deep_size(slotted.event)} B, "
+          f"dict-backed {deep_size(legacy) + deep_size(legacy.event)} B")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
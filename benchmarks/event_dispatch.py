@@ -0,0 +1,98 @@
+"""Events per second through `SingleAgentRunner.run` with a fake streaming model.
+
+Also times the dispatch of single events against the previous design, a list of
+lambda predicates checked in order with every handler awaited, both calling the
+runner's handlers: a text delta (third predicate), a tool argument delta (no handler,
+every predicate fails) and a final result (sixth predicate).
+
+    python benchmarks/event_dispatch.py
+"""
+import asyncio
+import inspect
+import time
+
+from pydantic import BaseModel
+from pydantic_ai import (
+    Agent,
+    AgentRunResultEvent,
+    FinalResultEvent,
+    FunctionToolCallEvent,
+    FunctionToolResultEvent,
+    PartDeltaEvent,
+    PartStartEvent,
+    TextPart,
+    TextPartDelta,
+    ToolCallPart,
+    ToolCallPartDelta,
+)
+
+from voice_agent_flow.agents import SingleAgentRunner
+
+from fakes import text_model
+
+
+async def run_throughput(tokens: int = 20000):
+    agent = Agent(text_model(["字"] * tokens), output_type=str)
+    runner = SingleAgentRunner(agent)
+    start = time.perf_counter()
+    count = 0
+    async for _ in runner.run(prompt="hi"):
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f"run(): {count} events in {elapsed * 1e3:.0f} ms -> {count / elapsed:,.0f} events/s")
+
+
+def legacy_chain(runner: SingleAgentRunner) -> list:
+    """The previous design: predicates checked in order, every handler awaited."""
+    def awaited(handler):
+        async def call(event):
+            return handler(event)
+        return handler if inspect.iscoroutinefunction(handler) else call
+
+    return [
+        (lambda e: isinstance(e, PartStartEvent) and isinstance(e.part, ToolCallPart), awaited(runner.on_tool_arg_start)),
+        (lambda e: isinstance(e, PartStartEvent) and isinstance(e.part, (TextPart, TextPartDelta)), awaited(runner.on_text_start)),
+        (lambda e: isinstance(e, PartDeltaEvent) and isinstance(e.delta, TextPartDelta), awaited(runner.on_text_delta)),
+        (lambda e: isinstance(e, FunctionToolCallEvent), awaited(runner.on_tool_call_args)),
+        (lambda e: isinstance(e, FunctionToolResultEvent), awaited(runner.on_tool_result)),
+        (lambda e: isinstance(e, FinalResultEvent), awaited(runner.on_final_result)),
+        (lambda e: isinstance(e, AgentRunResultEvent) and isinstance(e.result.output, BaseModel), awaited(runner.on_agent_run_result)),
+    ]
+
+
+async def dispatch_only(iterations: int = 100000):
+    """Per-event cost of the table against the predicate chain, with the same handlers."""
+    runner = SingleAgentRunner(Agent(text_model([]), output_type=str))
+    chain = legacy_chain(runner)
+    events = {
+        "text delta": PartDeltaEvent(index=0, delta=TextPartDelta(content_delta="字")),
+        "tool args delta": PartDeltaEvent(index=0, delta=ToolCallPartDelta(args_delta='{"a"')),
+        "final result": FinalResultEvent(tool_name=None, tool_call_id=None),
+    }
+
+    async def timed_table(event):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await runner.handle_event(event)
+        return (time.perf_counter() - start) / iterations
+
+    async def timed_chain(event):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for condition, handler in chain:
+                if condition(event):
+                    await handler(event)
+                    break
+        return (time.perf_counter() - start) / iterations
+
+    for name, event in events.items():
+        table, legacy = [], []
+        for _ in range(5):
+            table.append(await timed_table(event))
+            legacy.append(await timed_chain(event))
+        print(f"{name:16s} dispatch: table {min(table) * 1e9:5.0f} ns, predicate chain {min(legacy) * 1e9:5.0f} ns")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_throughput())
+    asyncio.run(dispatch_only())
@@ -0,0 +1,85 @@
+"""Cost of a session's sinks per result on the event loop, and a slow reader behind a queue.
+
+`AgentSession` used to print every delta. With stdout unbuffered (a write per delta, as
+in a container with `PYTHONUNBUFFERED=1`, here to /dev/null) that is a system call on the
+event loop for every delta of every session in the process; a `QueueSink` only appends.
+
+Then one session's turn (`TOKENS` deltas from a fake model) feeds a slow reader, a TTS
+gateway taking 2 ms per item, through a `QueueSink` of 32 items: `BLOCK` holds the
+session's consumer back to the reader's pace (the model still streams at full speed into
+the runner), `COALESCE` merges the deltas waiting in the queue.
+
+    python benchmarks/event_sinks.py
+"""
+import asyncio
+import contextlib
+import io
+import os
+import time
+
+from pydantic import BaseModel
+
+from voice_agent_flow.agents import AgentSession, ConsoleSink, MultiAgentRunner, QueueSink
+from voice_agent_flow.agents.agent_node import AgentNode
+from voice_agent_flow.agents.events import AgentResult, AgentTextStream, EventType
+from voice_agent_flow.agents.sinks import BLOCK, COALESCE
+
+from fakes import text_model
+
+RESULTS = 100000
+TOKENS = 300
+READER_DELAY = 0.002
+
+
+class Done(BaseModel):
+    done: bool
+
+
+def session(sinks) -> AgentSession:
+    agents = {"step": AgentNode(name="step", model=text_model(["好"] * TOKENS), instruction="-", task_cls=Done)}
+    return AgentSession(MultiAgentRunner(agents, "step"), sinks=sinks)
+
+
+async def per_result(sink, results: list[AgentResult]) -> float:
+    start = time.perf_counter()
+    for result in results:
+        await sink.emit(result)
+    return (time.perf_counter() - start) / len(results)
+
+
+async def slow_reader(queue: QueueSink) -> int:
+    items = 0
+    async for result in queue:
+        if isinstance(result.event, AgentTextStream):
+            items += 1
+            await asyncio.sleep(READER_DELAY)
+    return items
+
+
+async def queued_turn(policy: str) -> tuple[float, int, QueueSink]:
+    queue = QueueSink(maxsize=32, policy=policy)
+    s = session([queue])
+    reader = asyncio.create_task(slow_reader(queue))
+    start = time.perf_counter()
+    await s.chat("你好")
+    elapsed = time.perf_counter() - start
+    await s.close()
+    return elapsed, await reader, queue
+
+
+async def main():
+    results = [AgentResult(event=AgentTextStream(delta="好"), event_type=EventType.AgentTextStream)] * RESULTS
+    stdout = io.TextIOWrapper(open(os.devnull, "wb", buffering=0), write_through=True)
+    with contextlib.redirect_stdout(stdout):
+        console = await per_result(ConsoleSink(), results)
+    queue = await per_result(QueueSink(maxsize=RESULTS), results)
+    print(f"per result: console {console * 1e6:.2f} us, queue sink {queue * 1e6:.2f} us")
+
+    for policy in (BLOCK, COALESCE):
+        elapsed, items, queue = await queued_turn(policy)
+        print(f"{policy:>10}: turn {elapsed * 1e3:4.0f} ms, reader got {items} text items, "
+              f"{queue.stats.waited} waits, {queue.stats.coalesced} coalesced")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+"""Fake pydantic_ai models and a fake OpenAI compatible server for the benchmarks, with optional injected latency."""
+import asyncio
+import json
+
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, FunctionModel
+
+
+def text_model(tokens: list[str], first_token_delay: float = 0.0, token_delay: float = 0.0) -> FunctionModel:
+    """A model that streams `tokens` as text."""
+
+    async def stream(messages, info: AgentInfo):
+        if first_token_delay:
+            await asyncio.sleep(first_token_delay)
+        for token in tokens:
+            if token_delay:
+                await asyncio.sleep(token_delay)
+            yield token
+
+    return FunctionModel(stream_function=stream)
+
+
+def handoff_model(args_json: str, first_token_delay: float = 0.0, chunk: int = 0, chunk_delay: float = 0.0) -> FunctionModel:
+    """A model that answers with the structured output tool, `args_json` streamed in `chunk`-sized pieces."""
+
+    async def stream(messages, info: AgentInfo):
+        if first_token_delay:
+            await asyncio.sleep(first_token_delay)
+        name = info.output_tools[0].name
+        if not chunk:
+            yield {0: DeltaToolCall(name=name, json_args=args_json, tool_call_id="final")}
+            return
+        yield {0: DeltaToolCall(name=name, json_args=args_json[:chunk], tool_call_id="final")}
+        for i in range(chunk, len(args_json), chunk):
+            if chunk_delay:
+                await asyncio.sleep(chunk_delay)
+            yield {0: DeltaToolCall(json_args=args_json[i:i + chunk])}
+
+    return FunctionModel(stream_function=stream)
+
+
+class FakeOpenAIServer:
+    """
+    A local OpenAI compatible server (`/v1/chat/completions` streaming, `/v1/models`).
+
+    - `handshake`: seconds every new connection waits before its first response (TCP + TLS),
+    - `first_token_delay` + `prefill_per_token` * uncached prompt tokens: time to the first chunk,
+    - `prefix_cache`: vLLM style prefix caching over `block`-sized blocks of the prompt
+      (one character per token); the cached count is reported as `cached_tokens` in the usage.
+
+    The prompt is the system message, then the tool definitions, then the other messages,
+    as chat templates like Qwen's lay them out.
+    """
+
+    def __init__(self, reply: list[str] = ("您好",) * 4, handshake: float = 0.0, first_token_delay: float = 0.0,
+                 prefill_per_token: float = 0.0, prefix_cache: bool = False, block: int = 16):
+        self.reply = list(reply)
+        self.handshake = handshake
+        self.first_token_delay = first_token_delay
+        self.prefill_per_token = prefill_per_token
+        self.prefix_cache = prefix_cache
+        self.block = block
+        self.connections = 0
+        self._cached_blocks: set[int] = set()
+        self._server = None
+
+    async def start(self) -> str:
+        """Start listening, returns the base url."""
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return f"http://127.0.0.1:{self._server.sockets[0].getsockname()[1]}/v1"
+
+    async def close(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    def _prompt(self, request: dict) -> str:
+        messages = request.get("messages", [])
+        system = [m for m in messages if m["role"] == "system"]
+        rest = [m for m in messages if m["role"] != "system"]
+        return "".join(
+            [json.dumps(m.get("content"), ensure_ascii=False) for m in system]
+            + [json.dumps(request.get("tools", []), ensure_ascii=False)]
+            + [json.dumps(m, ensure_ascii=False) for m in rest]
+        )
+
+    def _cached_tokens(self, prompt: str) -> int:
+        """Length of the cached prefix, caching every full block of `prompt` afterwards."""
+        cached, chain, hit = 0, 0, True
+        for end in range(self.block, len(prompt) + 1, self.block):
+            chain = hash((chain, prompt[end - self.block:end]))
+            if hit and chain in self._cached_blocks:
+                cached = end
+            else:
+                hit = False
+                self._cached_blocks.add(chain)
+        return cached
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        if self.handshake:
+            await asyncio.sleep(self.handshake)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                body = await reader.readexactly(length) if length else b""
+                if head.startswith(b"GET"):
+                    await self._send(writer, b"application/json", [json.dumps({"object": "list", "data": []}).encode()])
+                    continue
+
+                prompt = self._prompt(json.loads(body))
+                cached = self._cached_tokens(prompt) if self.prefix_cache else 0
+                delay = self.first_token_delay + self.prefill_per_token * (len(prompt) - cached)
+                if delay:
+                    await asyncio.sleep(delay)
+                await self._send(writer, b"text/event-stream", self._events(len(prompt), cached))
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    def _events(self, prompt_tokens: int, cached: int) -> list[bytes]:
+        def chunk(choices, **extra):
+            data = {"id": "c", "object": "chat.completion.chunk", "created": 0, "model": "fake",
+                    "choices": choices, **extra}
+            return f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+        events = [chunk([{"index": 0, "delta": {"role": "assistant", "content": token}, "finish_reason": None}])
+                  for token in self.reply]
+        events.append(chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        events.append(chunk([], usage={
+            "prompt_tokens": prompt_tokens, "completion_tokens": len(self.reply),
+            "total_tokens": prompt_tokens + len(self.reply),
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }))
+        # no "data: [DONE]": some openai client versions stop reading there and close the
+        # connection instead of returning it to the pool
+        return events
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, content_type: bytes, chunks: list[bytes]) -> None:
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: " + content_type + b"\r\nTransfer-Encoding: chunked\r\n\r\n")
+        for data in chunks:
+            writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
@@ -0,0 +1,103 @@
+"""Latency of a trivial answer ("嗯", "有的") with and without the step's fast path.
+
+The step asks whether the customer needs financial support; the model needs 300 ms to its
+first token for the structured output, as does the next step for its question. A call is
+the question turn plus one answer turn, timed from the answer to the next step's first
+text. With a `FastPath` the trivial answers hand off without the model, the others still
+go to it. In shadow mode the model always runs and the fast path's decisions are compared
+with its outputs (precision).
+
+    python benchmarks/fast_path.py
+"""
+import asyncio
+import time
+
+from pydantic import BaseModel
+from pydantic_ai.messages import ModelMessage, UserPromptPart
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, FunctionModel
+
+from voice_agent_flow.agents import MultiAgentRunner
+from voice_agent_flow.agents.agent_node import AgentNode
+from voice_agent_flow.agents.events import AgentTextStream
+from voice_agent_flow.agents.fast_path import FastPath
+from voice_agent_flow.memory import Memory
+
+from fakes import text_model
+
+DELAY = 0.3
+QUESTION = "您最近是有资金需求吗？"
+ANSWERS = ["嗯", "有的", "是的。", "需要", "嗯嗯", "你们利率多少？", "有啊", "要看额度"]
+RULES = {r"[嗯呃]+|是的?|对的?|有的?|有啊|需要": {"require_financial_support": True}}
+
+
+class FinancialSupportStatus(BaseModel):
+    require_financial_support: bool
+
+    def transfer(self) -> str:
+        return "vehicle_payment_status"
+
+
+class PaymentMethod(BaseModel):
+    is_not_under_repayment: bool
+
+    def transfer(self) -> str:
+        return "end"
+
+
+async def step_model_stream(messages: list[ModelMessage], info: AgentInfo):
+    """The question first, then the structured output once the customer answered."""
+    await asyncio.sleep(DELAY)
+    answered = any(isinstance(part, UserPromptPart) for part in messages[-1].parts)
+    if not answered:
+        yield QUESTION
+        return
+    yield {0: DeltaToolCall(name=info.output_tools[0].name, json_args='{"require_financial_support": true}',
+                            tool_call_id="final")}
+
+
+STEP_MODEL = FunctionModel(stream_function=step_model_stream)
+NEXT_MODEL = text_model(list("您的车是全款买的还是按揭买的？"), first_token_delay=DELAY)
+
+
+def agents(fast_path: FastPath | None) -> dict[str, AgentNode]:
+    return {
+        "financial_support_inquiry": AgentNode(
+            name="financial_support_inquiry", model=STEP_MODEL, instruction="-",
+            task_cls=FinancialSupportStatus, fast_path=fast_path),
+        "vehicle_payment_status": AgentNode(
+            name="vehicle_payment_status", model=NEXT_MODEL, instruction="-", task_cls=PaymentMethod),
+    }
+
+
+async def call(fast_path: FastPath | None, answer: str) -> float:
+    runner = MultiAgentRunner(agents(fast_path), "financial_support_inquiry")
+    memory = Memory()
+    async for _ in runner.run(memory=memory):
+        pass
+    memory.add_assistant(QUESTION)
+    memory.add_user(answer)
+
+    start = time.perf_counter()
+    async for result in runner.run(memory=memory):
+        if isinstance(result.event, AgentTextStream):
+            return time.perf_counter() - start
+
+
+async def main():
+    for label, fast_path in (
+        ("model only", None),
+        ("fast path", FastPath(RULES)),
+        ("shadow", FastPath(RULES, shadow=True)),
+    ):
+        latencies = [await call(fast_path, answer) for answer in ANSWERS]
+        line = f"{label:>10}: answer to next question {sum(latencies) / len(latencies) * 1e3:6.1f} ms on average"
+        if fast_path is not None:
+            stats = fast_path.stats
+            line += f", hit rate {stats.hit_rate:.0%}"
+            if stats.precision is not None:
+                line += f", precision {stats.precision:.0%}"
+        print(line)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
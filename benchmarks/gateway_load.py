@@ -0,0 +1,142 @@
+"""End to end load on `VoiceGateway`: WebSocket clients talking to sessions on a fake model.
+
+`CLIENTS` clients connect at once, and each has `TURNS` turns: it sends an utterance, reads
+text frames up to `turn_end` and sends the next one. The fake model answers after 50 ms
+with 10 tokens, 5 ms apart. Reports time to the first text frame and per turn, as the
+client sees them. Clients and gateway share one event loop, so a client refused while
+the loop lags (HTTP 503) retries after 100 ms, as a telephony front end would.
+
+Then the loop is stalled for 150 ms out of every 160 ms (as a CPU bound task would) and
+new clients are refused by admission control. Last, the gateway drains while 100 sessions
+are mid turn: the turns finish, then the clients are closed with code 1001.
+
+    python benchmarks/gateway_load.py
+"""
+import asyncio
+import json
+import time
+
+from pydantic import BaseModel
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed, InvalidStatus
+
+from voice_agent_flow.agents import AgentSession, MultiAgentRunner
+from voice_agent_flow.agents.agent_node import AgentNode
+from voice_agent_flow.gateway import VoiceGateway
+
+from fakes import text_model
+
+CLIENTS = 200
+TURNS = 3
+
+
+class Done(BaseModel):
+    done: bool
+
+
+MODEL = text_model(["好的"] * 10, first_token_delay=0.05, token_delay=0.005)
+
+
+def create_session(session_id: str, params: dict[str, str]) -> AgentSession:
+    agents = {"step": AgentNode(name="step", model=MODEL, instruction="-", task_cls=Done)}
+    return AgentSession(MultiAgentRunner(agents, "step"), sinks=[])
+
+
+async def turn(websocket) -> tuple[float, float]:
+    start = time.perf_counter()
+    first = None
+    await websocket.send(json.dumps({"type": "utterance", "text": "你好"}))
+    async for message in websocket:
+        frame = json.loads(message)
+        if frame["type"] == "text" and first is None:
+            first = time.perf_counter() - start
+        elif frame["type"] == "turn_end":
+            return first, time.perf_counter() - start
+
+
+async def client(url: str, turns: int, retry: bool = True) -> tuple[list[tuple[float, float]], int]:
+    """The turns' (time to first text, turn time), and how often the client was refused."""
+    refusals = 0
+    while True:
+        try:
+            async with connect(url, compression=None) as websocket:
+                json.loads(await websocket.recv())    # ready
+                return [await turn(websocket) for _ in range(turns)], refusals
+        except InvalidStatus:
+            refusals += 1
+            if not retry:
+                return [], refusals
+            await asyncio.sleep(0.1)
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+async def stall(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        time.sleep(0.15)
+        await asyncio.sleep(0.01)
+
+
+async def refused(url: str, clients: int) -> int:
+    results = await asyncio.gather(*(client(url, turns=1, retry=False) for _ in range(clients)))
+    return sum(refusals for _, refusals in results)
+
+
+async def drained(url: str, speaking: asyncio.Event) -> tuple[bool, int | None]:
+    """Whether the turn running at shutdown finished, and the close code."""
+    while True:
+        try:
+            websocket = await connect(url, compression=None)
+            break
+        except InvalidStatus:
+            await asyncio.sleep(0.1)
+    async with websocket:
+        json.loads(await websocket.recv())
+        await websocket.send(json.dumps({"type": "utterance", "text": "你好"}))
+        finished = False
+        try:
+            async for message in websocket:
+                kind = json.loads(message)["type"]
+                speaking.set()
+                finished = finished or kind == "turn_end"
+        except ConnectionClosed:
+            pass
+        return finished, websocket.close_code
+
+
+async def main():
+    gateway = VoiceGateway(create_session, max_lag=0.1, idle_timeout=60)
+    url = await gateway.start()
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(client(url, TURNS) for _ in range(CLIENTS)))
+    elapsed = time.perf_counter() - start
+    ttfts = [first for turns, _ in results for first, _ in turns]
+    totals = [total for turns, _ in results for _, total in turns]
+    print(f"{CLIENTS} clients x {TURNS} turns in {elapsed:.2f} s: first text p50 {percentile(ttfts, 0.5) * 1e3:.0f} ms, "
+          f"p95 {percentile(ttfts, 0.95) * 1e3:.0f} ms; turn p95 {percentile(totals, 0.95) * 1e3:.0f} ms; "
+          f"peak {gateway.stats.peak} sessions, {sum(refusals for _, refusals in results)} refusals retried")
+
+    stop = asyncio.Event()
+    staller = asyncio.create_task(stall(stop))
+    await asyncio.sleep(0.5)
+    print(f"stalled loop (lag {gateway.stats.lag * 1e3:.0f} ms): {await refused(url, 50)} of 50 new clients refused")
+    stop.set()
+    await staller
+    await asyncio.sleep(0.5)
+
+    speaking = [asyncio.Event() for _ in range(100)]
+    clients = [asyncio.create_task(drained(url, event)) for event in speaking]
+    await asyncio.gather(*(event.wait() for event in speaking))
+    await gateway.shutdown()
+    outcomes = await asyncio.gather(*clients)
+    print(f"drain: {sum(finished for finished, _ in outcomes)} of 100 turns finished, "
+          f"close codes {sorted({code for _, code in outcomes})}")
+    print(gateway.stats)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""Per-event cost of `MultiAgentRunner.run` after N handoffs in one turn.
+
+A chain of agents hands off straight away (step_0 -> step_1 -> ... -> step_N), the last
+one streams text. With handoffs followed in a flat loop the per-event cost of the final
+agent's stream does not depend on N. For comparison, the cost N nested async generators
+add per event, as with the previous recursive `run`. Also shows the handoff limits.
+
+    python benchmarks/handoff_chain.py
+"""
+import asyncio
+import time
+
+from pydantic import BaseModel
+
+from voice_agent_flow.agents import MultiAgentRunner
+from voice_agent_flow.agents.agent_node import AgentNode
+from voice_agent_flow.agents.events import AgentTextStream
+
+from fakes import handoff_model, text_model
+
+TOKENS = 5000
+
+
+def chain(length: int, loop_back: bool = False) -> dict[str, AgentNode]:
+    agents = {}
+    for i in range(length + 1):
+        target = f"step_{i + 1}" if i < length else ("step_0" if loop_back else None)
+
+        class Transfer(BaseModel):
+            done: bool
+
+            def transfer(self, _target=target):
+                return _target
+
+        model = handoff_model('{"done": true}') if target else text_model(["字"] * TOKENS)
+        agents[f"step_{i}"] = AgentNode(name=f"step_{i}", model=model, instruction="-", task_cls=Transfer)
+    return agents
+
+
+async def nested(results, depth: int):
+    if depth == 0:
+        async for result in results:
+            yield result
+        return
+    async for result in nested(results, depth - 1):
+        yield result
+
+
+async def per_event(length: int) -> float:
+    """Seconds per text event of the final agent, after `length` handoffs."""
+    runner = MultiAgentRunner(chain(length), "step_0", max_handoffs=64)
+    text_events = 0
+    first_text = None
+    async for result in runner.run(prompt="hi"):
+        if isinstance(result.event, AgentTextStream):
+            if first_text is None:
+                first_text = time.perf_counter()
+            text_events += 1
+    return (time.perf_counter() - first_text) / text_events
+
+
+async def nesting_cost(depth: int, events: int = 100000) -> float:
+    """Seconds per event added by `depth` nested generators (the recursive design), no model involved."""
+    results = [AgentTextStream(delta="字")] * events
+
+    async def source():
+        for result in results:
+            yield result
+
+    start = time.perf_counter()
+    async for _ in nested(source(), 0):
+        pass
+    base = time.perf_counter() - start
+    start = time.perf_counter()
+    async for _ in nested(source(), depth):
+        pass
+    return (time.perf_counter() - start - base) / events
+
+
+async def limits():
+    runner = MultiAgentRunner(chain(12), "step_0")
+    async for result in runner.run(prompt="hi"):
+        if result.event_type == "HandoffLimitReached":
+            print("12 handoffs, max_handoffs=8:", result.event.message["reason"], len(result.event.message["path"]) - 1)
+    runner = MultiAgentRunner(chain(2, loop_back=True), "step_0")
+    async for result in runner.run(prompt="hi"):
+        if result.event_type == "HandoffLimitReached":
+            print("step_0 -> step_1 -> step_2 -> step_0 -> ...:", result.event.message["reason"], result.event.message["path"])
+
+
+async def main():
+    for length in (0, 5, 20):
+        flat = min([await per_event(length) for _ in range(3)])
+        print(f"{length:>2} handoffs: {flat * 1e6:.1f} us per text event, "
+              f"recursion would add {await nesting_cost(length) * 1e6:.2f} us")
+    await limits()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""Time to first token with and without hedged requests.
+
+A fake model answers 90% of requests after 100 ms and the other 10% after 1.5 s, as a
+stalled replica or a slow prefill would. `HedgedModel` sends a second request when no
+first token arrived after 250 ms; the budget allows hedging 20% of the requests, and every
+fifth winning hedge is probed to measure the saving. Requests run `CONCURRENCY` at a time.
+
+    python benchmarks/hedged_requests.py
+"""
+import asyncio
+import random
+import time
+
+from pydantic_ai import Agent
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from voice_agent_flow.llms import HedgeBudget, HedgedModel
+
+REQUESTS = 400
+CONCURRENCY = 20
+FAST, SLOW, SLOW_SHARE = 0.1, 1.5, 0.1
+THRESHOLD = 0.25
+
+
+def slow_tail_model(seed: int) -> FunctionModel:
+    rng = random.Random(seed)
+
+    async def stream(messages, info: AgentInfo):
+        await asyncio.sleep(SLOW if rng.random() < SLOW_SHARE else FAST)
+        for token in ("好的", "，", "稍等"):
+            yield token
+
+    return FunctionModel(stream_function=stream)
+
+
+async def ttfts(agent: Agent) -> list[float]:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def request() -> float:
+        async with semaphore:
+            start = time.perf_counter()
+            async with agent.run_stream("你好") as result:
+                async for _ in result.stream_text(delta=True):
+                    return time.perf_counter() - start
+
+    return sorted(await asyncio.gather(*(request() for _ in range(REQUESTS))))
+
+
+def percentile(values: list[float], q: float) -> float:
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+async def main():
+    hedged = HedgedModel(slow_tail_model(seed=1), threshold=THRESHOLD, budget=HedgeBudget(ratio=0.2, burst=5),
+                         probe=0.2)
+    for label, model in (("no hedging", slow_tail_model(seed=1)), ("hedged", hedged)):
+        values = await ttfts(Agent(model))
+        print(f"{label:>10}: TTFT p50 {percentile(values, 0.5) * 1e3:6.1f} ms, "
+              f"p95 {percentile(values, 0.95) * 1e3:6.1f} ms, p99 {percentile(values, 0.99) * 1e3:6.1f} ms")
+
+    stats = hedged.stats
+    print(f"hedge rate {stats.hedge_rate:.1%}, hedges won {stats.win_rate:.0%}, denied by budget {stats.denied}, "
+          f"saving {stats.saved_per_win * 1e3:.0f} ms per winning hedge ({stats.probes} probes)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+"""Per-session memory footprint of `Memory` in default and compact mode.
+
+Builds many sessions with the same transcript and reports traced bytes and
+gc-tracked objects per session.
+
+    python benchmarks/memory_footprint.py
+"""
+import gc
+import tracemalloc
+
+import voice_agent_flow.agents  # noqa: F401  (import order: agents before memory)
+from voice_agent_flow.memory import Memory
+
+
+def build_session(compact: bool, turns: int) -> Memory:
+    memory = Memory(compact=compact)
+    for i in range(turns):
+        memory.add_user(f"嗯，第{i}轮我说一下")
+        if i % 4 == 0:
+            memory.add_tool_request("check_wechat_account_validity", '{"account_name": "150"}', f"call_{i}")
+            memory.add_tool_return("check_wechat_account_validity", "嗯嗯，您继续", f"call_{i}")
+        memory.add_assistant(f"好的，第{i}轮的回复")
+    return memory
+
+
+def measure(compact: bool, sessions: int, turns: int):
+    gc.collect()
+    objects_before = len(gc.get_objects())
+    tracemalloc.start()
+    kept = [build_session(compact, turns) for _ in range(sessions)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    objects = len(gc.get_objects()) - objects_before
+    del kept
+    return current / sessions, objects / sessions
+
+
+def run(sessions: int = 500, turns: int = 40):
+    print(f"{sessions} sessions x {turns} turns")
+    for compact in (False, True):
+        size, objects = measure(compact, sessions, turns)
+        mode = "compact" if compact else "default"
+        print(f"{mode:>8}: {size / 1024:8.1f} KiB/session {objects:8.0f} gc objects/session")
+
+
+if __name__ == "__main__":
+    run()
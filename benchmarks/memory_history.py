@@ -0,0 +1,43 @@
+"""Per-turn cost of `Memory.to_pydantic` as a call grows.
+
+Compares the incremental history cache against a full `pmsg.to_history` rebuild.
+The incremental column should stay flat while the full rebuild grows with the turn count.
+
+    python benchmarks/memory_history.py
+"""
+import time
+
+import voice_agent_flow.agents  # noqa: F401  (import order: agents before memory)
+from voice_agent_flow.agents import pmsg
+from voice_agent_flow.memory import Memory
+
+
+def add_turn(memory: Memory, i: int):
+    memory.add_user(f"第{i}轮，客户说了一句话。")
+    if i % 4 == 0:
+        memory.add_tool_request("check_wechat_account_validity", '{"account_name": "150"}', f"call_{i}")
+        memory.add_tool_return("check_wechat_account_validity", "嗯嗯，您继续", f"call_{i}")
+    memory.add_assistant(f"第{i}轮，坐席回复了一句话。")
+
+
+def run(turns: int = 80, report_every: int = 10, repeat: int = 20):
+    memory = Memory()
+    print(f"{'turn':>6} {'incremental(us)':>16} {'full rebuild(us)':>17}")
+    for i in range(1, turns + 1):
+        add_turn(memory, i)
+
+        start = time.perf_counter()
+        memory.to_pydantic()
+        incremental = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            pmsg.to_history(memory.model_dump()["messages"])
+        full = (time.perf_counter() - start) / repeat
+
+        if i % report_every == 0:
+            print(f"{i:>6} {incremental * 1e6:>16.1f} {full * 1e6:>17.1f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,65 @@
+"""TTFT while the primary endpoint degrades, pinned to it vs routed with a circuit breaker.
+
+The primary answers in 100 ms, then degrades to 800 ms for the middle phase and recovers.
+The fallback always answers in 250 ms. The router's SLO is a p95 TTFT of 500 ms over the
+last 10 s (at least 5 requests); an open breaker probes the primary again after 0.5 s.
+Requests run in batches of `BATCH`, as concurrent calls would.
+
+    python benchmarks/model_fallback.py
+"""
+import asyncio
+import time
+
+from pydantic_ai import Agent
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from voice_agent_flow.llms.router import SLO, CircuitBreakers, ModelRouter
+
+BATCH = 5
+PHASES = [("healthy", 0.1, 20), ("degraded", 0.8, 30), ("recovered", 0.1, 40)]
+FALLBACK_DELAY = 0.25
+
+
+def delayed_model(name: str, delay) -> FunctionModel:
+    async def stream(messages, info: AgentInfo):
+        await asyncio.sleep(delay())
+        yield "好的"
+
+    return FunctionModel(stream_function=stream, model_name=name)
+
+
+async def ttft(agent: Agent) -> float:
+    start = time.perf_counter()
+    async with agent.run_stream("你好") as result:
+        async for _ in result.stream_text(delta=True):
+            return time.perf_counter() - start
+
+
+async def run_phases(label: str, agent: Agent, primary_delay: list[float]) -> None:
+    line = []
+    for phase, delay, requests in PHASES:
+        primary_delay[0] = delay
+        values = []
+        for _ in range(0, requests, BATCH):
+            values += await asyncio.gather(*(ttft(agent) for _ in range(BATCH)))
+        line.append(f"{phase} {sum(values) / len(values) * 1e3:5.0f} ms")
+    print(f"{label}, mean TTFT: " + ", ".join(line))
+
+
+async def main():
+    primary_delay = [0.1]
+    primary = delayed_model("qwen", lambda: primary_delay[0])
+    fallback = delayed_model("gpt-4o-mini", lambda: FALLBACK_DELAY)
+
+    await run_phases("pinned to the primary", Agent(primary), primary_delay)
+
+    breakers = CircuitBreakers(SLO(ttft=0.5, min_requests=5, window=10.0, cooldown=0.5))
+    router = ModelRouter([primary, fallback], breakers=breakers)
+    await run_phases("routed with a breaker", Agent(router), primary_delay)
+    stats = router.stats
+    print(f"requests {stats.requests}, to the fallback {stats.fallbacks}, "
+          f"breaker opened {breakers.get('function:qwen').opened} time(s), now {breakers.get('function:qwen').state}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""Time to the first text of a call's opening turn, with and without the opener cache.
+
+The entry agent needs 300 ms to its first token and streams its greeting at 10 ms per
+token. With an `OpenerCache` shared by the sessions, the first call learns the greeting
+(customers with the same name here, as the cache is keyed by the session variables the
+step uses and the history) and later calls stream it without a model run.
+
+    python benchmarks/opener_cache.py
+"""
+import asyncio
+import time
+
+from pydantic import BaseModel
+
+from voice_agent_flow.agents import MultiAgentRunner
+from voice_agent_flow.agents.agent_node import AgentNode
+from voice_agent_flow.agents.events import AgentTextStream
+from voice_agent_flow.agents.openers import OpenerCache
+from voice_agent_flow.memory import Memory
+
+from fakes import text_model
+
+CALLS = 10
+GREETING = list("喂，您好，请问是李老三吗？")
+# shared by the sessions, as `car_loan.create_model` does
+MODEL = text_model(GREETING, first_token_delay=0.3, token_delay=0.01)
+
+
+class CustomerName(BaseModel):
+    name_checked: bool
+
+    def transfer(self) -> str:
+        return "hangup"
+
+
+def agents() -> dict[str, AgentNode]:
+    return {
+        "customer_name_inquiry": AgentNode(
+            name="customer_name_inquiry",
+            model=MODEL,
+            instruction="-",
+            task_cls=CustomerName,
+            step_instruction="Confirm the customer's name: ${customer_name}",
+        ),
+    }
+
+
+async def call(openers: OpenerCache | None) -> float:
+    runner = MultiAgentRunner(agents(), "customer_name_inquiry", variables={"customer_name": "李老三"},
+                              openers=openers)
+    start = time.perf_counter()
+    first_text = None
+    async for result in runner.run(memory=Memory()):
+        if isinstance(result.event, AgentTextStream) and first_text is None:
+            first_text = time.perf_counter() - start
+    return first_text
+
+
+async def main():
+    for openers in (None, OpenerCache(learn=True)):
+        firsts = [await call(openers) for _ in range(CALLS)]
+        label = "opener cache" if openers is not None else "no cache"
+        line = f"{label:>12}: first text of call 1 {firsts[0] * 1e3:5.1f} ms, calls 2-{CALLS} {max(firsts[1:]) * 1e3:5.1f} ms"
+        if openers is not None:
+            line += f", hit rate {openers.stats.hit_rate:.0%}"
+        print(line)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""Prefix cache hit ratio and TTFT with session variables inline vs listed last.
+
+A fake vLLM style server caches prompts in 16-token blocks and takes 0.1 ms per uncached
+prompt token to the first token. Twenty calls with different customers run the same
+step, whose instruction mentions the customer's name in the middle of the step text.
+With `inline_variables=True` the prompt differs from the name on, so the step text and
+examples after it are prefilled again for every call. With the default layout the name
+is listed in the trailing "Session Variables" section and only that section is new.
+
+    python benchmarks/prefix_cache.py
+"""
+import asyncio
+import statistics
+
+from pydantic import BaseModel
+
+from voice_agent_flow.agents import MultiAgentRunner
+from voice_agent_flow.agents.agent_node import AgentNode
+from voice_agent_flow.llms import ClientPool
+
+from fakes import FakeOpenAIServer
+
+CALLS = 20
+NAMES = ["李老三", "王五", "张伟", "刘洋", "陈静"]
+
+INSTRUCTION = "## SYSTEM ROLE & OBJECTIVE\nYou are a customer service representative for an auto finance company (易鑫集团).\n" + (
+    "- Output minimal text per response to efficiently collect information.\n" * 30)
+
+
+class CustomerName(BaseModel):
+    name_checked: bool
+
+    def transfer(self) -> str:
+        return "hangup"
+
+
+def create_agents(model, inline_variables: bool) -> dict[str, AgentNode]:
+    return {
+        "customer_name_inquiry": AgentNode(
+            name="customer_name_inquiry",
+            model=model,
+            instruction=INSTRUCTION,
+            task_cls=CustomerName,
+            step_instruction=(
+                "Confirm the customer's name with a greeting message. Current Customer Name: ${customer_name}. "
+                + "Ambiguous responses like '嗯', '呃', '哪里' are a confirmation. " * 10
+            ),
+            examples=["您好，请问是xxx吗？ Customer: 嗯 -> create CustomerName(name_checked=True)"] * 5,
+            inline_variables=inline_variables,
+        ),
+    }
+
+
+async def calls(inline_variables: bool) -> tuple[float, float]:
+    server = FakeOpenAIServer(first_token_delay=0.01, prefill_per_token=0.0001, prefix_cache=True)
+    pool = ClientPool()
+    model = pool.openai_compatible("fake", await server.start())
+
+    ttfts = []
+    for i in range(CALLS):
+        runner = MultiAgentRunner(create_agents(model, inline_variables), "customer_name_inquiry",
+                                  variables={"customer_name": f"{NAMES[i % len(NAMES)]}{i}"})
+        async for _ in runner.run(prompt="喂？"):
+            pass
+        if i:
+            # the first call fills the cache in both layouts
+            ttfts.append(runner.turn_timings.ttft)
+            hit_ratio = runner.prefix_cache["customer_name_inquiry"].hit_ratio
+    await pool.aclose()
+    await server.close()
+    return statistics.median(ttfts), hit_ratio
+
+
+async def main():
+    for inline_variables in (True, False):
+        ttft, hit_ratio = await calls(inline_variables)
+        label = "variables inline" if inline_variables else "variables last"
+        print(f"{label:>16}: prefix cache hit ratio {hit_ratio:5.1%}, median TTFT {ttft * 1e3:5.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""Session creation time with and without the shared agent registry.
+
+A car_loan-sized flow: seven steps with structured outputs, one of them with a per-session
+tool (`create_phone_num_check_tool`), plus hangup. Each session builds its nodes and a
+`MultiAgentRunner` and enters every step once, as a call that goes through the whole flow
+does. Without sharing (a registry that keeps nothing, as before) every session compiles
+every agent and tool schema; with the shared registry only the first one does.
+
+    python benchmarks/session_creation.py
+"""
+import time
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from voice_agent_flow.agents import MultiAgentRunner
+from voice_agent_flow.agents.agent_node import AgentNode, HangUpNode
+from voice_agent_flow.agents.registry import AgentRegistry
+from voice_agent_flow.tools import create_phone_num_check_tool
+
+from fakes import text_model
+
+MODEL = text_model(["好的"])
+STEPS = ["customer_name_inquiry", "financial_support_inquiry", "vehicle_payment_status",
+         "vehicle_liscence_under_control", "wechat_account_confirm", "wechat_add_request", "wechat_guide"]
+
+
+class StepResult(BaseModel):
+    """Structured output of a step."""
+    confirmed: Optional[bool] = Field(None, description="Whether the customer confirmed")
+    note: Optional[str] = Field(None, description="What the customer said")
+    account: Optional[str] = Field(None, description="The wechat account, if any")
+
+    def transfer(self) -> str:
+        return "hangup"
+
+
+def create_agents() -> dict[str, AgentNode]:
+    agents = {
+        name: AgentNode(
+            name=name,
+            model=MODEL,
+            instruction="## Global Instruction:\n你是易鑫集团的金融顾问。\n",
+            task_cls=StepResult,
+            step_instruction=f"Step {name}.",
+            tools=[create_phone_num_check_tool()] if name == "wechat_account_confirm" else [],
+        )
+        for name in STEPS
+    }
+    agents["hangup"] = HangUpNode(model=MODEL)
+    return agents
+
+
+def create_session(registry: AgentRegistry) -> MultiAgentRunner:
+    runner = MultiAgentRunner(create_agents(), STEPS[0], registry=registry)
+    for name in runner.agents:
+        runner.set_agent(name)
+    return runner
+
+
+def bench(registry_for_session, sessions: int = 200) -> float:
+    start = time.perf_counter()
+    for _ in range(sessions):
+        create_session(registry_for_session())
+    return (time.perf_counter() - start) / sessions
+
+
+def main():
+    shared = AgentRegistry()
+    compiled = shared.warmup(create_agents())
+    for label, registry_for_session in (
+        ("per session (no sharing)", lambda: AgentRegistry(max_size=0)),
+        ("shared registry", lambda: shared),
+    ):
+        per_session = min(bench(registry_for_session) for _ in range(3))
+        print(f"{label:>24}: {per_session * 1e3:6.2f} ms per session")
+    print(f"warmup compiled {compiled} agents, hit rate {shared.stats.hit_rate:.1%}")
+
+
+if __name__ == "__main__":
+    main()
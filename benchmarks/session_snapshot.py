@@ -0,0 +1,102 @@
+"""Time and size of `AgentSession.snapshot()` / `restore()` for a typical call.
+
+The call has 20 turns (user, tool request, tool return, assistant: 80 messages), five
+session variables, an `agent_state` from two finished steps and the phone number tool with
+state. Both memory representations are measured, against a JSON dump of the same state
+(`Memory.model_dump_json` plus the runner state) and its rebuild with `Memory.from_records`.
+
+    python benchmarks/session_snapshot.py
+"""
+import json
+import time
+
+from pydantic import BaseModel
+
+from voice_agent_flow.agents import AgentSession, MultiAgentRunner, register_tool_state
+from voice_agent_flow.agents.agent_node import AgentNode
+from voice_agent_flow.memory import Memory
+from voice_agent_flow.tools.phone_num import PhoneNumIntegrityChecker, create_phone_num_check_tool
+
+from fakes import text_model
+
+TURNS = 20
+REPEAT = 2000
+
+# as `car_loan` does
+register_tool_state(PhoneNumIntegrityChecker, PhoneNumIntegrityChecker.dump_state, PhoneNumIntegrityChecker.load_state)
+
+
+class Done(BaseModel):
+    done: bool
+
+
+def create_session(compact: bool) -> AgentSession:
+    agents = {
+        name: AgentNode(name=name, model=text_model(["好的"]), instruction="-", task_cls=Done,
+                        tools=[create_phone_num_check_tool()])
+        for name in ("greeting", "wechat_guide", "closing")
+    }
+    return AgentSession(MultiAgentRunner(agents, "greeting"), memory=Memory(compact=compact), sinks=[])
+
+
+def typical_call(compact: bool) -> AgentSession:
+    session = create_session(compact)
+    session.set_variables(customer_name="张先生", phone="138****5678", product="车贷", city="上海", agent_name="小王")
+    session.runner.agent_state.update({"greeted": True, "interested": True, "loan_amount": 150000, "notes": "下周看车"})
+    session.set_agent("wechat_guide")
+    check = session.runner.agents["wechat_guide"].tools[0]
+    check("138"), check("1381234"), check("13812345678")
+    for i in range(TURNS):
+        session.memory.add_user(f"嗯，我的微信就是手机号，第{i}轮我再说一下")
+        session.memory.add_tool_request("check_wechat_account_validity", f'{{"account_name": "1381234567{i % 10}"}}', f"call_{i}")
+        session.memory.add_tool_return("check_wechat_account_validity", "The user provided an 11-digit phone number.", f"call_{i}")
+        session.memory.add_assistant(f"好的，确认一下是 1381234567{i % 10} 对么？第{i}轮")
+    return session
+
+
+def json_dump(session: AgentSession) -> bytes:
+    runner = session.runner
+    return json.dumps({
+        "memory": session.memory.model_dump()["messages"],
+        "agent": runner.current_agent.name,
+        "agent_state": runner.agent_state,
+        "variables": runner.variables,
+        "finished": session.finished,
+    }, ensure_ascii=False).encode()
+
+
+def json_load(session: AgentSession, data: bytes) -> None:
+    state = json.loads(data)
+    session.memory = Memory.from_records(state["memory"], compact=session.memory.compact)
+    session.runner.set_agent(state["agent"])
+    session.runner.agent_state = state["agent_state"]
+    session.runner.variables.clear()
+    session.runner.variables.update(state["variables"])
+    session.finished = state["finished"]
+
+
+def timed(function, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        function(*args)
+    return (time.perf_counter() - start) / REPEAT
+
+
+def main():
+    print(f"{TURNS} turns, {TURNS * 4} messages")
+    for compact in (False, True):
+        session = typical_call(compact)
+        target = create_session(compact)
+        data = session.snapshot()
+        target.restore(data)
+        assert target.snapshot() == data
+        text = json_dump(session)
+        label = "compact " if compact else "pydantic"
+        print(f"  {label} snapshot: {len(data):5d} bytes, dump {timed(session.snapshot) * 1e6:4.0f} us, "
+              f"restore {timed(target.restore, data) * 1e6:4.0f} us")
+        print(f"  {label} JSON    : {len(text):5d} bytes, dump {timed(json_dump, session) * 1e6:4.0f} us, "
+              f"restore {timed(json_load, target, text) * 1e6:4.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Turn throughput of `Supervisor` with 1, 2, 4, ... worker processes, on a fake model.
+
+Every worker hosts `CALLS_PER_WORKER` concurrent calls, so the load grows with the
+worker count. Each call has `TURNS` turns, and the fake model answers after 50 ms with 10
+tokens, 5 ms apart. The calls come from one client process per worker, since the load
+generator is CPU bound too. Turns per second should grow with the worker count while
+the time to first text stays flat, as long as every worker and every client process gets
+a core of its own. By default the worker counts go up to half the CPU cores; pass others
+on the command line.
+
+    python benchmarks/sharded_workers.py [workers ...]
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from pydantic import BaseModel
+from websockets.asyncio.client import connect
+from websockets.exceptions import InvalidStatus
+
+from voice_agent_flow.agents import AgentSession, MultiAgentRunner
+from voice_agent_flow.agents.agent_node import AgentNode
+from voice_agent_flow.agents.metrics import TURN_TOTAL
+from voice_agent_flow.agents.registry import default_registry
+from voice_agent_flow.gateway import Supervisor, worker_metrics
+
+from fakes import text_model
+
+CALLS_PER_WORKER = 100
+TURNS = 3
+
+
+class Done(BaseModel):
+    done: bool
+
+
+AGENTS = {"step": AgentNode(name="step", model=text_model(["好的"] * 10, first_token_delay=0.05, token_delay=0.005),
+                            instruction="-", task_cls=Done)}
+
+
+def warmup() -> None:
+    default_registry.warmup(AGENTS)
+
+
+def create_session(session_id: str, params: dict[str, str]) -> AgentSession:
+    return AgentSession(MultiAgentRunner(AGENTS, "step", metrics_sink=worker_metrics), sinks=[])
+
+
+async def call(url: str) -> list[float]:
+    """Time to first text of every turn; refused while a worker's loop lags, the call retries."""
+    firsts = []
+    while True:
+        try:
+            websocket = await connect(url, compression=None, open_timeout=60)
+            break
+        except InvalidStatus:
+            await asyncio.sleep(0.1)
+    async with websocket:
+        json.loads(await websocket.recv())    # ready
+        for _ in range(TURNS):
+            start = time.perf_counter()
+            first = None
+            await websocket.send(json.dumps({"type": "utterance", "text": "你好"}))
+            async for message in websocket:
+                kind = json.loads(message)["type"]
+                if kind == "text" and first is None:
+                    first = time.perf_counter() - start
+                elif kind == "turn_end":
+                    break
+            firsts.append(first)
+    return firsts
+
+
+def client_process(url: str, calls: int) -> tuple[float, float, list[float]]:
+    """Wall clock start and end of the calls (the process start is not measured), and their times to first text."""
+    async def run():
+        start = time.time()
+        results = await asyncio.gather(*(call(url) for _ in range(calls)))
+        return start, time.time(), [first for firsts in results for first in firsts]
+
+    return asyncio.run(run())
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+async def measure(workers: int) -> None:
+    supervisor = Supervisor(create_session, workers=workers, worker_init=warmup, report_interval=0.5)
+    url = await supervisor.start()
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers) as pool:
+        results = await asyncio.to_thread(pool.starmap, client_process, [(url, CALLS_PER_WORKER)] * workers)
+    await supervisor.shutdown()
+
+    elapsed = max(end for _, end, _ in results) - min(start for start, _, _ in results)
+    firsts = [first for _, _, result in results for first in result]
+    turn_p95 = supervisor.metrics.percentiles(TURN_TOTAL)["p95"]
+    print(f"{workers} worker(s), {workers * CALLS_PER_WORKER:4d} concurrent calls: {len(firsts) / elapsed:6.1f} turns/s, "
+          f"first text p50 {percentile(firsts, 0.5) * 1e3:5.0f} ms, p95 {percentile(firsts, 0.95) * 1e3:5.0f} ms, "
+          f"turn p95 {turn_p95 * 1e3:5.0f} ms in the workers ({supervisor.stats.gateway.turns} turns reported)")
+
+
+async def main():
+    counts = [int(arg) for arg in sys.argv[1:]]
+    if not counts:
+        cores = os.cpu_count() or 1
+        counts = [n for n in (1, 2, 4, 8, 16) if n <= max(cores // 2, 1)]
+    for workers in counts:
+        await measure(workers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
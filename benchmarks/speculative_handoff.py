@@ -0,0 +1,79 @@
+"""Turn latency with and without speculative execution of the next agent.
+
+`customer_name_inquiry` streams its structured output (15 ms per 4-character chunk), the
+handoff target `financial_support_inquiry` needs 300 ms to its first token. Speculation
+starts the target as soon as `HandoffPending` decides the transfer, so its first token
+follows the handoff almost immediately.
+
+    python benchmarks/speculative_handoff.py
+"""
+import asyncio
+import time
+
+from pydantic import BaseModel
+
+from voice_agent_flow.agents import MultiAgentRunner
+from voice_agent_flow.agents.agent_node import AgentNode
+from voice_agent_flow.agents.events import AgentTextStream, EventType
+
+from fakes import handoff_model, text_model
+
+ARGS = '{"name_checked": true, "note": "客户确认了姓名，语气平稳，可以继续进行资金需求的询问"}'
+
+
+class CustomerName(BaseModel):
+    name_checked: bool
+    note: str = ""
+
+    def transfer(self):
+        return "financial_support_inquiry" if self.name_checked else "hangup"
+
+
+class FinancialSupportStatus(BaseModel):
+    require_financial_support: bool
+
+    def transfer(self):
+        return "hangup"
+
+
+def agents() -> dict[str, AgentNode]:
+    return {
+        "customer_name_inquiry": AgentNode(
+            name="customer_name_inquiry",
+            model=handoff_model(ARGS, first_token_delay=0.3, chunk=4, chunk_delay=0.015),
+            instruction="-",
+            task_cls=CustomerName,
+        ),
+        "financial_support_inquiry": AgentNode(
+            name="financial_support_inquiry",
+            model=text_model(list("您好，这边是易鑫集团的金融顾问，您最近是有资金需求吗？"), first_token_delay=0.3, token_delay=0.01),
+            instruction="-",
+            task_cls=FinancialSupportStatus,
+        ),
+    }
+
+
+async def turn(speculative: bool) -> tuple[float, float, MultiAgentRunner]:
+    runner = MultiAgentRunner(agents(), "customer_name_inquiry", speculative=speculative)
+    start = time.perf_counter()
+    handoff = first_text = None
+    async for result in runner.run(prompt="是我"):
+        if result.event_type == EventType.AgentHandoff:
+            handoff = time.perf_counter()
+        elif isinstance(result.event, AgentTextStream) and first_text is None:
+            first_text = time.perf_counter()
+    return first_text - handoff, time.perf_counter() - start, runner
+
+
+async def main(runs: int = 3):
+    for speculative in (False, True):
+        results = [await turn(speculative) for _ in range(runs)]
+        gap = min(r[0] for r in results)
+        total = min(r[1] for r in results)
+        stats = results[-1][2].speculation_stats
+        print(f"speculative={speculative!s:>5}: handoff -> first text {gap * 1e3:4.0f} ms, turn {total * 1e3:4.0f} ms"
+              + (f", hit rate {stats.hit_rate:.0%}, saved {stats.saved * 1e3:.0f} ms" if speculative else ""))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
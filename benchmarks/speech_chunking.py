@@ -0,0 +1,89 @@
+"""Time to first speakable chunk, and per-delta cost of `SpeechChunker`.
+
+A fake model streams a Chinese answer token by token (first token after 200 ms, then
+one token every 15 ms). Compared with re-buffering until a full sentence, as a TTS
+gateway does without a chunking stage.
+
+    python benchmarks/speech_chunking.py
+"""
+import asyncio
+import re
+import time
+
+from pydantic_ai import Agent
+
+from voice_agent_flow.agents import SingleAgentRunner, SpeechChunker
+from voice_agent_flow.agents.events import AgentResult, AgentTextStream, EventType
+
+from fakes import text_model
+
+ANSWER = "好的李先生，您的贷款申请我们已经收到了，审核大概需要三个工作日，结果会短信通知您。请问还有其他问题吗？"
+# roughly two characters per token
+TOKENS = [ANSWER[i:i + 2] for i in range(0, len(ANSWER), 2)]
+SENTENCE_END = re.compile(r"[。？！]")
+
+
+def agent() -> Agent:
+    return Agent(text_model(TOKENS, first_token_delay=0.2, token_delay=0.015), output_type=str)
+
+
+async def sentence_rebuffer(results):
+    buffer = ""
+    async for result in results:
+        if isinstance(result.event, AgentTextStream):
+            buffer += result.event.delta
+            match = SENTENCE_END.search(buffer)
+            if match:
+                yield buffer[:match.end()]
+                buffer = buffer[match.end():]
+    if buffer:
+        yield buffer
+
+
+async def chunked(results):
+    async for result in SpeechChunker().stream(results):
+        if isinstance(result.event, AgentTextStream):
+            yield result.event.delta
+
+
+async def time_to_first_chunk(stage) -> tuple[float, list[str]]:
+    start = time.perf_counter()
+    first = None
+    chunks = []
+    async for chunk in stage(SingleAgentRunner(agent()).run(prompt="hi")):
+        if first is None:
+            first = time.perf_counter() - start
+        chunks.append(chunk)
+    return first, chunks
+
+
+async def per_delta_cost(deltas: int = 100000) -> None:
+    results = [AgentResult(event=AgentTextStream(delta=d), event_type=EventType.AgentTextStream)
+               for d in (TOKENS * (deltas // len(TOKENS) + 1))[:deltas]]
+
+    async def source():
+        for result in results:
+            yield result
+
+    start = time.perf_counter()
+    async for _ in source():
+        pass
+    baseline = time.perf_counter() - start
+
+    for max_wait in (None, 0.3):
+        start = time.perf_counter()
+        async for _ in SpeechChunker(max_wait=max_wait).stream(source()):
+            pass
+        elapsed = time.perf_counter() - start
+        print(f"chunker (max_wait={max_wait}): {(elapsed - baseline) / deltas * 1e6:.2f} us per delta")
+
+
+async def main():
+    for name, stage in (("sentence re-buffer", sentence_rebuffer), ("SpeechChunker", chunked)):
+        first, chunks = await time_to_first_chunk(stage)
+        print(f"{name:>18}: first chunk after {first * 1e3:.0f} ms, {len(chunks)} chunks, first={chunks[0]!r}")
+    await per_delta_cost()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
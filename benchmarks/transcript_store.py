@@ -0,0 +1,78 @@
+"""Append throughput and resume time of `SegmentLogStore`.
+
+Many concurrent sessions append from the asyncio loop while a probe task measures
+loop lag, once without a store as a baseline and once with one attached. The appends
+only enqueue; the extra lag with a store is the writer thread's GIL share for encoding
+the records, largest when loop and writer share one core. Then one call is rebuilt with
+`TranscriptReader`.
+
+    python benchmarks/transcript_store.py
+"""
+import asyncio
+import tempfile
+import time
+
+import voice_agent_flow.agents  # noqa: F401  (import order: agents before memory)
+from voice_agent_flow.memory import Memory, SegmentLogStore, TranscriptReader
+
+
+async def session(store: SegmentLogStore | None, call_id: str, turns: int):
+    memory = Memory(compact=True)
+    if store is not None:
+        memory.attach_store(store, call_id)
+    for i in range(turns):
+        memory.add_user(f"嗯，第{i}轮我说一下")
+        memory.add_assistant(f"好的，第{i}轮的回复")
+        await asyncio.sleep(0)
+
+
+async def lag_probe(stop: asyncio.Event, interval: float = 0.001):
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run_sessions(store: SegmentLogStore | None, sessions: int, turns: int):
+    stop = asyncio.Event()
+    probe = asyncio.create_task(lag_probe(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(session(store, f"call-{i}", turns) for i in range(sessions)))
+    appended = time.perf_counter() - start
+    if store is not None:
+        await store.aflush()
+    durable = time.perf_counter() - start
+    stop.set()
+    return appended, durable, await probe
+
+
+async def run(sessions: int = 1000, turns: int = 20):
+    total = sessions * turns * 2
+    print(f"{total} appends from {sessions} sessions")
+
+    _, _, baseline_lag = await run_sessions(None, sessions, turns)
+    print(f"  no store      : worst loop lag {baseline_lag * 1e3:.2f} ms")
+
+    directory = tempfile.mkdtemp(prefix="transcripts-")
+    store = SegmentLogStore(directory)
+    appended, durable, lag = await run_sessions(store, sessions, turns)
+    store.close()
+    print(f"  SegmentLogStore: worst loop lag {lag * 1e3:.2f} ms")
+    print(f"    enqueued: {total / appended:10.0f} appends/s")
+    print(f"    durable : {total / durable:10.0f} appends/s (written + fsynced)")
+
+    start = time.perf_counter()
+    reader = TranscriptReader(directory)
+    index_time = time.perf_counter() - start
+    start = time.perf_counter()
+    memory = reader.load_memory(f"call-{sessions // 2}")
+    load_time = time.perf_counter() - start
+    reader.close()
+    print(f"  index load: {index_time * 1e3:.2f} ms, "
+          f"resume one call ({len(memory.messages)} messages): {load_time * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,36 @@
+import pytest
+from pydantic import BaseModel
+
+from voice_agent_flow.agents.single_agent_runner import _partial_transfer
+
+
+class Name(BaseModel):
+    name: str
+
+    def transfer(self) -> str:
+        return "next" if self.name else "empty"
+
+
+def _stream(model: type[BaseModel], args: str, chunk: int = 4) -> list[str | None]:
+    """`_partial_transfer` after every chunk, as the runner calls it while the arguments stream."""
+    return [_partial_transfer(model, args[:end]) for end in range(chunk, len(args) + chunk, chunk)]
+
+
+def test_wrong_number_is_not_announced_as_confirmed():
+    CustomerName = pytest.importorskip("voice_agent_flow.apps.car_loan").CustomerName
+
+    targets = _stream(CustomerName, '{"customer_name": null, "name_checked": false}')
+    assert "financial_support_inquiry" not in targets
+    assert targets[-1] == "hangup"
+
+    # one character at a time, so every prefix is seen
+    targets = _stream(CustomerName, '{"customer_name":null,"name_checked":false}', chunk=1)
+    assert set(targets) == {None, "hangup"}
+
+
+def test_opening_quote_is_not_a_finished_string():
+    assert _partial_transfer(Name, '{"name":"') is None
+    assert _partial_transfer(Name, '{"name":"a') is None
+    assert _partial_transfer(Name, '{"name":"a\\"') is None
+    assert _partial_transfer(Name, '{"name":""') == "empty"
+    assert _partial_transfer(Name, '{"name":"ab"') == "next"
@@ -1,4 +1,8 @@
 from .single_agent_runner import SingleAgentRunner
 from .multi_agent_runner import MultiAgentRunner
+from .registry import AgentRegistry
 from .message_adaptor import pmsg
-from .chat import AgentSession
\ No newline at end of file
+from .speech_chunker import SpeechChunker
+from .chat import AgentSession
+from .sinks import EventSink, ConsoleSink, CallbackSink, QueueSink
+from .snapshot import SnapshotError, register_tool_state
@@ -1,9 +1,15 @@
 from dataclasses import dataclass, field
+from string import Template
+from typing import Mapping
 from pydantic_ai.models.openai import OpenAIChatModel
 from pydantic import BaseModel
 
+from voice_agent_flow.agents.fast_path import FastPath
+from voice_agent_flow.llms.router import ModelRouter
+
 from pydantic_ai import (
-    Agent
+    Agent,
+    RunContext
 )
 
 PROMPT_TEMPLATE = """
@@ -22,6 +28,11 @@ EXAMPLE_INSTRUCTION_TEMPLATE:str = """
 ## Example Interaction:
 {example_interaction}
 
+"""
+
+SESSION_VARIABLES_TEMPLATE:str = """
+## Session Variables:
+{session_variables}
 """
 @dataclass
 class AgentNode:
@@ -37,6 +48,22 @@ class AgentNode:
     - step_instruction: optional step specific instruction to be included in the prompt
     - examples: optional example interactions to be included in the prompt, can be a list of strings or a single string
     - tools: the tools available to the agent, represented as a list of tool definitions.
+    - next_agents: optional handoff targets of this node, used to predict the next agent (speculative mode)
+    
+    - inline_variables: fill session variables in where they appear instead of listing them last
+    - fast_path: optional pattern table that answers trivial user utterances without the model,
+      see `voice_agent_flow.agents.fast_path`
+    - fallback_models: optional models used in order when the endpoint of `model` breaches its
+      latency SLO or fails, see `voice_agent_flow.llms.router`
+    
+    Instructions, step instruction and examples may contain session variables as `${name}` (`$$` for a
+    literal `$`). They are filled in from the runner's `variables` on every run, so the compiled agent
+    is shared by all sessions and only the variable values differ per call.
+    
+    The prompt is laid out for prefix caching (vLLM prefix caching, hosted prompt caching): the global
+    instruction first, shared by every step, then the step instruction and examples, then the session
+    variables. In the text `${name}` becomes the reference `<name>`, and the values are listed in a
+    trailing "Session Variables" section, so everything before it is byte-identical across calls.
     """
     
     
@@ -61,6 +88,18 @@ class AgentNode:
     """the tools available to the agent"""
     tools: list = field(default_factory=list)
     
+    """the agents `task_cls.transfer` can hand off to (flow graph edges), optional"""
+    next_agents: list[str] = field(default_factory=list)
+    
+    """substitute session variables in place, at the cost of the prompt prefix shared across calls"""
+    inline_variables: bool = False
+    
+    """rules building `task_cls` from short user answers without a model run, optional"""
+    fast_path: FastPath | None = None
+    
+    """the models to fall back to, in order, when `model`'s endpoint is unhealthy"""
+    fallback_models: list = field(default_factory=list)
+    
     def __post_init__(self):
         self.full_instruction = self.instruction
         
@@ -77,16 +116,63 @@ class AgentNode:
             self.full_instruction += EXAMPLE_INSTRUCTION_TEMPLATE.format(
                 example_interaction=example_str
             )
+        
+        # session variables (`${name}`) used by the instructions, filled in per run
+        self.template = Template(self.full_instruction)
+        self.variables = frozenset(self.template.get_identifiers())
+        if self.variables and not self.inline_variables:
+            # static text with references, the values follow in the session section
+            self.full_instruction = self.template.safe_substitute({name: f"<{name}>" for name in self.variables})
     
-    def create(self) -> Agent:
+    @property
+    def cache_key(self) -> tuple:
+        """What the compiled agent (without tools) depends on, see `voice_agent_flow.agents.registry`."""
+        return (self.name, id(self.model), tuple(map(id, self.fallback_models)), self.full_instruction, self.task_cls)
+    
+    def create(self, tools: bool = True) -> Agent:
         
         return Agent(
             name = self.name,
-            model = self.model, 
+            model = ModelRouter([self.model, *self.fallback_models]) if self.fallback_models else self.model, 
             output_type = self.task_cls | str,
-            instructions = self.full_instruction, 
-            tools = self.tools
+            instructions = self._instructions(), 
+            tools = self.tools if tools else []
         )
+    
+    def _instructions(self):
+        if not self.variables:
+            return self.full_instruction
+        if self.inline_variables:
+            return _render(self.template, self.name)
+        # pydantic_ai joins the parts in order: static prefix, then the per-session section
+        return [self.full_instruction, _render_session_variables(sorted(self.variables), self.name)]
+
+
+def _render(template: Template, agent_name: str):
+    """Instructions of a templated node, with the session variables passed as run `deps`."""
+    
+    def instructions(ctx: RunContext[Mapping[str, str]]) -> str:
+        try:
+            return template.substitute(ctx.deps or {})
+        except KeyError as exc:
+            raise ValueError(f"Session variable {exc} is not set (agent '{agent_name}').") from None
+    
+    return instructions
+
+
+def _render_session_variables(names: list[str], agent_name: str):
+    """The trailing "Session Variables" section, listing `names` in a fixed order."""
+    
+    def instructions(ctx: RunContext[Mapping[str, str]]) -> str:
+        values = ctx.deps or {}
+        missing = [name for name in names if name not in values]
+        if missing:
+            raise ValueError(f"Session variable '{missing[0]}' is not set (agent '{agent_name}').")
+        return SESSION_VARIABLES_TEMPLATE.format(
+            session_variables="\n".join(f"- {name}: {values[name]}" for name in names)
+        )
+    
+    return instructions
 
 class DoHangUp(BaseModel):
     '''Complete signal for hangup, no more conversation needed.
@@ -1,32 +1,82 @@
+import logging
+
 from voice_agent_flow.agents.events import (
     AgentTextStream,
     ToolCallsOutput,
     ToolCallResult,
     AgentHandoff,
-    HangupSignal
+    HangupSignal,
+    TurnCancelled,
 )
 
 from voice_agent_flow.agents.multi_agent_runner import MultiAgentRunner
-from voice_agent_flow.memory import Message, Memory 
+from voice_agent_flow.agents.sinks import ConsoleSink, EventSink
+from voice_agent_flow.agents.snapshot import dump_session, load_session
+from voice_agent_flow.agents.speech_chunker import SpeechChunker
+from voice_agent_flow.agents.transcript import TranscriptBuffer
+from voice_agent_flow.memory import Memory, HistoryPolicy
+
+logger = logging.getLogger(__name__)
+
+CANCELLED_TOOL_RESULT = "Tool call cancelled: the caller interrupted before it finished."
 
 class AgentSession:
 
     def __init__(self, 
                  runner: MultiAgentRunner, 
-                 memory: Memory = None):
+                 memory: Memory = None,
+                 history_policy: HistoryPolicy = None,
+                 track_playback: bool = False,
+                 speech_chunker: SpeechChunker = None,
+                 sinks: list[EventSink] | None = None):
         self.memory = memory if memory is not None else Memory()
         self.runner = runner
+        if history_policy is not None:
+            self.runner.history_policy = history_policy
         self.finished = False
         self._new_messages = None
         self._turn_handoff = None
         self._turn_message = None
+        self._turn_cancelled = False
+        
+        # with `track_playback`, the assistant text of a turn is committed only up to 
+        # the offset the voice layer reported as played (see `report_playback`)
+        self.track_playback = track_playback
+        self._transcript: TranscriptBuffer | None = None
+        
+        # regroups text deltas into speakable chunks (offsets then refer to chunk starts)
+        self.speech_chunker = speech_chunker
+        
+        # every result of a turn goes to the sinks, see `voice_agent_flow.agents.sinks`;
+        # the console by default, `[]` for none
+        self.sinks: list[EventSink] = list(sinks) if sinks is not None else [ConsoleSink()]
         
     def set_agent(self, agent_name:str):
         self.runner.set_agent(agent_name)
         
+    def set_variables(self, **variables: str):
+        """Per-call facts (customer name, phone number, ...) for the `${name}` variables of the instructions."""
+        self.runner.set_variables(**variables)
+        
     def set_memory(self, memory: Memory):
         self.memory = memory
         
+    def add_sink(self, sink: EventSink) -> None:
+        self.sinks.append(sink)
+        
+    async def close(self) -> None:
+        """Close the sinks; their readers stop once they have read every result."""
+        for sink in self.sinks:
+            await sink.close()
+        
+    def snapshot(self) -> bytes:
+        """Binary snapshot of the call between turns, see `voice_agent_flow.agents.snapshot`."""
+        return dump_session(self)
+    
+    def restore(self, data: bytes) -> None:
+        """Continue the call of a `snapshot` in this session, built with the same flow."""
+        load_session(self, data)
+        
     @property
     def new_messages(self):
         return self._new_messages
@@ -44,6 +94,53 @@ class AgentSession:
             "output": self._turn_message
         }
         
+    @property
+    def history_stats(self):
+        """History window stats of the last turn, one entry per agent run (tokens saved etc.)."""
+        return self.runner.history_stats
+        
+    @property
+    def turn_timings(self):
+        """Latency breakdown of the last turn (`TurnTimings`), per agent run."""
+        return self.runner.turn_timings
+        
+    @property
+    def cancelled(self):
+        """Whether the last turn was cut short by `cancel`."""
+        return self._turn_cancelled
+        
+    def cancel(self, reason: str = "barge_in") -> bool:
+        """
+        Barge-in: stop the running turn, closing the model stream and pending tool calls.
+        `_chat` then leaves `memory` consistent and returns; safe to call from another task.
+        """
+        return self.runner.cancel(reason)
+        
+    def report_playback(self, offset: int) -> None:
+        """
+        The voice layer played the current turn's text up to character `offset`
+        (see `AgentTextStream.offset`). Can be called at any time, also mid-generation;
+        once generation is done and everything was played, the text is committed.
+        """
+        transcript = self._transcript
+        if transcript is None:
+            return
+        transcript.mark_played(offset)
+        if transcript.fully_played:
+            self.commit_playback()
+            
+    def commit_playback(self) -> str | None:
+        """Commit the heard prefix of the pending turn to memory, returns the committed text."""
+        transcript = self._transcript
+        if transcript is None:
+            return None
+        self._transcript = None
+        heard = transcript.heard_text()
+        if heard:
+            self.memory.add_assistant(heard)
+            return heard
+        return None
+        
     @property
     def state(self):
         return self.runner.agent_state
@@ -55,20 +152,31 @@ class AgentSession:
     
     async def _chat(self):
         if self.finished:
-            print("Conversation already ended. Please start a new conversation.")
+            logger.warning("Conversation already ended. Please start a new conversation.")
             return
         
         self._new_messages = None
         self._turn_handoff = None
         self._turn_message = None
+        self._turn_cancelled = False
+        self.commit_playback()
         start_idx = len(self.memory.messages)
-        output_text = ""
+        transcript = TranscriptBuffer()
+        if self.track_playback:
+            self._transcript = transcript
+        # tool requests of this turn still waiting for their return
+        open_tool_calls = {}
         
-        async for event in self.runner.run(message_history = self.memory.to_pydantic()):
+        results = self.runner.run(memory = self.memory)
+        if self.speech_chunker is not None:
+            results = self.speech_chunker.stream(results)
+        
+        async for event in results:
             
             if isinstance(event.event, AgentTextStream):
-                output_text += event.event.delta
-                print(event.event.delta, end="")
+                event.event.offset = transcript.append(event.event.delta)
+            if self.sinks:
+                await self._emit(event)
                 
             if isinstance(event.event, ToolCallsOutput):
                 if event.event.message['tool_name'].startswith("final_result"):
@@ -79,6 +187,7 @@ class AgentSession:
                     args = event.event.message['args'],
                     tool_call_id=event.event.message['tool_call_id']
                 )
+                open_tool_calls[event.event.message['tool_call_id']] = event.event.message['tool_name']
                 
             if isinstance(event.event, ToolCallResult):
                 if event.event.message['tool_name'].startswith("final_result"):
@@ -89,28 +198,51 @@ class AgentSession:
                     content = event.event.message['content'],
                     tool_call_id=event.event.message['tool_call_id']
                 )
+                open_tool_calls.pop(event.event.message['tool_call_id'], None)
                 
             if isinstance(event.event, AgentHandoff):
-                print(event.event)
                 self._turn_handoff = {
                     "source_agent_name": event.event.message['source_agent_name'],
                     "target_agent_name": event.event.message['target_agent_name']
                 }
                 
             if isinstance(event.event, HangupSignal):
-                print(event.event)
-                print("Conversation Ended with Hangup Signal.")
                 self.finished = True
                 
-        if len(output_text) > 0:
-            self.memory.add(Message.assistant(output_text))
+            if isinstance(event.event, TurnCancelled):
+                self._turn_cancelled = True
+                # every tool request in memory needs a return, or the next turn is rejected
+                for tool_call_id, tool_name in open_tool_calls.items():
+                    self.memory.add_tool_return(
+                        tool_name = tool_name,
+                        content = CANCELLED_TOOL_RESULT,
+                        tool_call_id = tool_call_id
+                    )
+                
+        transcript.complete = True
+        if transcript.length > 0:
+            output_text = transcript.text
+            if not self.track_playback:
+                self.memory.add_assistant(output_text)
+            elif transcript.fully_played:
+                self.commit_playback()
             self._new_messages = self.memory.messages[start_idx:]
             self._turn_message = output_text
             return output_text
         
         
+    async def _emit(self, result) -> None:
+        for sink in self.sinks:
+            try:
+                await sink.emit(result)
+            except Exception:
+                logger.exception("event sink %r failed", sink)
+        
     async def chat(self, query:str) -> str | None:
-        print(f"🤖[{self.runner.current_agent.name}]...Working.")
-        self.memory.add(Message.user(query))
+        for sink in self.sinks:
+            await sink.turn_started(self.runner.current_agent.name)
+        # the previous (possibly interrupted) answer goes in before the new utterance
+        self.commit_playback()
+        self.memory.add_user(query)
         return await self._chat()
         
\ No newline at end of file
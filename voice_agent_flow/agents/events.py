@@ -1,6 +1,9 @@
-from dataclasses import dataclass
-from typing import Dict, Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
 from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
+
+from voice_agent_flow.agents.metrics import TurnTimings
 
 @dataclass
 class EventType:
@@ -14,47 +17,98 @@ class EventType:
     OtherType: str = ''
     StructuredOutput: str = 'StructuredOutput'
     HangupSignal: str = 'HangupSignal'
+    TurnCancelled: str = 'TurnCancelled'
+    HandoffLimitReached: str = 'HandoffLimitReached'
+    HandoffPending: str = 'HandoffPending'
 
-@dataclass
+# Event classes are slotted: one text event is built per streamed token.
+
+@dataclass(slots=True)
 class AgentEvent:
     status: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class AgentTextStream(AgentEvent):
     delta: str = ''
+    # character offset of `delta` in the turn's assistant text, set by `AgentSession`
+    offset: int = 0
 
-@dataclass
-class ToolCallsOutputStart(AgentEvent):
-    message: Dict = None
+@dataclass(slots=True)
+class ToolPayloadEvent(AgentEvent):
+    """
+    Tool event carrying the pydantic_ai part (`payload`) as is.
+    `message` is its JSON-able dict, built on first access only.
+    """
+    payload: Any = None
+    _message: Dict = field(default=None, init=False, repr=False, compare=False)
 
-@dataclass
-class ToolCallsOutput(AgentEvent):
-    message: Dict = None
+    @property
+    def message(self) -> Dict:
+        if self._message is None and self.payload is not None:
+            self._message = to_jsonable_python(self.payload)
+        return self._message
+
+    @message.setter
+    def message(self, value: Dict):
+        self._message = value
+
+@dataclass(slots=True)
+class ToolCallsOutputStart(ToolPayloadEvent):
+    pass
+
+@dataclass(slots=True)
+class ToolCallsOutput(ToolPayloadEvent):
+    pass
     
-@dataclass
+@dataclass(slots=True)
 class AgentHandoff(AgentEvent):
     message: Dict = None
 
-@dataclass
-class ToolCallResult(AgentEvent):
+@dataclass(slots=True)
+class HandoffPending(AgentEvent):
+    """
+    Provisional handoff, from the structured output arguments streamed so far.
+    `message` has `source_agent_name` and `target_agent_name`; the `AgentHandoff` that
+    follows is authoritative.
+    """
     message: Dict = None
 
-@dataclass
+@dataclass(slots=True)
+class ToolCallResult(ToolPayloadEvent):
+    pass
+
+@dataclass(slots=True)
 class AgentTextOutput(AgentEvent):
     message: Dict = None
     
-@dataclass
+@dataclass(slots=True)
 class StructuredOutput(AgentEvent):
     message: BaseModel = None
     
-@dataclass
+@dataclass(slots=True)
 class HangupSignal(AgentEvent):
     message: BaseModel = None
 
-@dataclass
+@dataclass(slots=True)
+class TurnCancelled(AgentEvent):
+    message: Dict = None
+
+@dataclass(slots=True)
+class HandoffLimitReached(AgentEvent):
+    """A turn stopped following handoffs: `message` has the reason ("max_handoffs" or "cycle") and the agent path."""
+    message: Dict = None
+
+@dataclass(slots=True)
+class InferenceFinish(AgentEvent):
+    """Last result of a `MultiAgentRunner` turn."""
+    timings: TurnTimings = None
+
+@dataclass(slots=True)
 class AgentResult:
     event: AgentEvent = None
     event_type: str = EventType.OtherType
     finish_reason: str = ''
     last_agent_name: str = ''
 
+# always emitted, whatever a runner is subscribed to: the runners and sessions act on them
+CONTROL_EVENT_TYPES = frozenset({EventType.AgentHandoff, EventType.HangupSignal, EventType.TurnCancelled})
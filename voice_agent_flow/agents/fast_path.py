@@ -0,0 +1,98 @@
+"""
+Rule-based fast path for trivial structured outputs.
+
+Many steps accept a bare "嗯", "是", "有的" or "收到了" as the answer that completes them,
+and the model only needs to turn it into the step's `task_cls`. A `FastPath` on the
+`AgentNode` does that with a compiled pattern table over the latest user utterance:
+
+    AgentNode(..., task_cls=FinancialSupportStatus, fast_path=FastPath({
+        r"嗯+|是的?|有的?|需要": {"require_financial_support": True},
+        r"不需要|没有": {"require_financial_support": False},
+    }))
+
+Patterns are regular expressions matched against the whole utterance with whitespace and
+punctuation removed; the first matching pattern wins. Its fields build the `task_cls`
+instance (or the rule gives the output instance itself), which the runner hands off
+with exactly like a model output. When nothing matches, or the utterance is longer than
+`max_chars`, the model runs as usual.
+
+The fast path only answers the first agent of a turn, and only once the agent has spoken
+in its step (the utterance answers its question); a handoff never chains through more
+steps on the same utterance.
+
+With `shadow=True` the decision is not used: the model runs, and its output is compared
+with what the fast path would have produced. `stats.precision` is the share of shadow
+decisions the model agreed with, `stats.hit_rate` the share of utterances matched. Share
+one `FastPath` between the sessions of a flow to aggregate them.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Mapping
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# removed before matching
+_NOISE = re.compile(r"[\s，。！？、,.!?~～…]+")
+
+
+@dataclass(slots=True)
+class FastPathStats:
+    lookups: int = 0
+    hits: int = 0
+    # shadow mode: decisions compared with the model's output, and how many it agreed with
+    compared: int = 0
+    agreed: int = 0
+
+    @property
+    def hit_rate(self) -> float | None:
+        return self.hits / self.lookups if self.lookups else None
+
+    @property
+    def precision(self) -> float | None:
+        return self.agreed / self.compared if self.compared else None
+
+
+class FastPath:
+    """Pattern table from user utterance to structured output, see the module docstring."""
+
+    def __init__(
+        self,
+        rules: Mapping[str, Mapping[str, Any] | BaseModel],
+        shadow: bool = False,
+        max_chars: int = 12,
+    ):
+        self.rules = list(rules.values())
+        self.shadow = shadow
+        self.max_chars = max_chars
+        self.stats = FastPathStats()
+        # one alternation, the matching group names the rule
+        self._table = re.compile("|".join(f"(?P<r{i}>{pattern})" for i, pattern in enumerate(rules)))
+
+    def decide(self, task_cls: type[BaseModel], utterance: str) -> BaseModel | None:
+        """The output for `utterance`, None if no rule matches."""
+        self.stats.lookups += 1
+        text = _NOISE.sub("", utterance)
+        if not text or len(text) > self.max_chars:
+            return None
+        match = self._table.fullmatch(text)
+        if match is None:
+            return None
+
+        self.stats.hits += 1
+        rule = self.rules[int(match.lastgroup[1:])]
+        return rule if isinstance(rule, BaseModel) else task_cls(**rule)
+
+    def compare(self, decision: BaseModel, output: Any) -> bool:
+        """Shadow mode: record whether the model's `output` agrees with the fast path `decision`."""
+        agreed = type(output) is type(decision) and output.model_dump() == decision.model_dump()
+        self.stats.compared += 1
+        if agreed:
+            self.stats.agreed += 1
+        else:
+            logger.debug("fast path decided %r, the model %r", decision, output)
+        return agreed
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from dataclasses import replace
 from datetime import datetime, timezone
 from typing import Any, Mapping
 
@@ -15,12 +16,15 @@ from pydantic_ai.messages import (
 PydanticMessage = ModelRequest | ModelResponse
 
 
-def parse_timestamp(value: datetime | str | None) -> datetime:
+def parse_timestamp(value: datetime | str | float | None) -> datetime:
     """Normalize timestamps into timezone-aware datetimes (UTC by default)."""
     
     if value is None:
         return datetime.now(timezone.utc)
 
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc)
+
     if isinstance(value, datetime):
         return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
 
@@ -38,7 +42,7 @@ class PydanticMessageAdaptor:
     def user(
         self,
         content: str,
-        timestamp: datetime | str | None = None,
+        timestamp: datetime | str | float | None = None,
     ) -> ModelRequest:
         ts = parse_timestamp(timestamp)
         return ModelRequest(parts=[UserPromptPart(content=content, timestamp=ts)])
@@ -46,7 +50,7 @@ class PydanticMessageAdaptor:
     def assistant(
         self,
         content: str,
-        timestamp: datetime | str | None = None,
+        timestamp: datetime | str | float | None = None,
     ) -> ModelResponse:
         ts = parse_timestamp(timestamp)
         return ModelResponse(parts=[TextPart(content=content)], timestamp=ts)
@@ -56,7 +60,7 @@ class PydanticMessageAdaptor:
         tool_name: str,
         args: str,
         tool_call_id: str = "fake",
-        timestamp: datetime | str | None = None,
+        timestamp: datetime | str | float | None = None,
     ) -> ModelResponse:
         ts = parse_timestamp(timestamp)
         return ModelResponse(
@@ -75,7 +79,7 @@ class PydanticMessageAdaptor:
         tool_name: str,
         content: str,
         tool_call_id: str = "fake",
-        timestamp: datetime | str | None = None,
+        timestamp: datetime | str | float | None = None,
     ) -> ModelRequest:
         ts = parse_timestamp(timestamp)
         return ModelRequest(
@@ -92,7 +96,7 @@ class PydanticMessageAdaptor:
     def system(
         self,
         content: str,
-        timestamp: datetime | str | None = None,
+        timestamp: datetime | str | float | None = None,
     ) -> ModelRequest:
         ts = parse_timestamp(timestamp)
         return ModelRequest(parts=[SystemPromptPart(content=content, timestamp=ts)])
@@ -135,24 +139,33 @@ class PydanticMessageAdaptor:
     def to_history(self, 
                 message_history: list[Mapping[str, Any]]) -> list[PydanticMessage]:
         """Convert then merge adjacent same-kind messages for pydantic_ai."""
-        
-        history = [self.from_dict(msg) for msg in message_history]
+        return self.extend_history([], message_history)
 
-        merged_history: list[PydanticMessage] = []
-        for msg in history:
-            if not merged_history:
-                merged_history.append(msg)
+    def extend_history(
+        self,
+        history: list[PydanticMessage],
+        message_history: list[Mapping[str, Any]],
+    ) -> list[PydanticMessage]:
+        """Convert new dict messages and merge them onto an already converted history.
+
+        A merge replaces the last group with a copy instead of extending its parts in place,
+        so histories handed out earlier are never mutated behind the caller's back.
+        """
+        for raw in message_history:
+            msg = self.from_dict(raw)
+            if not history:
+                history.append(msg)
                 continue
 
-            last_msg = merged_history[-1]
+            last_msg = history[-1]
             if isinstance(last_msg, ModelRequest) and isinstance(msg, ModelRequest):
-                last_msg.parts.extend(msg.parts)
+                history[-1] = replace(last_msg, parts=[*last_msg.parts, *msg.parts])
             elif isinstance(last_msg, ModelResponse) and isinstance(msg, ModelResponse):
-                last_msg.parts.extend(msg.parts)
+                history[-1] = replace(last_msg, parts=[*last_msg.parts, *msg.parts])
             else:
-                merged_history.append(msg)
+                history.append(msg)
 
-        return merged_history
+        return history
 
     @staticmethod
     def _required(msg: Mapping[str, Any], key: str) -> Any:
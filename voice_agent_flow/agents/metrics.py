@@ -0,0 +1,244 @@
+"""
+Latency instrumentation for agent turns.
+
+The runners time every turn with `time.monotonic()`:
+
+- `AgentTimings`: one agent run, time to first token / first text, tool durations and the
+  time from each tool result to the next text delta,
+- `TurnTimings`: one `MultiAgentRunner.run` call, the agent runs it took and the time
+  from each handoff to the next agent's first token.
+
+Agent runs also record their prompt tokens and how many of them the model server served
+from its prefix cache (`cache_read_tokens`, OpenAI `cached_tokens`). `PrefixCacheStats`
+sums them per agent (`MultiAgentRunner.prefix_cache`), and `prefix_cache_hit_ratio` is
+reported to the sink for every run, next to its TTFT.
+
+Timings are exposed on the runners (`timings` / `turn_timings`) and on the
+`InferenceFinish` result that ends each turn. Each value is also reported to an optional
+`MetricsSink`, tagged with the agent (flow step) name. `HistogramSink` aggregates them
+into bounded log-scale histograms for p50/p95/p99:
+
+    sink = HistogramSink()
+    runner = MultiAgentRunner(agents, "opening", metrics_sink=sink)
+    ...
+    sink.percentiles(TTFT, "opening")   # {"p50": 0.41, "p95": 0.88, "p99": 1.2}
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+
+# metric names reported to a `MetricsSink`, values in seconds
+TTFT = "ttft"
+FIRST_TEXT = "first_text"
+TOOL_DURATION = "tool_duration"
+FIRST_TEXT_AFTER_TOOL = "first_text_after_tool"
+AGENT_TOTAL = "agent_total"
+HANDOFF_TO_FIRST_TOKEN = "handoff_to_first_token"
+TURN_TOTAL = "turn_total"
+# share of the prompt tokens read from the server's prefix cache, per agent run (0..1)
+PREFIX_CACHE_HIT_RATIO = "prefix_cache_hit_ratio"
+# head start of a speculative run that was used, tagged with the target agent
+SPECULATION_SAVED = "speculation_saved"
+
+
+@dataclass(slots=True)
+class AgentTimings:
+    """Timings of one agent run, monotonic timestamps and durations in seconds, and its prompt tokens."""
+
+    agent_name: str
+    started: float
+    first_token: float | None = None
+    first_text: float | None = None
+    finished: float | None = None
+    tool_durations: list[float] = field(default_factory=list)
+    # from a tool result to the next text delta
+    text_after_tool: list[float] = field(default_factory=list)
+    finish_reason: str = ''
+    # prompt tokens over all model requests of the run, as reported by the model
+    input_tokens: int = 0
+    cache_read_tokens: int = 0
+
+    @property
+    def ttft(self) -> float | None:
+        return None if self.first_token is None else self.first_token - self.started
+
+    @property
+    def time_to_first_text(self) -> float | None:
+        return None if self.first_text is None else self.first_text - self.started
+
+    @property
+    def total(self) -> float | None:
+        return None if self.finished is None else self.finished - self.started
+
+    @property
+    def prefix_cache_hit_ratio(self) -> float | None:
+        return self.cache_read_tokens / self.input_tokens if self.input_tokens else None
+
+
+@dataclass(slots=True)
+class TurnTimings:
+    """Timings of one turn, across the agent runs it took."""
+
+    started: float
+    finished: float | None = None
+    agents: list[AgentTimings] = field(default_factory=list)
+    # (target agent name, seconds from the handoff to its first token)
+    handoffs: list[tuple[str, float]] = field(default_factory=list)
+    finish_reason: str = ''
+
+    @property
+    def ttft(self) -> float | None:
+        """Time to the first token of the turn."""
+        for timings in self.agents:
+            if timings.first_token is not None:
+                return timings.first_token - self.started
+        return None
+
+    @property
+    def total(self) -> float | None:
+        return None if self.finished is None else self.finished - self.started
+
+
+@dataclass(slots=True)
+class SpeculationStats:
+    """Outcome of speculative next-agent runs, see `voice_agent_flow.agents.speculation`."""
+
+    started: int = 0
+    hits: int = 0
+    misses: int = 0
+    # seconds of head start of the runs that were used
+    saved: float = 0.0
+
+    @property
+    def hit_rate(self) -> float | None:
+        decided = self.hits + self.misses
+        return self.hits / decided if decided else None
+
+
+@dataclass(slots=True)
+class PrefixCacheStats:
+    """Prompt tokens of an agent's runs and how many were served from the prefix cache."""
+
+    runs: int = 0
+    input_tokens: int = 0
+    cache_read_tokens: int = 0
+
+    def add(self, timings: AgentTimings) -> None:
+        self.runs += 1
+        self.input_tokens += timings.input_tokens
+        self.cache_read_tokens += timings.cache_read_tokens
+
+    @property
+    def hit_ratio(self) -> float | None:
+        return self.cache_read_tokens / self.input_tokens if self.input_tokens else None
+
+
+class MetricsSink:
+    """Receives every timing value; `agent_name` is the flow step it was measured in."""
+
+    def observe(self, metric: str, value: float, agent_name: str) -> None:
+        raise NotImplementedError
+
+    def observe_agent(self, timings: AgentTimings) -> None:
+        name = timings.agent_name
+        if timings.ttft is not None:
+            self.observe(TTFT, timings.ttft, name)
+        if timings.time_to_first_text is not None:
+            self.observe(FIRST_TEXT, timings.time_to_first_text, name)
+        for value in timings.tool_durations:
+            self.observe(TOOL_DURATION, value, name)
+        for value in timings.text_after_tool:
+            self.observe(FIRST_TEXT_AFTER_TOOL, value, name)
+        if timings.total is not None:
+            self.observe(AGENT_TOTAL, timings.total, name)
+        if timings.prefix_cache_hit_ratio is not None:
+            self.observe(PREFIX_CACHE_HIT_RATIO, timings.prefix_cache_hit_ratio, name)
+
+
+class Histogram:
+    """
+    Log-scale histogram: buckets grow by `growth` (about 2.5% relative error by default),
+    so memory is bounded by the value range, not the number of observations.
+    """
+
+    __slots__ = ("growth", "_log_growth", "buckets", "count", "total", "min", "max")
+
+    def __init__(self, growth: float = 1.05):
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        # values at or below one microsecond share bucket 0
+        index = max(int(math.log(max(value, 1e-6) * 1e6) / self._log_growth), 0)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: Histogram) -> None:
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # bucket midpoint, clamped to what was actually observed
+                value = self.growth ** (index + 0.5) / 1e6
+                return min(max(value, self.min), self.max)
+        return self.max
+
+
+class HistogramSink(MetricsSink):
+    """In-process histograms per (metric, agent name)."""
+
+    def __init__(self, growth: float = 1.05):
+        self.growth = growth
+        self.histograms: dict[tuple[str, str], Histogram] = {}
+
+    def observe(self, metric: str, value: float, agent_name: str) -> None:
+        histogram = self.histograms.get((metric, agent_name))
+        if histogram is None:
+            histogram = self.histograms[(metric, agent_name)] = Histogram(self.growth)
+        histogram.add(value)
+
+    def histogram(self, metric: str, agent_name: str | None = None) -> Histogram:
+        """Histogram of `metric` for one agent, or merged over all agents."""
+        if agent_name is not None:
+            return self.histograms.get((metric, agent_name)) or Histogram(self.growth)
+        merged = Histogram(self.growth)
+        for (name, _), histogram in self.histograms.items():
+            if name == metric:
+                merged.merge(histogram)
+        return merged
+
+    def percentiles(
+        self,
+        metric: str,
+        agent_name: str | None = None,
+        quantiles: tuple[float, ...] = (0.5, 0.95, 0.99),
+    ) -> dict[str, float | None]:
+        histogram = self.histogram(metric, agent_name)
+        return {f"p{round(q * 100)}": histogram.quantile(q) for q in quantiles}
+
+    def summary(self) -> dict[tuple[str, str], dict[str, float | None]]:
+        """Count and p50/p95/p99 of every (metric, agent name)."""
+        return {
+            key: {"count": histogram.count, **self.percentiles(*key)}
+            for key, histogram in sorted(self.histograms.items())
+        }
@@ -1,12 +1,28 @@
 from __future__ import annotations
-from typing import Any, AsyncGenerator, Dict
+import time
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Dict, Iterable
 
 from pydantic_ai import Agent
 
 from voice_agent_flow.agents.events import (
-    AgentResult, AgentTextStream, EventType, AgentHandoff, HangupSignal)
+    AgentResult, AgentTextStream, EventType, AgentHandoff, HangupSignal, TurnCancelled, InferenceFinish,
+    HandoffLimitReached)
+from voice_agent_flow.agents.metrics import (
+    AgentTimings, HANDOFF_TO_FIRST_TOKEN, SPECULATION_SAVED, TURN_TOTAL, MetricsSink, PrefixCacheStats, SpeculationStats,
+    TurnTimings)
 from voice_agent_flow.agents.single_agent_runner import SingleAgentRunner
-from voice_agent_flow.agents.agent_node import AgentNode
+from voice_agent_flow.agents.speculation import Speculation
+from voice_agent_flow.agents.agent_node import AgentNode, DoHangUp
+from voice_agent_flow.agents.openers import OpenerCache, opener_pieces
+from voice_agent_flow.agents.registry import AgentRegistry, default_registry
+
+if TYPE_CHECKING:
+    from voice_agent_flow.memory import Memory
+    from voice_agent_flow.memory.window import HistoryPolicy, HistoryWindowStats
+
+
+# results a next agent can be predicted from in speculative mode
+_PREDICTION_EVENTS = (EventType.HandoffPending, EventType.ToolCallsOutputStart)
 
 
 class MultiAgentRunner:
@@ -15,72 +31,418 @@ class MultiAgentRunner:
         agents: Dict[str, AgentNode],
         entry_agent_name: str,
         ending_message: str | None = None,
+        history_policy: HistoryPolicy | None = None,
+        skip_empty_deltas: bool = False,
+        event_types: Iterable[str] | None = None,
+        metrics_sink: MetricsSink | None = None,
+        max_handoffs: int = 8,
+        early_handoff: bool = True,
+        speculative: bool = False,
+        registry: AgentRegistry | None = None,
+        variables: dict[str, str] | None = None,
+        openers: OpenerCache | None = None,
     ):
-        # multi-agent container and cache
+        # multi-agent container and cache; compiled agents are shared through the registry,
+        # the tools of a node (per-session state) belong to this runner
         self.agents = agents
+        self.registry = registry if registry is not None else default_registry
         self._agent_cache: dict[str, Agent] = {}
+        self._toolsets: dict[str, list | None] = {}
 
         # entry agent and current agent
         self.entry_agent = self.get_agent(entry_agent_name)
         self.current_agent = self.entry_agent
 
-        self.runner = SingleAgentRunner(agent=self.current_agent)
+        # session variables of templated instructions (`${name}`), shared by both runners
+        self.variables: dict[str, str] = dict(variables or {})
+        
+        self._runner_options = dict(
+            deps=self.variables,
+            skip_empty_deltas=skip_empty_deltas,
+            event_types=event_types,
+            metrics_sink=metrics_sink,
+            early_handoff=early_handoff,
+        )
+        self.runner = SingleAgentRunner(
+            agent=self.current_agent, toolsets=self.get_toolsets(entry_agent_name), **self._runner_options)
 
         self.agent_state: dict = {}
         self.ending_message = ending_message
+        
+        # history window, stats are reset every turn (one entry per agent run)
+        self.history_policy = history_policy
+        self.history_stats: list[HistoryWindowStats] = []
+        self._history_summaries: dict[int, str] = {}
+        
+        # set by `cancel`, checked before each agent run of the turn
+        self._cancel_reason: str | None = None
+        
+        # handoffs one turn may follow before it is stopped
+        self.max_handoffs = max_handoffs
+        
+        # latency of the current / last turn, reported to `metrics_sink` when it finishes
+        self.metrics_sink = metrics_sink
+        self.turn_timings: TurnTimings | None = None
+        self._handoff_at: float | None = None
+        # prompt tokens served from the model server's prefix cache, per agent
+        self.prefix_cache: dict[str, PrefixCacheStats] = {}
+        
+        # speculative mode: the predicted next agent runs on a spare runner while the
+        # current agent finishes its output, see `voice_agent_flow.agents.speculation`
+        self.speculative = speculative
+        self.speculation_stats = SpeculationStats()
+        self._speculation: Speculation | None = None
+        self._spare_runner: SingleAgentRunner | None = None
+        
+        # cached opening utterances, streamed instead of a model run on a fresh step entry,
+        # see `voice_agent_flow.agents.openers`; the current agent has not run in its step yet
+        self.openers = openers
+        self._fresh_step = True
+        # timings of the last run answered without the model (opener or `AgentNode.fast_path`)
+        self._local_timings: AgentTimings | None = None
 
     def get_agent(self, name: str) -> Agent:
         if name not in self._agent_cache:
             agent_node = self.agents[name]
-            self._agent_cache[name] = agent_node.create()
+            self._agent_cache[name] = self.registry.agent(agent_node)
         return self._agent_cache[name]
     
+    def get_toolsets(self, name: str) -> list | None:
+        """The toolsets the agent `name` runs with in this runner, built on first use."""
+        if name not in self._toolsets:
+            toolset = self.registry.toolset(self.agents[name])
+            self._toolsets[name] = [toolset] if toolset is not None else None
+        return self._toolsets[name]
+    
+    def set_variables(self, **variables: str) -> None:
+        """Set session variables, used from the next agent run on."""
+        self.variables.update(variables)
+    
+    def subscribe(self, event_types: Iterable[str] | None) -> None:
+        """Only build results of `event_types` (None: all), see `SingleAgentRunner.subscribe`."""
+        self._runner_options["event_types"] = event_types
+        for runner in (self.runner, self._spare_runner):
+            if runner is not None:
+                runner.subscribe(event_types)
+    
     def set_agent(self, name:str) -> None:
         if name not in self.agents:
             raise ValueError(f"Agent '{name}' not found in agents configuration.")
         
         agent = self.get_agent(name)
         self.current_agent = agent
-        self.runner.set_agent(agent)
+        self.runner.set_agent(agent, self.get_toolsets(name))
+        self._fresh_step = True
 
-    async def _run(
-        self,
-        prompt: str | None = None,
+    async def run(
+        self, 
+        prompt: str | None = None, 
         message_history: list | None = None,
+        memory: Memory | None = None,
     ) -> AsyncGenerator[AgentResult, None]:
+        """Run one turn, following handoffs until an agent answers, hangs up or a limit is hit.
+        
+        Pass `memory` instead of `message_history` to let the runner build the history
+        for each agent it runs, applying `history_policy` if one is set.
+        
+        Handoffs are followed in a flat loop: at most `max_handoffs` per turn, and a
+        transition (source -> target) taken twice in one turn is a cycle. Either stops the
+        turn with a `HandoffLimitReached` result; the last handoff is still applied, so the
+        next turn starts at its target.
         """
-        Run only one turn.
-        If StructuredOutput indicates handoff, switch agent and stop.
-        Voice layer is responsible for rebuilding message_history and triggering next turn.
-        """
-        async for result in self.runner.run(
-            prompt=prompt,
-            message_history=message_history,
-        ):
-            if isinstance(result.event, AgentHandoff):
-                yield self._handle_handoff(result)
-                return
-            
-            if isinstance(result.event, HangupSignal):
-                yield result
-                return 
-            
-            yield result
+        self.history_stats = []
+        self._cancel_reason = None
+        self._handoff_at = None
+        self.turn_timings = timings = TurnTimings(started=time.monotonic())
+        finish_reason = "stop"
+        
+        path = [self.current_agent.name]
+        transitions: set[tuple[str, str]] = set()
+        speculation = None
+        
+        try:
+            while True:
+                if self._cancel_reason is not None:
+                    finish_reason = "cancelled"
+                    yield AgentResult(
+                        event=TurnCancelled(
+                            message={"agent_name": self.current_agent.name, "reason": self._cancel_reason}
+                        ),
+                        event_type=EventType.TurnCancelled,
+                        finish_reason=finish_reason,
+                        last_agent_name=self.current_agent.name,
+                    )
+                    break
+                
+                opener = learn = history = decision = shadow = None
+                fast_path = self.agents[self.current_agent.name].fast_path
+                if speculation is not None:
+                    # the predicted agent is already running, continue with its results
+                    self.runner, self._spare_runner = speculation.runner, self.runner
+                    stream = speculation.results()
+                else:
+                    if self.openers is not None and self._fresh_step and prompt is None and memory is not None:
+                        opener, learn, history = self._lookup_opener(memory)
+                    if opener is None and fast_path is not None and len(path) == 1 and not self._fresh_step:
+                        # the user answered the current agent's question, maybe trivially
+                        decision = self._fast_path_decision(prompt, memory)
+                        if fast_path.shadow:
+                            shadow, decision = decision, None
+                    if opener is not None:
+                        stream = self._stream_opener(opener)
+                    elif decision is not None:
+                        stream = self._stream_fast_path(decision)
+                    else:
+                        if memory is not None:
+                            message_history = await self._history_for(memory)
+                        stream = self.runner.run(prompt=prompt, message_history=message_history)
+                self._fresh_step = False
+                
+                handoff = model_output = None
+                try:
+                    async for result in stream:
+                        if learn is not None:
+                            # only a plain text answer can become an opener
+                            if result.event_type == EventType.AgentTextStream:
+                                learn.append(result.event.delta)
+                            else:
+                                learn = None
+                        # handoff, hangup and cancellation are an agent run's last result
+                        last = isinstance(result.event, (AgentHandoff, HangupSignal, TurnCancelled))
+                        if isinstance(result.event, (AgentHandoff, HangupSignal)):
+                            model_output = result.event.message
+                        if isinstance(result.event, AgentHandoff):
+                            # either the handoff, or the ending message for a transfer to "end"
+                            result = self._handle_handoff(result)
+                            if isinstance(result.event, AgentHandoff):
+                                handoff = result.event.message
+                        elif self.speculative and result.event_type in _PREDICTION_EVENTS:
+                            await self._speculate(result, memory, message_history)
+                        
+                        if result.finish_reason:
+                            finish_reason = result.finish_reason
+                        yield result
+                        
+                        if last:
+                            break
+                finally:
+                    # close the agent run now, before the runner is reused for the next agent
+                    await stream.aclose()
+                
+                local = opener is not None or decision is not None
+                agent_timings = self._local_timings if local else self.runner.timings
+                self._record_timings(agent_timings)
+                if learn and agent_timings.finish_reason == "stop":
+                    self.openers.put(self.agents[agent_timings.agent_name], self.variables, "".join(learn), history)
+                if shadow is not None and agent_timings.finish_reason in ("stop", "handoff", "hangup"):
+                    fast_path.compare(shadow, model_output)
+                if handoff is None:
+                    break
+                
+                self._handoff_at = time.monotonic()
+                prompt = None
+                transition = (handoff["source_agent_name"], handoff["target_agent_name"])
+                path.append(transition[1])
+                
+                limit = None
+                if transition in transitions:
+                    limit = "cycle"
+                elif len(path) - 1 > self.max_handoffs:
+                    limit = "max_handoffs"
+                transitions.add(transition)
+                
+                if limit is not None:
+                    finish_reason = "handoff_limit"
+                    yield AgentResult(
+                        event=HandoffLimitReached(
+                            message={"reason": limit, "path": path, "max_handoffs": self.max_handoffs}
+                        ),
+                        event_type=EventType.HandoffLimitReached,
+                        finish_reason=finish_reason,
+                        last_agent_name=transition[0],
+                    )
+                    break
+                
+                speculation = self._confirm_speculation(transition[1], memory)
+        finally:
+            self._drop_speculation()
+        
+        if finish_reason == "handoff" and timings.agents:
+            # the agent handed off to finished the turn
+            finish_reason = timings.agents[-1].finish_reason
+        timings.finished = time.monotonic()
+        timings.finish_reason = finish_reason
+        last_agent_name = self.current_agent.name
+        if self.metrics_sink is not None:
+            self.metrics_sink.observe(TURN_TOTAL, timings.total, timings.agents[0].agent_name 
+                                      if timings.agents else last_agent_name)
+        
+        yield AgentResult(
+            event=InferenceFinish(timings=timings),
+            event_type=EventType.InferenceFinish,
+            finish_reason=finish_reason,
+            last_agent_name=last_agent_name,
+        )
             
-    async def run(
-        self, prompt: str | None = None, message_history: list | None = None
-    ) -> AsyncGenerator[AgentResult, None]:
-        """Run multiple turns until handoff or hangup."""
-        rerun = False
+    def cancel(self, reason: str = "barge_in") -> bool:
+        """Cancel the running turn (barge-in), including any agent it would still hand off to."""
+        self._cancel_reason = reason
+        self._drop_speculation()
+        return self.runner.cancel(reason)
+    
+    async def _speculate(self, result: AgentResult, memory: Memory | None, message_history: list | None) -> None:
+        """Start the predicted next agent, if `result` predicts one that can run speculatively."""
+        current = self.agents[self.current_agent.name]
+        if result.event_type == EventType.HandoffPending:
+            target = result.event.message["target_agent_name"]
+        elif len(current.next_agents) == 1 and result.event.payload.tool_name.startswith("final_result"):
+            target = current.next_agents[0]
+        else:
+            return
+        
+        if self._speculation is not None:
+            if self._speculation.target == target:
+                return
+            # the partial output contradicts the flow graph prediction
+            self._drop_speculation()
+        
+        node = self.agents.get(target)
+        if node is None or target == current.name or node.tools:
+            return
+        if self.openers is not None and self.openers.peek(node, self.variables) is not None:
+            # the target will most likely open with its cached utterance
+            return
+        
+        runner = self._spare_runner
+        if runner is None:
+            runner = self._spare_runner = SingleAgentRunner(agent=self.get_agent(target), **self._runner_options)
+        # a speculative run reports its timings only once it is confirmed
+        runner.metrics_sink = None
+        runner.set_agent(self.get_agent(target), self.get_toolsets(target))
+        if memory is not None:
+            message_history = await self._history_for(memory, target)
+        
+        self._speculation = Speculation(
+            runner, target, message_history, len(memory.messages) if memory is not None else None)
+        self.speculation_stats.started += 1
+        
+    def _confirm_speculation(self, target: str, memory: Memory | None) -> Speculation | None:
+        """The running speculation if it ran `target` on the current history, otherwise drop it."""
+        speculation = self._speculation
+        if speculation is None:
+            return None
+        self._speculation = None
+        
+        if speculation.target != target or (
+                memory is not None and len(memory.messages) != speculation.history_size):
+            speculation.cancel()
+            self.speculation_stats.misses += 1
+            return None
+        
+        # the run counts from here on; one that already finished is reported now
+        speculation.runner.metrics_sink = self.metrics_sink
+        if speculation.done and self.metrics_sink is not None and speculation.runner.timings is not None:
+            self.metrics_sink.observe_agent(speculation.runner.timings)
         
-        async for result in self._run(prompt=prompt, message_history=message_history):
-            if isinstance(result.event, AgentHandoff):
-                rerun = True
-            yield result
+        saved = self._handoff_at - speculation.started
+        self.speculation_stats.hits += 1
+        self.speculation_stats.saved += saved
+        if self.metrics_sink is not None:
+            self.metrics_sink.observe(SPECULATION_SAVED, saved, target)
+        return speculation
+    
+    def _lookup_opener(self, memory: Memory) -> tuple[str | None, list | None, list | None]:
+        """
+        The cached opener of the current agent on a fresh entry, else a list to learn its answer
+        into and the history it answers.
+        """
+        if not self.openers.is_fresh_entry(memory.messages):
+            return None, None, None
+        node = self.agents[self.current_agent.name]
+        # a copy, the memory grows during the run
+        history = list(memory.messages)
+        opener = self.openers.get(node, self.variables, history)
+        if opener is not None:
+            return opener, None, None
+        return (None, [], history) if self.openers.learn else (None, None, None)
+    
+    async def _stream_opener(self, opener: str) -> AsyncGenerator[AgentResult, None]:
+        """The opener as text results, in place of an agent run."""
+        agent_name = self.current_agent.name
+        now = time.monotonic()
+        self._local_timings = timings = AgentTimings(
+            agent_name=agent_name, started=now, first_token=now, first_text=now, finish_reason="opener")
+        for piece in opener_pieces(opener):
+            yield AgentResult(
+                event=AgentTextStream(delta=piece),
+                event_type=EventType.AgentTextStream,
+                last_agent_name=agent_name,
+            )
+        timings.finished = time.monotonic()
+        if self.metrics_sink is not None:
+            self.metrics_sink.observe_agent(timings)
+    
+    def _fast_path_decision(self, prompt: str | None, memory: Memory | None) -> Any:
+        """The current agent's fast path output for the latest user utterance, if a rule matches it."""
+        utterance = prompt
+        if utterance is None and memory is not None and memory.messages:
+            message = memory.messages[-1]
+            if getattr(message, "role", None) == "user":
+                utterance = message.content
+        if not utterance:
+            return None
+        node = self.agents[self.current_agent.name]
+        return node.fast_path.decide(node.task_cls, utterance)
+    
+    async def _stream_fast_path(self, output: Any) -> AsyncGenerator[AgentResult, None]:
+        """The fast path output as the agent run's final result, like a model's structured output."""
+        agent_name = self.current_agent.name
+        now = time.monotonic()
+        self._local_timings = timings = AgentTimings(
+            agent_name=agent_name, started=now, first_token=now, finish_reason="fast_path")
+        if isinstance(output, DoHangUp):
+            result = AgentResult(event=HangupSignal(message=output), event_type=EventType.HangupSignal,
+                                 finish_reason="hangup", last_agent_name=agent_name)
+        else:
+            result = AgentResult(event=AgentHandoff(message=output), event_type=EventType.AgentHandoff,
+                                 finish_reason="handoff", last_agent_name=agent_name)
+        timings.finished = time.monotonic()
+        if self.metrics_sink is not None:
+            self.metrics_sink.observe_agent(timings)
+        yield result
+    
+    def _drop_speculation(self) -> None:
+        if self._speculation is not None:
+            self._speculation.cancel()
+            self._speculation = None
+            self.speculation_stats.misses += 1
+                
+    def _record_timings(self, agent_timings) -> None:
+        turn = self.turn_timings
+        turn.agents.append(agent_timings)
+        if agent_timings.input_tokens:
+            stats = self.prefix_cache.get(agent_timings.agent_name)
+            if stats is None:
+                stats = self.prefix_cache[agent_timings.agent_name] = PrefixCacheStats()
+            stats.add(agent_timings)
+        if self._handoff_at is not None and agent_timings.first_token is not None:
+            # a speculative run may have produced its first token before the handoff
+            elapsed = max(agent_timings.first_token - self._handoff_at, 0.0)
+            turn.handoffs.append((agent_timings.agent_name, elapsed))
+            if self.metrics_sink is not None:
+                self.metrics_sink.observe(HANDOFF_TO_FIRST_TOKEN, elapsed, agent_timings.agent_name)
+        self._handoff_at = None
             
-        if rerun:
-            async for result in self.run(message_history=message_history):
-                yield result
+    async def _history_for(self, memory: Memory, agent_name: str | None = None) -> list:
+        """History for the current (or the named) agent, windowed by `history_policy` when set."""
+        if self.history_policy is None:
+            return memory.to_pydantic()
+        
+        history, stats = await self.history_policy.apply(
+            memory, agent_name or self.current_agent.name, self._history_summaries
+        )
+        self.history_stats.append(stats)
+        return history
         
 
     def _handle_handoff(self, result: AgentResult) -> AgentResult:
@@ -102,6 +464,8 @@ class MultiAgentRunner:
                     delta=self.ending_message or "感谢您的接听，祝您生活愉快，再见！"
                 ),
                 event_type=EventType.AgentTextStream,
+                finish_reason="end",
+                last_agent_name=self.current_agent.name,
             )
 
         result.event.message = {
@@ -110,7 +474,8 @@ class MultiAgentRunner:
         }
 
         self.current_agent = self.get_agent(handoff_target)
-        self.runner.set_agent(self.current_agent)
+        self.runner.set_agent(self.current_agent, self.get_toolsets(handoff_target))
+        self._fresh_step = True
 
         if hasattr(output, "model_dump"):
             self.agent_state.update(output.model_dump())
@@ -0,0 +1,149 @@
+"""
+Cached opening utterances.
+
+The first thing an agent says when its step starts is nearly the same on every call:
+the greeting of the entry agent, or the question a step opens with after a handoff
+("您好，这边是易鑫集团的金融顾问，您最近是有资金需求吗？"). With an `OpenerCache` the
+`MultiAgentRunner` streams that utterance right away as `AgentTextStream` results instead
+of waiting for a model round trip:
+
+    openers = OpenerCache({"customer_name_inquiry": "喂，您好，请问是${customer_name}吗？"})
+    runner = MultiAgentRunner(agents, "customer_name_inquiry", openers=openers, variables=...)
+
+An opener is used on a fresh step entry only: the agent has not run in its step yet
+(conversation start, `set_agent`, or a handoff in this turn), and the history since the
+last assistant text holds only short user utterances without a question (see
+`is_fresh_entry`), which the opener can answer without a model.
+
+Openers come from two sources:
+
+- configured templates per agent, `${name}` filled from the session variables,
+- learned (off by default): with `learn=True` the text of a fresh entry the model answered
+  with text only is kept for the agent, the values of the variables its instructions use
+  and the conversation so far, and is reused by later sessions with the same history. The
+  answer may repeat what the caller said, so it is never served on another history.
+  Learned openers expire after `ttl` seconds and at most `max_size` are kept (least
+  recently used are evicted first).
+
+One cache can be shared by all sessions of a flow; `stats` counts hits and misses.
+"""
+from __future__ import annotations
+
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from string import Template
+from typing import Any, Mapping
+
+from voice_agent_flow.agents.agent_node import AgentNode
+
+# utterances the opener is streamed in, cut after sentence / clause punctuation
+_PIECE = re.compile(r".+?(?:[。？！，、；…!?,;]+|$)", re.S)
+_QUESTION = re.compile(r"[?？]")
+
+
+@dataclass(slots=True)
+class OpenerStats:
+    hits: int = 0
+    misses: int = 0
+    learned: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float | None:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+
+class OpenerCache:
+    """Opening utterances per agent and session variables, see the module docstring."""
+
+    def __init__(
+        self,
+        openers: Mapping[str, str] | None = None,
+        learn: bool = False,
+        max_size: int = 1024,
+        ttl: float | None = 3600.0,
+        max_user_chars: int = 16,
+    ):
+        self.templates = {name: Template(text) for name, text in (openers or {}).items()}
+        self.learn = learn
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_user_chars = max_user_chars
+        self.stats = OpenerStats()
+        # (node cache key, variable values, history) -> (text, expires at)
+        self._learned: OrderedDict[tuple, tuple[str, float | None]] = OrderedDict()
+
+    def get(self, node: AgentNode, variables: Mapping[str, str], messages: list[Any] = ()) -> str | None:
+        """The opener of `node` for these session variables and history, counted as a hit or miss."""
+        text = self.peek(node, variables, messages)
+        if text is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return text
+
+    def peek(self, node: AgentNode, variables: Mapping[str, str], messages: list[Any] = ()) -> str | None:
+        """Like `get`, without counting."""
+        template = self.templates.get(node.name)
+        if template is not None:
+            return template.safe_substitute(variables)
+
+        key = _key(node, variables, messages)
+        entry = self._learned.get(key)
+        if entry is None:
+            return None
+        text, expires = entry
+        if expires is not None and expires <= time.monotonic():
+            del self._learned[key]
+            self.stats.evictions += 1
+            return None
+        self._learned.move_to_end(key)
+        return text
+
+    def put(self, node: AgentNode, variables: Mapping[str, str], text: str, messages: list[Any] = ()) -> None:
+        """Keep `text` as the learned opener of `node` for these session variables and history."""
+        if node.name in self.templates:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        key = _key(node, variables, messages)
+        self._learned[key] = (text, expires)
+        self._learned.move_to_end(key)
+        self.stats.learned += 1
+        while len(self._learned) > self.max_size:
+            self._learned.popitem(last=False)
+            self.stats.evictions += 1
+
+    def is_fresh_entry(self, messages: list[Any]) -> bool:
+        """Whether the history tail after the last assistant text is only short statements by the user."""
+        for message in reversed(messages):
+            role = getattr(message, "role", None)
+            content = getattr(message, "content", None)
+            if role == "assistant" and content is not None:
+                return True
+            if role != "user" or content is None:
+                # tool calls and their results need the model
+                return False
+            text = content.strip()
+            if len(text) > self.max_user_chars or _QUESTION.search(text):
+                return False
+        return True
+
+    def clear(self) -> None:
+        self._learned.clear()
+
+    def __len__(self) -> int:
+        return len(self._learned)
+
+
+def opener_pieces(text: str) -> list[str]:
+    """`text` cut into the deltas it is streamed as."""
+    return [piece for piece in _PIECE.findall(text) if piece]
+
+
+def _key(node: AgentNode, variables: Mapping[str, str], messages: list[Any]) -> tuple:
+    history = tuple((getattr(message, "role", None), getattr(message, "content", None),
+                     getattr(message, "tool_name", None), getattr(message, "args", None)) for message in messages)
+    return (node.cache_key, tuple((name, variables.get(name)) for name in sorted(node.variables)), history)
@@ -0,0 +1,134 @@
+"""
+Process-wide registry of compiled agents.
+
+Building a pydantic_ai `Agent` compiles its output schema (`task_cls | str`), and adding a
+tool builds the tool's JSON schema and argument validator. Both depend only on the
+`AgentNode` configuration, so sessions running the same flow can share them instead of
+rebuilding them in every `MultiAgentRunner`:
+
+- `AgentRegistry.agent(node)`: the compiled `Agent` of a node, without its tools. The key
+  is `AgentNode.cache_key`, so equal nodes created by different sessions share an agent.
+- `AgentRegistry.toolset(node)`: the node's tools as a toolset for one session. Tools are
+  per-session state (e.g. `create_phone_num_check_tool` counts the calls of one phone
+  call), so the toolset is built for every session, but the tool schemas are shared
+  between functions with the same code, name and docstring.
+
+The registry is bounded and evicts the least recently used entries, so a process hosting
+many flows does not keep every compiled agent alive. Runners hold on to the agents they
+use, eviction only means the next session compiles the node again.
+
+Compiled agents hold their models, and a model's HTTP client may belong to one event
+loop. Models are keyed by identity, so a model created for another loop gets its own
+agents; `discard_model` drops the agents of a model whose loop has closed (see
+`car_loan.create_model`).
+
+`warmup` compiles a flow up front, e.g. at startup, so the first session does not pay
+for it:
+
+    registry.warmup(agents)        # the `AgentNode`s of `create_agent_session`
+"""
+from __future__ import annotations
+
+import dataclasses
+import inspect
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from pydantic_ai import Agent, Tool
+from pydantic_ai.toolsets import FunctionToolset
+
+from voice_agent_flow.agents.agent_node import AgentNode
+
+
+@dataclass(slots=True)
+class RegistryStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float | None:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+
+class AgentRegistry:
+    """Compiled agents and tool schemas keyed by node configuration, see the module docstring."""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self.stats = RegistryStats()
+        self._agents: OrderedDict[tuple, Agent] = OrderedDict()
+        self._tool_schemas: OrderedDict[tuple, object] = OrderedDict()
+
+    def agent(self, node: AgentNode) -> Agent:
+        """The compiled agent of `node`, shared by every node with the same `cache_key`."""
+        key = node.cache_key
+        agent = self._agents.get(key)
+        if agent is not None:
+            self._agents.move_to_end(key)
+            self.stats.hits += 1
+            return agent
+
+        self.stats.misses += 1
+        agent = node.create(tools=False)
+        self._put(self._agents, key, agent)
+        return agent
+
+    def toolset(self, node: AgentNode) -> FunctionToolset | None:
+        """A new toolset with the tools of `node`, None if it has none."""
+        if not node.tools:
+            return None
+        return FunctionToolset([self._tool(tool) for tool in node.tools])
+
+    def warmup(self, nodes: Iterable[AgentNode] | dict[str, AgentNode]) -> int:
+        """Compile `nodes` and their tool schemas now; returns how many agents were compiled."""
+        if isinstance(nodes, dict):
+            nodes = nodes.values()
+        misses = self.stats.misses
+        for node in nodes:
+            self.agent(node)
+            for tool in node.tools:
+                self._tool(tool)
+        return self.stats.misses - misses
+
+    def discard_model(self, model) -> int:
+        """Drop the compiled agents using `model`, as primary or fallback; returns how many."""
+        # `AgentNode.cache_key`: (name, id(model), ids of the fallback models, ...)
+        keys = [key for key in self._agents if key[1] == id(model) or id(model) in key[2]]
+        for key in keys:
+            del self._agents[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._agents.clear()
+        self._tool_schemas.clear()
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def _tool(self, tool: Tool | Callable) -> Tool:
+        if isinstance(tool, Tool):
+            return tool
+
+        # closures created by the same factory share code, name and docstring, so their schema
+        function = inspect.unwrap(tool)
+        key = (getattr(function, "__code__", function), tool.__name__, tool.__doc__)
+        schema = self._tool_schemas.get(key)
+        if schema is None:
+            schema = Tool(tool).function_schema
+            self._put(self._tool_schemas, key, schema)
+        else:
+            self._tool_schemas.move_to_end(key)
+        return Tool(tool, function_schema=dataclasses.replace(schema, function=tool))
+
+    def _put(self, cache: OrderedDict, key: tuple, value) -> None:
+        cache[key] = value
+        while len(cache) > self.max_size:
+            cache.popitem(last=False)
+            self.stats.evictions += 1
+
+
+# shared by every `MultiAgentRunner` that is not given its own registry
+default_registry = AgentRegistry()
@@ -1,5 +1,10 @@
+import asyncio
+import inspect
 import logging
-from typing import AsyncGenerator
+import time
+import typing
+from types import UnionType
+from typing import Any, AsyncGenerator, Callable, Iterable
 
 
 
@@ -22,14 +27,18 @@ from voice_agent_flow.agents.events import (
     AgentResult,
     EventType,
     StructuredOutput,
-    HangupSignal
+    HangupSignal,
+    TurnCancelled,
+    HandoffPending,
+    CONTROL_EVENT_TYPES
 )
+from voice_agent_flow.agents.metrics import AgentTimings, MetricsSink
 
 
 from .agent_node import DoHangUp
-from pydantic_core import to_jsonable_python
 
 from pydantic import BaseModel
+from pydantic_core import from_json
 
 """
 Voice Agent Event Adapter for pydantic_ai
@@ -91,20 +100,29 @@ Event Types:
 
 Handler Matrix:
 ┌─────────────────────┬──────────────────────┬─────────────────────────┐
-│ Event               │ Condition            │ Handler                 │
+│ Event               │ Part / Delta         │ Handler                 │
 ├─────────────────────┼──────────────────────┼─────────────────────────┤
-│ PartStartEvent      │ ToolCallPart         │ _handle_tool_arg_start  │
-│ PartStartEvent      │ TextPart             │ _handle_text_start      │
-│ PartDeltaEvent      │ TextPartDelta        │ _handle_text_delta      │
-│ PartDeltaEvent      │ ToolCallPartDelta    │ _handle_tool_arg_delta  │
-│ PartEndEvent        │ ToolCallPart         │ _handle_tool_arg_end    │
-│ PartEndEvent        │ TextPart             │ _handle_text_end        │
-│ FunctionToolCall    │ -                    │ _handle_tool_call       │
-│ FunctionToolResult  │ -                    │ _handle_tool_result     │
-│ FinalResultEvent    │ -                    │ _handle_final_result    │
-│ AgentRunResultEvent │ output is BaseModel  │ _handle_agent_run_result│
+│ PartStartEvent      │ ToolCallPart         │ on_tool_arg_start       │
+│ PartStartEvent      │ TextPart             │ on_text_start           │
+│ PartDeltaEvent      │ TextPartDelta        │ on_text_delta           │
+│ FunctionToolCall    │ -                    │ on_tool_call_args       │
+│ FunctionToolResult  │ -                    │ on_tool_result          │
+│ FinalResultEvent    │ -                    │ on_final_result         │
+│ AgentRunResultEvent │ -                    │ on_agent_run_result     │
 └─────────────────────┴──────────────────────┴─────────────────────────┘
 
+Dispatch is keyed by (event class, part/delta class) and resolved once per key, walking
+both MROs, so the hot path for a text delta is one dict lookup. Handlers that do no I/O
+are plain functions; `register_handler` adds or replaces handlers (sync or async), e.g.
+`on_tool_arg_delta`, `on_tool_arg_end` and `on_text_end` are not registered by default.
+
+Early Handoff:
+--------------
+While the structured output tool call streams, its arguments are parsed as partial JSON.
+As soon as every field of the output model has a finished value and `transfer()` returns a
+target, a provisional `HandoffPending` event is emitted, ahead of the final `AgentHandoff`.
+Defaults never stand in for fields that have not streamed yet.
+
 
 Transfer Protocol:
 -------------------
@@ -118,25 +136,95 @@ which can be used by the voice layer to terminate the call gracefully.
 """
 
 
-is_part_start = lambda event: isinstance(event, PartStartEvent)
-is_tool_arg_start =  lambda event: isinstance(event.part, ToolCallPart)
-is_text_start = lambda event: isinstance(event.part, TextPart) or isinstance(event.part, TextPartDelta)
+is_pydantic_model = lambda obj: isinstance(obj, BaseModel)
 
-is_part_end = lambda event: isinstance(event, PartEndEvent)
-is_tool_arg_end = lambda event: isinstance(event.part, ToolCallPart)
-is_text_end = lambda event: isinstance(event.part, TextPart)
 
-is_delta = lambda event: isinstance(event, PartDeltaEvent)
-is_tool_arg_delta = lambda event: isinstance(event.delta, ToolCallPartDelta)
-is_text_delta = lambda event: isinstance(event.delta, TextPartDelta)
+def _output_models(agent: Agent) -> dict[str, type[BaseModel]]:
+    """Structured output models of `agent` by the name of their output tool."""
+    output_type = agent.output_type
+    types = typing.get_args(output_type) if typing.get_origin(output_type) in (typing.Union, UnionType) else (output_type,)
+    models = [t for t in types if isinstance(t, type) and issubclass(t, BaseModel)]
+    if len(models) == 1:
+        return {"final_result": models[0]}
+    return {f"final_result_{model.__name__}": model for model in models}
 
-is_function_tool_call_args = lambda event: isinstance(event, FunctionToolCallEvent)
-is_function_tool_result = lambda event: isinstance(event, FunctionToolResultEvent)
 
-is_final_result = lambda event: isinstance(event, FinalResultEvent)
+def _record_usage(event: AgentRunResultEvent, timings: AgentTimings) -> None:
+    """Prompt tokens of the run and how many of them the server read from its prefix cache."""
+    usage = event.result.usage
+    # a method in earlier pydantic_ai 1.x releases, a property in later ones
+    usage = usage() if inspect.ismethod(usage) else usage
+    timings.input_tokens = usage.input_tokens
+    timings.cache_read_tokens = usage.cache_read_tokens
+
+
+def _partial_transfer(model: type[BaseModel], args: str) -> str | None:
+    """
+    `transfer()` of the partial arguments `args`, None until every field of `model` has
+    streamed a finished value (defaults of missing fields could decide the wrong target).
+    """
+    if not args:
+        return None
+    try:
+        fields = from_json(args, allow_partial=True)
+    except ValueError:
+        return None
+    if not isinstance(fields, dict) or not fields:
+        return None
+    if not _last_value_finished(args.rstrip()):
+        # the last value may still be growing (a string, a number, a list)
+        fields.popitem()
+    if any((field.alias or name) not in fields for name, field in model.model_fields.items()):
+        return None
+    try:
+        target = model.model_validate(fields).transfer()
+    except Exception:
+        # invalid, or `transfer` failed
+        return None
+    return target if isinstance(target, str) and target else None
+
+
+def _last_value_finished(args: str) -> bool:
+    """Whether the last value of the partial JSON object `args` is complete."""
+    if args.endswith("}"):
+        closed = args
+    elif args.endswith(","):
+        closed = args[:-1] + "}"
+    elif args.endswith(('"', "true", "false", "null")):
+        # a quote only if it closes a string value, not if it opens one
+        closed = args + "}"
+    else:
+        return False
+    try:
+        from_json(closed)
+    except ValueError:
+        return False
+    return True
 
-is_agent_run_result = lambda event: isinstance(event, AgentRunResultEvent)
-is_pydantic_model = lambda obj: isinstance(obj, BaseModel)
+
+def _has_text(event) -> bool:
+    if isinstance(event, PartDeltaEvent):
+        return bool(event.delta.content_delta)
+    return bool(event.part.content)
+
+# events whose handler also depends on the class of their part/delta
+_SUBJECT_ATTR = {
+    PartStartEvent: "part",
+    PartEndEvent: "part",
+    PartDeltaEvent: "delta",
+}
+
+_UNRESOLVED = object()
+
+# events that may carry the first model token, and the part/delta classes holding text
+_TOKEN_EVENTS = (PartStartEvent, PartDeltaEvent)
+_TEXT_SUBJECTS = (TextPart, TextPartDelta)
+
+# end of the upstream event stream
+_DONE = object()
+
+# cancelled streams still draining their upstream connection, kept alive until done
+_draining: set[asyncio.Task] = set()
 
 
 class SingleAgentRunner:
@@ -144,68 +232,298 @@ class SingleAgentRunner:
     def __init__(
         self, 
         agent:Agent, 
-        logger:logging.Logger = None
+        logger:logging.Logger = None,
+        skip_empty_deltas: bool = False,
+        event_types: Iterable[str] | None = None,
+        metrics_sink: MetricsSink | None = None,
+        early_handoff: bool = True,
+        toolsets: list | None = None,
+        deps: Any = None,
     ):
         
         self.agent:Agent = agent
+        # tools passed to each run in addition to the agent's own, e.g. per-session tools of a shared agent
+        self.toolsets = toolsets
+        # run dependencies, e.g. the session variables of templated instructions
+        self.deps = deps
         self.final_result = False
+        # drop text events with an empty delta (e.g. the empty `TextPart` most models start with)
+        self.skip_empty_deltas = skip_empty_deltas
         self.logger = logger if logger else logging.getLogger(self.__class__.__name__)
+        
+        # barge-in: the upstream stream is pumped by a task that `cancel` can stop at any time
+        self._producer: asyncio.Task | None = None
+        self._events: asyncio.Queue | None = None
+        self._cancel_reason: str | None = None
     
-        # the first element of the tuple is the condition to check if the handler should be called, the second element is the handler function.
-        # the strategy will be checked in order, which means if an event matches multiple conditions, only the first one will be called.
-        self._event_handlers = [
-            (lambda e: is_part_start(e) and is_tool_arg_start(e), 
-             self.on_tool_arg_start),
-            
-            (lambda e: is_part_start(e) and is_text_start(e), 
-             self.on_text_start),
-            
-            (lambda e: is_delta(e) and is_text_delta(e), 
-             self.on_text_delta),
-            
-            (is_function_tool_call_args, self.on_tool_call_args),
-            (is_function_tool_result, self.on_tool_result),
-            
-            (is_final_result, self.on_final_result),
-            
-            (lambda e: is_agent_run_result(e) and is_pydantic_model(e.result.output), self.on_agent_run_result)
-        ]
+        # (event class, part/delta class or None) -> (handler, is_async, emitted event type)
+        self._handlers: dict[tuple[type, type | None], tuple[Callable, bool, str | None]] = {}
+        # resolved for concrete classes: (handler, is_async), None when nothing (subscribed) handles them
+        self._resolved: dict[tuple[type, type | None], tuple[Callable, bool] | None] = {}
+        self._subscribed: frozenset[str] | None = None
+        
+        self.register_handler(PartStartEvent, self.on_tool_arg_start, ToolCallPart, EventType.ToolCallsOutputStart)
+        self.register_handler(PartStartEvent, self.on_text_start, TextPart, EventType.AgentTextStream)
+        self.register_handler(PartDeltaEvent, self.on_text_delta, TextPartDelta, EventType.AgentTextStream)
+        self.register_handler(FunctionToolCallEvent, self.on_tool_call_args, event_type=EventType.ToolCallsOutput)
+        self.register_handler(FunctionToolResultEvent, self.on_tool_result, event_type=EventType.ToolCallResult)
+        self.register_handler(FinalResultEvent, self.on_final_result)
+        self.register_handler(AgentRunResultEvent, self.on_agent_run_result)
         
-    def set_agent(self, agent: Agent):
+        if event_types is not None:
+            self.subscribe(event_types)
+        
+        # timings of the current / last run, each finished run is reported to `metrics_sink`
+        self.metrics_sink = metrics_sink
+        self.timings: AgentTimings | None = None
+        self._tool_started: dict[str, float] = {}
+        # when the last tool result came in, until the next text delta
+        self._text_wait: float | None = None
+        
+        # parse structured output arguments while they stream, to announce a handoff early
+        self.early_handoff = early_handoff
+        self._output_models: dict[str, type[BaseModel]] | None = None
+        # [part index, output model, arguments so far] of the structured output being streamed
+        self._pending_output: list | None = None
+        
+    def register_handler(
+        self, 
+        event_cls: type, 
+        handler: Callable, 
+        part_cls: type | None = None,
+        event_type: str | None = None,
+    ) -> None:
+        """
+        Handle `event_cls` events (and subclasses) with `handler`, sync or async.
+        For part start/end and delta events `part_cls` narrows the handler to one part/delta class,
+        None matches any. The handler returns an `AgentResult` to emit, or None.
+        `event_type` is the `EventType` the handler emits; the handler is skipped when the runner
+        is not subscribed to it. Handlers without one always run.
+        """
+        self._handlers[(event_cls, part_cls)] = (handler, inspect.iscoroutinefunction(handler), event_type)
+        self._resolved.clear()
+        
+    def subscribe(self, event_types: Iterable[str] | None) -> None:
+        """
+        Only build results of `event_types`, None subscribes to everything.
+        Handoff, hangup and cancellation results are always emitted.
+        """
+        self._subscribed = None if event_types is None else CONTROL_EVENT_TYPES.union(event_types)
+        self._resolved.clear()
+        
+    def _resolve(self, key: tuple[type, type | None]) -> tuple[Callable, bool] | None:
+        event_cls, part_cls = key
+        part_mro = (*part_cls.__mro__, None) if part_cls is not None else (None,)
+        entry = None
+        for cls in event_cls.__mro__:
+            for part in part_mro:
+                entry = self._handlers.get((cls, part))
+                if entry is not None:
+                    break
+            if entry is not None:
+                break
+        
+        if entry is not None:
+            handler, is_async, event_type = entry
+            if event_type is not None and self._subscribed is not None and event_type not in self._subscribed:
+                entry = None
+            else:
+                entry = (handler, is_async)
+        self._resolved[key] = entry
+        return entry
+    
+    def _dispatch_key(self, event) -> tuple[type, type | None]:
+        event_cls = type(event)
+        attr = _SUBJECT_ATTR.get(event_cls)
+        return (event_cls, type(getattr(event, attr)) if attr else None)
+        
+    def set_agent(self, agent: Agent, toolsets: list | None = None):
         self.agent = agent  
+        self.toolsets = toolsets
+        self._output_models = None
     
     async def run(self, 
                 prompt: str = None, 
                 message_history:list = None) -> AsyncGenerator[AgentResult, None]:
         
         self.final_result = False
+        self._cancel_reason = None
+        self._events = events = asyncio.Queue()
+        agent_name = self.agent.name
+        self.timings = timings = AgentTimings(agent_name=agent_name, started=time.monotonic())
+        self._tool_started = {}
+        self._text_wait = None
+        self._pending_output = None
+        watch_output = self.early_handoff and (
+            self._subscribed is None or EventType.HandoffPending in self._subscribed)
+        finish_reason = "closed"
+        self._producer = producer = asyncio.create_task(
+            self._pump(prompt, message_history, events))
+        
+        try:
+            while True:
+                event = await events.get()
+                
+                if self._cancel_reason is not None:
+                    finish_reason = "cancelled"
+                    yield AgentResult(
+                        event = TurnCancelled(
+                            message = {
+                                "agent_name": agent_name,
+                                "reason": self._cancel_reason
+                            }
+                        ),
+                        event_type = EventType.TurnCancelled,
+                        finish_reason = finish_reason,
+                        last_agent_name = agent_name
+                    )
+                    return
+                
+                if event is _DONE:
+                    if finish_reason == "closed":
+                        finish_reason = "stop"
+                    return
+                
+                if isinstance(event, Exception):
+                    finish_reason = "error"
+                    raise event
+                
+                event_cls = type(event)
+                attr = _SUBJECT_ATTR.get(event_cls)
+                subject = type(getattr(event, attr)) if attr else None
+                
+                # timings are taken here, independent of which handlers are subscribed
+                if timings.first_token is None and event_cls in _TOKEN_EVENTS:
+                    timings.first_token = time.monotonic()
+                if subject in _TEXT_SUBJECTS:
+                    if (timings.first_text is None or self._text_wait is not None) and _has_text(event):
+                        self._time_text(timings)
+                elif event_cls is FunctionToolCallEvent or event_cls is FunctionToolResultEvent:
+                    self._time_tool(event, timings)
+                elif event_cls is AgentRunResultEvent:
+                    _record_usage(event, timings)
+                elif watch_output and (subject is ToolCallPart or subject is ToolCallPartDelta):
+                    pending = self._watch_output(event)
+                    if pending is not None:
+                        pending.last_agent_name = agent_name
+                        yield pending
+                
+                e = await self.handle_event(event, (event_cls, subject))
+                if e is not None:
+                    e.last_agent_name = agent_name
+                    if e.finish_reason:
+                        finish_reason = e.finish_reason
+                    yield e 
+        finally:
+            if not producer.done():
+                producer.cancel()
+                _draining.add(producer)
+                producer.add_done_callback(_draining.discard)
+            if self._producer is producer:
+                self._producer = None
+            
+            timings.finished = time.monotonic()
+            timings.finish_reason = finish_reason
+            if self.metrics_sink is not None:
+                self.metrics_sink.observe_agent(timings)
+                
+    def _watch_output(self, event) -> AgentResult | None:
+        """
+        Follow the structured output tool call; once its arguments so far validate as an
+        output model with `transfer`, return a `HandoffPending` result (once per run).
+        """
+        pending = self._pending_output
+        if isinstance(event, PartStartEvent):
+            if self._output_models is None:
+                self._output_models = _output_models(self.agent)
+            model = self._output_models.get(event.part.tool_name)
+            if model is None or not callable(getattr(model, "transfer", None)):
+                return None
+            self._pending_output = pending = [event.index, model, event.part.args_as_json_str() if event.part.args else ""]
+        else:
+            if pending is None or pending[0] != event.index:
+                return None
+            args_delta = event.delta.args_delta
+            if isinstance(args_delta, str):
+                pending[2] += args_delta
+            elif args_delta is not None:
+                return None
         
-        async for event in self.agent.run_stream_events(
-            prompt, message_history=message_history):
+        target = _partial_transfer(pending[1], pending[2])
+        if target is None:
+            return None
+        self._pending_output = None
+        return AgentResult(
+            event = HandoffPending(
+                message = {
+                    "source_agent_name": self.agent.name,
+                    "target_agent_name": target
+                }
+            ),
+            event_type = EventType.HandoffPending
+        )
+    
+    def _time_text(self, timings: AgentTimings):
+        now = time.monotonic()
+        if timings.first_text is None:
+            timings.first_text = now
+        if self._text_wait is not None:
+            timings.text_after_tool.append(now - self._text_wait)
+            self._text_wait = None
             
-            e = await self.handle_event(event)  
+    def _time_tool(self, event, timings: AgentTimings):
+        now = time.monotonic()
+        if isinstance(event, FunctionToolCallEvent):
+            self._tool_started[event.part.tool_call_id] = now
+            return
+        started = self._tool_started.pop(event.tool_call_id, None)
+        if started is not None:
+            timings.tool_durations.append(now - started)
+        self._text_wait = now
             
-            if not isinstance(e, AgentResult):
-                continue
-             
-            if e is not None:
-                yield e 
+    async def _pump(self, prompt, message_history, events: asyncio.Queue):
+        """Forward upstream events to `run`; cancelling this task closes the model stream and pending tool calls."""
+        try:
+            async for event in self.agent.run_stream_events(
+                prompt, message_history=message_history, toolsets=self.toolsets, deps=self.deps):
+                events.put_nowait(event)
+        except Exception as exc:
+            events.put_nowait(exc)
+        finally:
+            events.put_nowait(_DONE)
+            
+    def cancel(self, reason: str = "barge_in") -> bool:
+        """
+        Stop the running turn: `run` emits a `TurnCancelled` result and returns right away,
+        the upstream model stream and any pending tool executions are cancelled.
+        Returns False when no turn is running.
+        """
+        producer = self._producer
+        if producer is None:
+            return False
+        
+        self._cancel_reason = reason
+        if not producer.done():
+            producer.cancel()
+        # wake `run` even if the upstream has gone quiet
+        self._events.put_nowait(_DONE)
+        return True
     
     
-    async def on_tool_arg_start(self, event:PartStartEvent):
+    def on_tool_arg_start(self, event:PartStartEvent):
         """When the models started to generate tool call request."""
         return AgentResult(
             event = ToolCallsOutputStart(
-                message = to_jsonable_python(event.part)
+                payload = event.part
             ),
             event_type = EventType.ToolCallsOutputStart
         )
    
    
-    async def on_text_start(self, event:PartStartEvent):
+    def on_text_start(self, event:PartStartEvent):
         """When the model starts to generate text response."""
-        
-
+        if self.skip_empty_deltas and not event.part.content:
+            return None
         
         return AgentResult(
             event = AgentTextStream(
@@ -215,9 +533,10 @@ class SingleAgentRunner:
         )
 
     
-    async def on_text_delta(self, event:PartDeltaEvent):
+    def on_text_delta(self, event:PartDeltaEvent):
         """When the model is generating text response."""
- 
+        if self.skip_empty_deltas and not event.delta.content_delta:
+            return None
         
         return AgentResult(
             event = AgentTextStream(
@@ -227,29 +546,29 @@ class SingleAgentRunner:
         )
         
         
-    async def on_tool_call_args(self, event:FunctionToolCallEvent):
+    def on_tool_call_args(self, event:FunctionToolCallEvent):
         """When the framework is calling a tool."""
 
         return AgentResult(
             event = ToolCallsOutput(
-                message = to_jsonable_python(event.part)
+                payload = event.part
             ),
             event_type = EventType.ToolCallsOutput
         )
 
     
-    async def on_tool_result(self, event:FunctionToolResultEvent):
+    def on_tool_result(self, event:FunctionToolResultEvent):
         """When the framework receives the result from a tool."""
         
         return AgentResult(
             event = ToolCallResult(
-                message = to_jsonable_python(event.result)
+                payload = event.result
             ),
             event_type = EventType.ToolCallResult
         )
         
         
-    async def on_agent_run_result(self, event:AgentRunResultEvent):
+    def on_agent_run_result(self, event:AgentRunResultEvent):
         """if the final output is a pydantic model, return it, otherwise return None. because the text output has been streamed in delta."""
         output = event.result.output
 
@@ -258,7 +577,8 @@ class SingleAgentRunner:
                 event = AgentHandoff(
                     message = output
                 ),
-                event_type = EventType.AgentHandoff
+                event_type = EventType.AgentHandoff,
+                finish_reason = "handoff"
             )
         
         elif isinstance(output, DoHangUp):
@@ -266,7 +586,8 @@ class SingleAgentRunner:
                 event = HangupSignal(
                     message = output
                 ),
-                event_type = EventType.HangupSignal
+                event_type = EventType.HangupSignal,
+                finish_reason = "hangup"
             )
         
         else:
@@ -274,30 +595,37 @@ class SingleAgentRunner:
             return None
             
         
-    async def on_final_result(self, event:FinalResultEvent):
+    def on_final_result(self, event:FinalResultEvent):
         """When the model finishes generating the final result."""
         self.final_result = True
         return None
          
          
-    async def on_tool_arg_end(self, event:PartEndEvent):
+    def on_tool_arg_end(self, event:PartEndEvent):
         """When the model finishes generating tool call arguments."""
         return None
     
     
-    async def on_text_end(self, event:PartEndEvent):
+    def on_text_end(self, event:PartEndEvent):
         """When the model finishes generating text response."""
         return None
     
     
-    async def on_tool_arg_delta(self, event:PartDeltaEvent):
+    def on_tool_arg_delta(self, event:PartDeltaEvent):
         """When the model is generating tool call arguments."""
         return None
     
      
-    async def handle_event(self, event):
-        for condition, handler in self._event_handlers:
-            if condition(event):
-                return await handler(event)
-            
-        return None
\ No newline at end of file
+    async def handle_event(self, event, key: tuple[type, type | None] | None = None):
+        """Dispatch one pydantic_ai event to its handler, returns the `AgentResult` or None.
+        `run` passes the (event class, part/delta class) key it already computed."""
+        if key is None:
+            key = self._dispatch_key(event)
+        entry = self._resolved.get(key, _UNRESOLVED)
+        if entry is _UNRESOLVED:
+            entry = self._resolve(key)
+        if entry is None:
+            return None
+        
+        handler, is_async = entry
+        return await handler(event) if is_async else handler(event)
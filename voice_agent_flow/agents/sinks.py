@@ -0,0 +1,195 @@
+"""
+Event sinks of an `AgentSession`.
+
+`AgentSession` passes every result of a turn (text deltas with their offsets, tool calls,
+handoffs, hangup, cancellation, the final `InferenceFinish`) to its sinks, in order:
+
+    queue = QueueSink(maxsize=256, policy=COALESCE)
+    session = AgentSession(runner, sinks=[queue])
+    ...
+    async for result in queue:          # e.g. the TTS gateway's task
+        ...
+
+- `ConsoleSink` prints the conversation, as the session always did; it is the default
+  when no sinks are given, pass `sinks=[]` for none.
+- `CallbackSink` calls a function (sync or async) with every result. The turn waits for
+  an async callback, so slow consumers should read from a `QueueSink` instead.
+- `QueueSink` is a bounded per-session queue, read by another task. When it is full, its
+  `policy` decides:
+
+  - `BLOCK`: the session's consumer (`AgentSession.chat`) waits until the reader catches
+    up. The model stream is not paused: the runner keeps reading it into its unbounded
+    event queue, so a stuck reader holds the turn's results in memory,
+  - `DROP_OLDEST`: the oldest queued text delta is dropped to make room,
+  - `COALESCE`: the text delta is appended to the newest queued one if that is a text
+    delta too, so no text is lost and the reader gets fewer, longer deltas.
+
+  Other results (tool calls, handoffs, hangup, ...) are never dropped or merged; if the
+  policy can not make room, the turn waits for them as with `BLOCK`. `stats` counts
+  results, drops, merges and waits.
+
+A sink that raises is logged and skipped, it does not end the turn.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable
+
+from voice_agent_flow.agents.events import (
+    AgentHandoff,
+    AgentResult,
+    AgentTextStream,
+    HandoffLimitReached,
+    HangupSignal,
+    TurnCancelled,
+)
+
+logger = logging.getLogger(__name__)
+
+# `QueueSink` policies when the queue is full
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+
+
+class EventSink:
+    """Receives the results of a session's turns, in order."""
+
+    async def emit(self, result: AgentResult) -> None:
+        raise NotImplementedError
+
+    async def turn_started(self, agent_name: str) -> None:
+        """A turn starts at agent `agent_name`."""
+
+    async def close(self) -> None:
+        """The session is done, no more results follow."""
+
+
+class ConsoleSink(EventSink):
+    """Prints text deltas and control events to stdout."""
+
+    async def emit(self, result: AgentResult) -> None:
+        event = result.event
+        if isinstance(event, AgentTextStream):
+            print(event.delta, end="")
+        elif isinstance(event, (AgentHandoff, HandoffLimitReached, TurnCancelled)):
+            print(event)
+        elif isinstance(event, HangupSignal):
+            print(event)
+            print("Conversation Ended with Hangup Signal.")
+
+    async def turn_started(self, agent_name: str) -> None:
+        print(f"🤖[{agent_name}]...Working.")
+
+
+class CallbackSink(EventSink):
+    """Calls `callback(result)` for every result; an async callback is awaited."""
+
+    def __init__(self, callback: Callable[[AgentResult], Any]):
+        self.callback = callback
+
+    async def emit(self, result: AgentResult) -> None:
+        value = self.callback(result)
+        if inspect.isawaitable(value):
+            await value
+
+
+@dataclass(slots=True)
+class QueueSinkStats:
+    emitted: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    # results that waited for the reader
+    waited: int = 0
+    max_depth: int = 0
+
+
+class QueueSink(EventSink):
+    """Bounded queue of results for a reader task, see the module docstring."""
+
+    def __init__(self, maxsize: int = 256, policy: str = BLOCK):
+        if policy not in (BLOCK, DROP_OLDEST, COALESCE):
+            raise ValueError(f"Unknown queue policy '{policy}', choose from {[BLOCK, DROP_OLDEST, COALESCE]}.")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.stats = QueueSinkStats()
+        self.closed = False
+        self._items: deque[AgentResult] = deque()
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+
+    async def emit(self, result: AgentResult) -> None:
+        if self.closed:
+            return
+        self.stats.emitted += 1
+        while len(self._items) >= self.maxsize:
+            if self._make_room(result):
+                if self.policy == COALESCE:
+                    return
+                break
+            self.stats.waited += 1
+            self._writable.clear()
+            await self._writable.wait()
+            if self.closed:
+                return
+        self._items.append(result)
+        self.stats.max_depth = max(self.stats.max_depth, len(self._items))
+        self._readable.set()
+
+    async def get(self) -> AgentResult | None:
+        """The next result, waiting for one; None once the sink is closed and drained."""
+        while not self._items:
+            if self.closed:
+                return None
+            self._readable.clear()
+            await self._readable.wait()
+        result = self._items.popleft()
+        self._writable.set()
+        return result
+
+    def get_nowait(self) -> AgentResult | None:
+        """The next result if one is queued, else None."""
+        if not self._items:
+            return None
+        self._writable.set()
+        return self._items.popleft()
+
+    async def __aiter__(self) -> AsyncIterator[AgentResult]:
+        while (result := await self.get()) is not None:
+            yield result
+
+    async def close(self) -> None:
+        self.closed = True
+        self._readable.set()
+        self._writable.set()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _make_room(self, result: AgentResult) -> bool:
+        """Apply the policy to `result` on a full queue; False if it can not make room."""
+        if self.policy == COALESCE:
+            last = self._items[-1]
+            if not (isinstance(result.event, AgentTextStream) and isinstance(last.event, AgentTextStream)):
+                return False
+            # a new result: the queued one may be shared with other sinks
+            self._items[-1] = AgentResult(
+                event=AgentTextStream(
+                    status=last.event.status, delta=last.event.delta + result.event.delta, offset=last.event.offset),
+                event_type=last.event_type,
+                finish_reason=result.finish_reason or last.finish_reason,
+                last_agent_name=result.last_agent_name or last.last_agent_name,
+            )
+            self.stats.coalesced += 1
+            return True
+        if self.policy == DROP_OLDEST:
+            for i, queued in enumerate(self._items):
+                if isinstance(queued.event, AgentTextStream):
+                    del self._items[i]
+                    self.stats.dropped += 1
+                    return True
+        return False
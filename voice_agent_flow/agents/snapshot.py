@@ -0,0 +1,349 @@
+"""
+Binary snapshots of an `AgentSession`, to move a live call to another worker or to
+recover it after a crash.
+
+    data = session.snapshot()               # bytes, between turns
+    ...
+    session = create_agent_session(...)     # the same flow, with fresh tools
+    session.restore(data)
+
+A snapshot holds what the flow has to continue the call:
+
+- the memory (messages with their timestamps, compact or not),
+- the current agent, whether its step is fresh, `agent_state`, the session variables and
+  the cached history summaries of the runner,
+- `AgentSession.finished`, and the text of a turn not yet fully played (`track_playback`),
+- the state of the session's tools that registered a serializer.
+
+Speculative runs, timings and stats are not kept. The format is little-endian
+`struct` records behind a header with the magic `VAFS` and `SNAPSHOT_VERSION`; strings
+are UTF-8 with a length prefix and `agent_state` is JSON. `restore` reads every version
+up to its own and raises `SnapshotError` for anything else. Restored messages are built
+without validation, the snapshot was made from valid ones.
+
+Tool state: a tool keeps its per-call state on a `tool_state` attribute of its function
+(see `create_phone_num_check_tool`), and the app registers how to dump the state's type
+to bytes and load it back in place (see `car_loan`):
+
+    register_tool_state(PhoneNumIntegrityChecker, PhoneNumIntegrityChecker.dump_state, PhoneNumIntegrityChecker.load_state)
+
+Tools are matched by agent and tool name on restore; state of a tool the restored flow
+does not have is skipped.
+"""
+from __future__ import annotations
+
+import inspect
+import json
+import logging
+import struct
+import sys
+from datetime import datetime
+from itertools import accumulate
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+
+from pydantic_ai import Tool
+
+from voice_agent_flow.agents.transcript import TranscriptBuffer
+from voice_agent_flow.memory.schema import (
+    AssistantMessage,
+    CompactMessage,
+    SystemMessage,
+    ToolRequestMessage,
+    ToolReturnMessage,
+    UserMessage,
+)
+
+if TYPE_CHECKING:
+    from voice_agent_flow.agents.chat import AgentSession
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"VAFS"
+SNAPSHOT_VERSION = 1
+
+# magic, version, flags
+HEADER = struct.Struct("<4sHB")
+# role, present fields, timestamp (epoch seconds, compact messages)
+MESSAGE = struct.Struct("<BBd")
+LENGTH = struct.Struct("<I")
+COUNT = struct.Struct("<H")
+PLAYBACK = struct.Struct("<IB")
+
+# header flags
+_FINISHED = 1
+_FRESH_STEP = 2
+_COMPACT = 4
+_PLAYBACK = 8
+
+_ROLES = ("user", "assistant", "system", "tool")
+_ROLE_CODES = {role: code for code, role in enumerate(_ROLES)}
+_set = object.__setattr__
+# message fields in the order they are written, bit i of the present fields
+_FIELDS = ("content", "tool_name", "args", "tool_call_id")
+# present fields bit of a string timestamp (`Message`)
+_TEXT_TIMESTAMP = 16
+# names of the present fields, per present fields value
+_PRESENT_FIELDS = [tuple(name for bit, name in enumerate(_FIELDS) if present & (1 << bit)) for present in range(16)]
+
+# registered tool state types: type -> (dump, load)
+_TOOL_STATES: dict[type, tuple[Callable[[Any], bytes], Callable[[Any, bytes], None]]] = {}
+
+
+class SnapshotError(ValueError):
+    """Data that is not a snapshot this version can restore, or a session that can not be snapshotted."""
+
+
+def register_tool_state(state_type: type, dump: Callable[[Any], bytes], load: Callable[[Any, bytes], None]) -> None:
+    """Snapshot tool state objects of `state_type` with `dump(state) -> bytes`, restore with `load(state, data)`."""
+    _TOOL_STATES[state_type] = (dump, load)
+
+
+def dump_session(session: AgentSession) -> bytes:
+    """The snapshot of `session`, see the module docstring."""
+    runner = session.runner
+    memory = session.memory
+    transcript = session._transcript
+    flags = ((_FINISHED if session.finished else 0) | (_FRESH_STEP if runner._fresh_step else 0)
+             | (_COMPACT if memory.compact else 0) | (_PLAYBACK if transcript is not None else 0))
+    try:
+        agent_state = json.dumps(runner.agent_state, ensure_ascii=False, separators=(",", ":"))
+    except TypeError as exc:
+        raise SnapshotError(f"agent_state is not JSON serializable: {exc}") from None
+
+    parts = [HEADER.pack(MAGIC, SNAPSHOT_VERSION, flags)]
+    _put_str(parts, runner.current_agent.name)
+    _put_pairs(parts, runner.variables.items())
+    _put_str(parts, agent_state)
+    _put_pairs(parts, ((str(cut), summary) for cut, summary in runner._history_summaries.items()))
+
+    _put_messages(parts, memory.messages)
+
+    if transcript is not None:
+        _put_str(parts, transcript.text)
+        parts.append(PLAYBACK.pack(transcript.played, transcript.complete))
+
+    states = []
+    for agent_name, tool_name, state in _tool_states(runner.agents):
+        serializer = _serializer(state)
+        if serializer is not None:
+            states.append((agent_name, tool_name, serializer[0](state)))
+    parts.append(COUNT.pack(len(states)))
+    for agent_name, tool_name, data in states:
+        _put_str(parts, agent_name)
+        _put_str(parts, tool_name)
+        parts.append(LENGTH.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def load_session(session: AgentSession, data: bytes) -> None:
+    """Restore the snapshot `data` into `session`, whose runner has the snapshotted flow."""
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise SnapshotError("Data is too short for a session snapshot.")
+    magic, version, flags = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise SnapshotError("Data is not a session snapshot.")
+    if version > SNAPSHOT_VERSION:
+        raise SnapshotError(f"Snapshot version {version} is newer than the supported {SNAPSHOT_VERSION}.")
+    try:
+        _load(session, view, HEADER.size, flags)
+    except SnapshotError:
+        raise
+    except (struct.error, ValueError, IndexError, StopIteration) as exc:
+        # `ValueError` includes `UnicodeDecodeError` and `json.JSONDecodeError`
+        raise SnapshotError(f"Corrupt session snapshot: {exc}") from None
+
+
+def _load(session: AgentSession, view: memoryview, offset: int, flags: int) -> None:
+    runner = session.runner
+    agent_name, offset = _get_str(view, offset)
+    variables, offset = _get_pairs(view, offset)
+    agent_state, offset = _get_str(view, offset)
+    agent_state = json.loads(agent_state)
+    summaries, offset = _get_pairs(view, offset)
+
+    compact = bool(flags & _COMPACT)
+    messages, offset = _get_messages(view, offset, compact)
+
+    transcript = None
+    if flags & _PLAYBACK:
+        text, offset = _get_str(view, offset)
+        played, complete = PLAYBACK.unpack_from(view, offset)
+        offset += PLAYBACK.size
+        transcript = TranscriptBuffer()
+        transcript.append(text)
+        transcript.played = played
+        transcript.complete = bool(complete)
+
+    (count,), offset = COUNT.unpack_from(view, offset), offset + COUNT.size
+    tool_states = {}
+    for _ in range(count):
+        tool_agent, offset = _get_str(view, offset)
+        tool_name, offset = _get_str(view, offset)
+        (length,), offset = LENGTH.unpack_from(view, offset), offset + LENGTH.size
+        if offset + length > len(view):
+            raise SnapshotError(f"Corrupt session snapshot: the state of tool {tool_name} runs past the end.")
+        tool_states[(tool_agent, tool_name)] = view[offset:offset + length]
+        offset += length
+    if offset != len(view):
+        raise SnapshotError(f"Corrupt session snapshot: {len(view) - offset} bytes after the end.")
+
+    # everything is decoded, now change the session
+    if agent_name not in runner.agents:
+        raise SnapshotError(f"Snapshot agent '{agent_name}' is not part of the session's flow.")
+    runner.set_agent(agent_name)
+    runner._fresh_step = bool(flags & _FRESH_STEP)
+    runner.agent_state = agent_state
+    # the dict is shared with the agent runs as their deps, update it in place
+    runner.variables.clear()
+    runner.variables.update(variables)
+    runner._history_summaries = {int(cut): summary for cut, summary in summaries.items()}
+
+    # replaces the list, so the memory's history caches start over; an attached store is not written to
+    memory = session.memory
+    memory.compact = compact
+    memory.messages = messages
+    session._transcript = transcript
+    session.finished = bool(flags & _FINISHED)
+
+    for agent_name, tool_name, state in _tool_states(runner.agents):
+        data = tool_states.pop((agent_name, tool_name), None)
+        serializer = _serializer(state)
+        if data is not None and serializer is not None:
+            serializer[1](state, data)
+    for agent_name, tool_name in tool_states:
+        logger.warning("snapshot has state of tool %s of agent %s, the session has no such tool", tool_name, agent_name)
+
+
+def _tool_states(agents: dict) -> Iterator[tuple[str, str, Any]]:
+    for agent_name, node in agents.items():
+        for tool in node.tools:
+            function = tool.function if isinstance(tool, Tool) else tool
+            state = getattr(inspect.unwrap(function), "tool_state", None)
+            if state is not None:
+                yield agent_name, tool.name if isinstance(tool, Tool) else tool.__name__, state
+
+
+def _serializer(state: Any) -> tuple[Callable, Callable] | None:
+    for state_type in type(state).__mro__:
+        serializer = _TOOL_STATES.get(state_type)
+        if serializer is not None:
+            return serializer
+    return None
+
+
+def _put_str(parts: list[bytes], value: str) -> None:
+    data = value.encode()
+    parts.append(LENGTH.pack(len(data)))
+    parts.append(data)
+
+
+def _put_pairs(parts: list[bytes], pairs) -> None:
+    pairs = list(pairs)
+    parts.append(COUNT.pack(len(pairs)))
+    for key, value in pairs:
+        _put_str(parts, key)
+        _put_str(parts, value)
+
+
+def _put_messages(parts: list[bytes], messages: list) -> None:
+    """Message records, then the lengths in characters of their strings, then all strings as one UTF-8 text."""
+    records = []
+    strings = []
+    for message in messages:
+        if isinstance(message, CompactMessage):
+            values = [message.content, message.tool_name, message.args, message.tool_call_id]
+            timestamp = message.timestamp
+            present = 0
+        else:
+            # a pydantic model's fields are in its `__dict__`, `getattr` of a missing one is slow
+            fields = message.__dict__
+            values = [fields.get(name) for name in _FIELDS]
+            strings.append(message.timestamp)
+            timestamp = 0.0
+            present = _TEXT_TIMESTAMP
+        for bit, value in enumerate(values):
+            if value is not None:
+                present |= 1 << bit
+                strings.append(value)
+        records.append(MESSAGE.pack(_ROLE_CODES[message.role], present, timestamp))
+    text = "".join(strings).encode()
+    parts.append(LENGTH.pack(len(records)))
+    parts.extend(records)
+    parts.append(LENGTH.pack(len(strings)))
+    parts.append(struct.pack(f"<{len(strings)}I", *map(len, strings)))
+    parts.append(LENGTH.pack(len(text)))
+    parts.append(text)
+
+
+def _get_str(view: memoryview, offset: int) -> tuple[str, int]:
+    (length,) = LENGTH.unpack_from(view, offset)
+    start = offset + LENGTH.size
+    end = start + length
+    if end > len(view):
+        raise SnapshotError("Corrupt session snapshot: a string runs past the end.")
+    return str(view[start:end], "utf-8"), end
+
+
+def _get_pairs(view: memoryview, offset: int) -> tuple[dict[str, str], int]:
+    (count,) = COUNT.unpack_from(view, offset)
+    offset += COUNT.size
+    pairs = {}
+    for _ in range(count):
+        key, offset = _get_str(view, offset)
+        pairs[key], offset = _get_str(view, offset)
+    return pairs, offset
+
+
+def _get_messages(view: memoryview, offset: int, compact: bool) -> tuple[list, int]:
+    (count,) = LENGTH.unpack_from(view, offset)
+    offset += LENGTH.size
+    end = offset + count * MESSAGE.size
+    if end > len(view):
+        raise SnapshotError("Corrupt session snapshot: the messages run past the end.")
+    records = MESSAGE.iter_unpack(view[offset:end])
+    (count,) = LENGTH.unpack_from(view, end)
+    lengths = struct.unpack_from(f"<{count}I", view, end + LENGTH.size)
+    offset = end + LENGTH.size + 4 * count
+    text, offset = _get_str(view, offset)
+
+    bounds = list(accumulate(lengths, initial=0))
+    if bounds[-1] != len(text):
+        raise SnapshotError("Corrupt session snapshot: message text does not match its lengths.")
+    strings = iter([text[start:end] for start, end in zip(bounds, bounds[1:])])
+    messages = []
+    for code, present, timestamp in records:
+        if present & _TEXT_TIMESTAMP:
+            timestamp = next(strings)
+        fields = {name: next(strings) for name in _PRESENT_FIELDS[present & 15]}
+        messages.append(_message(_ROLES[code], timestamp, fields, compact))
+    return messages, offset
+
+
+def _message(role: str, timestamp: float | str, fields: dict[str, str], compact: bool) -> Any:
+    if compact:
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp).timestamp()
+        if "tool_name" in fields:
+            fields["tool_name"] = sys.intern(fields["tool_name"])
+        return CompactMessage(role, timestamp=timestamp, **fields)
+    if not isinstance(timestamp, str):
+        timestamp = datetime.fromtimestamp(timestamp).isoformat()
+    if role == "user":
+        cls = UserMessage
+    elif role == "system":
+        cls = SystemMessage
+    elif role == "tool":
+        cls = ToolReturnMessage
+    else:
+        cls = AssistantMessage if "content" in fields else ToolRequestMessage
+    # what `model_construct` does, without its per-field default handling: every field is set
+    message = cls.__new__(cls)
+    fields["role"] = role
+    fields["timestamp"] = timestamp
+    _set(message, "__dict__", fields)
+    _set(message, "__pydantic_fields_set__", set(fields))
+    _set(message, "__pydantic_extra__", None)
+    _set(message, "__pydantic_private__", None)
+    return message
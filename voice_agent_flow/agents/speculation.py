@@ -0,0 +1,76 @@
+"""
+Speculative execution of the next agent.
+
+With `MultiAgentRunner(..., speculative=True)` the runner predicts the handoff target
+while the current agent is still streaming its structured output:
+
+- from a `HandoffPending` event (the partial output already decides `transfer()`), or
+- from the flow graph, when the current `AgentNode` has a single entry in `next_agents`
+  and the structured output tool call starts.
+
+The target agent's run then starts right away on a spare `SingleAgentRunner`, its results
+buffered by a `Speculation`. When the handoff is confirmed (same target, history
+unchanged) the buffered run is used; otherwise it is cancelled. Agents with tools are
+never run speculatively, since their tool calls could have side effects. The spare runner
+has no metrics sink until its run is confirmed, so dropped runs stay out of the histograms.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import AsyncGenerator
+
+from voice_agent_flow.agents.events import AgentResult
+from voice_agent_flow.agents.single_agent_runner import SingleAgentRunner
+
+_DONE = object()
+
+
+class Speculation:
+    """One speculative run of a predicted handoff target."""
+
+    def __init__(
+        self,
+        runner: SingleAgentRunner,
+        target: str,
+        message_history: list | None,
+        history_size: int | None = None,
+    ):
+        self.runner = runner
+        self.target = target
+        # number of memory messages the history was built from, to detect changes
+        self.history_size = history_size
+        self.started = time.monotonic()
+        self._results: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._consume(message_history))
+
+    async def _consume(self, message_history: list | None):
+        try:
+            async for result in self.runner.run(prompt=None, message_history=message_history):
+                self._results.put_nowait(result)
+        except Exception as exc:
+            self._results.put_nowait(exc)
+        finally:
+            self._results.put_nowait(_DONE)
+
+    async def results(self) -> AsyncGenerator[AgentResult, None]:
+        """The run's results, the ones buffered so far first."""
+        try:
+            while True:
+                result = await self._results.get()
+                if result is _DONE:
+                    return
+                if isinstance(result, BaseException):
+                    raise result
+                yield result
+        finally:
+            self.cancel()
+
+    @property
+    def done(self) -> bool:
+        """Whether the run has finished (its results may still be buffered)."""
+        return self._task.done()
+
+    def cancel(self) -> None:
+        if not self._task.done():
+            self._task.cancel()
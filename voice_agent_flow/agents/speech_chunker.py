@@ -0,0 +1,179 @@
+"""
+Speakable chunks for TTS.
+
+`AgentTextStream` deltas are raw model token fragments. `SpeechChunker` sits between a
+runner and the voice layer and regroups them into sentence or clause sized chunks:
+
+    chunker = SpeechChunker(min_first_chunk=4, max_wait=0.3)
+    async for result in chunker.stream(runner.run(memory=memory)):
+        ...  # text results now carry whole clauses / sentences
+
+Cut points
+----------
+- sentence ends: 。？！；… and newlines, and . ? ! ; followed by whitespace,
+- clause ends: ，、： and , : followed by whitespace,
+- closing quotes and brackets right after the punctuation stay with the chunk.
+
+The first chunk of an utterance (turn start, after a tool call or handoff) is cut at
+the first sentence or clause end once it has `min_first_chunk` characters, so audio
+starts as early as possible. Later chunks are cut at sentence ends, or at clause ends
+once they have `min_chunk` characters. Text without any cut point is flushed after
+`max_chunk` characters, or when it has been waiting for `max_wait` seconds. Buffered
+text is flushed before tool calls, handoffs, hangups and the end of the turn; it is
+dropped when the turn is cancelled, since it was never spoken.
+
+Every other result passes through unchanged. Chunks are the concatenation of the deltas,
+so text offsets stay valid.
+"""
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from typing import AsyncGenerator, AsyncIterator
+
+from voice_agent_flow.agents.events import (
+    AgentHandoff,
+    AgentResult,
+    AgentTextStream,
+    EventType,
+    HangupSignal,
+    InferenceFinish,
+    ToolCallsOutput,
+    ToolCallsOutputStart,
+    TurnCancelled,
+)
+
+_CLOSERS = "”’」』）)】\"'"
+_CUT = re.compile(
+    rf"(?P<sentence>(?:[。？！；…\n]|[.?!;](?=\s))[{_CLOSERS}]*)"
+    rf"|(?P<clause>(?:[，、：]|[,:](?=\s))[{_CLOSERS}]*)"
+)
+
+# buffered text is spoken before these results are passed on
+_FLUSH_BEFORE = (ToolCallsOutputStart, ToolCallsOutput, AgentHandoff, HangupSignal, InferenceFinish)
+
+_DONE = object()
+
+
+@dataclass
+class SpeechChunker:
+    """
+    Regroups streamed text into speakable chunks, see the module docstring.
+
+    Attributes:
+    - min_first_chunk: characters the first chunk of a turn needs before it can be cut
+    - min_chunk: characters a later chunk needs before it can be cut at a clause end
+    - max_chunk: flush text without a cut point once it is this long
+    - max_wait: seconds buffered text may wait for a cut point, None waits indefinitely
+    """
+
+    min_first_chunk: int = 4
+    min_chunk: int = 12
+    max_chunk: int = 80
+    max_wait: float | None = 0.3
+
+    async def stream(self, results: AsyncIterator[AgentResult]) -> AsyncGenerator[AgentResult, None]:
+        """Chunk the text results of `results` (e.g. `MultiAgentRunner.run(...)`)."""
+        # a pump task lets us wait for the next result with a timeout without cancelling `results`
+        queue: asyncio.Queue = asyncio.Queue()
+        pump = asyncio.create_task(_pump(results, queue))
+
+        buffer = ""
+        first = True
+        # agent of the buffered text, copied to the chunks
+        agent_name = None
+        scan = 0
+        # when pending text has to be spoken even without a cut point
+        deadline = None
+        try:
+            while True:
+                try:
+                    result = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    if deadline is None:
+                        result = await queue.get()
+                    else:
+                        try:
+                            result = await asyncio.wait_for(queue.get(), deadline - time.monotonic())
+                        except asyncio.TimeoutError:
+                            yield _text(buffer, agent_name)
+                            buffer, first, scan, deadline = "", False, 0, None
+                            continue
+                if result is _DONE:
+                    break
+                if isinstance(result, BaseException):
+                    raise result
+
+                event = result.event
+                if type(event) is AgentTextStream:
+                    if not event.delta:
+                        continue
+                    if not buffer and self.max_wait is not None:
+                        deadline = time.monotonic() + self.max_wait
+                    buffer += event.delta
+                    agent_name = result.last_agent_name
+
+                    cut = self._find_cut(buffer, scan, first)
+                    if cut < 0 and (len(buffer) >= self.max_chunk
+                                    or (deadline is not None and time.monotonic() >= deadline)):
+                        cut = len(buffer)
+                    if cut > 0:
+                        yield _text(buffer[:cut], agent_name)
+                        buffer, first = buffer[cut:], False
+                        # the first chunk is cut early, the rest may already end in a cut point
+                        cut = self._find_cut(buffer, 0, False)
+                        if cut > 0:
+                            yield _text(buffer[:cut], agent_name)
+                            buffer = buffer[cut:]
+                        deadline = time.monotonic() + self.max_wait if buffer and deadline is not None else None
+                    # a trailing "." or "," may still become a cut point with the next delta
+                    scan = max(len(buffer) - 1, 0)
+                    continue
+
+                if isinstance(event, TurnCancelled):
+                    buffer, first, scan, deadline = "", True, 0, None
+                elif isinstance(event, _FLUSH_BEFORE):
+                    if buffer:
+                        yield _text(buffer, agent_name)
+                    # text after a tool call or handoff starts a new utterance
+                    buffer, first, scan, deadline = "", True, 0, None
+                yield result
+
+            if buffer:
+                yield _text(buffer, agent_name)
+        finally:
+            if not pump.done():
+                pump.cancel()
+
+    def _find_cut(self, text: str, start: int, first: bool) -> int:
+        """
+        End of the chunk to cut from `text`, looking at cut points from `start`; -1 if none.
+        The first chunk of an utterance ends at the first acceptable cut point, later ones at the last.
+        """
+        cut = -1
+        min_sentence = self.min_first_chunk if first else 1
+        min_clause = self.min_first_chunk if first else self.min_chunk
+        for match in _CUT.finditer(text, start):
+            end = match.end()
+            if end >= (min_sentence if match.lastgroup == "sentence" else min_clause):
+                if first:
+                    return end
+                cut = end
+        return cut
+
+
+async def _pump(results: AsyncIterator[AgentResult], queue: asyncio.Queue):
+    try:
+        async for result in results:
+            queue.put_nowait(result)
+    except Exception as exc:
+        queue.put_nowait(exc)
+    finally:
+        queue.put_nowait(_DONE)
+
+
+def _text(chunk: str, agent_name: str | None) -> AgentResult:
+    return AgentResult(event=AgentTextStream(delta=chunk), event_type=EventType.AgentTextStream,
+                       last_agent_name=agent_name)
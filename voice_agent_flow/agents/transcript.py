@@ -0,0 +1,58 @@
+from bisect import bisect_right
+
+
+class TranscriptBuffer:
+    """
+    Assistant text of one turn, kept as the streamed deltas with their character offsets.
+
+    The voice layer reports how far playback got with `mark_played`; `heard_text` is the
+    prefix the caller actually heard, which is what should be committed to memory when
+    the caller barges in. Deltas are only joined when the text is read.
+    """
+
+    __slots__ = ("_chunks", "_ends", "length", "played", "complete")
+
+    def __init__(self):
+        self._chunks: list[str] = []
+        self._ends: list[int] = []
+        self.length = 0
+        self.played = 0
+        self.complete = False
+
+    def append(self, delta: str) -> int:
+        """Add one delta and return its start offset."""
+        start = self.length
+        if delta:
+            self.length += len(delta)
+            self._chunks.append(delta)
+            self._ends.append(self.length)
+        return start
+
+    def mark_played(self, offset: int) -> None:
+        """Playback reached `offset` characters; offsets never move backwards."""
+        if offset > self.played:
+            self.played = offset
+
+    @property
+    def fully_played(self) -> bool:
+        return self.complete and self.played >= self.length
+
+    @property
+    def text(self) -> str:
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+            self._ends = [self.length]
+        return self._chunks[0] if self._chunks else ""
+
+    def heard_text(self) -> str:
+        """Text up to the played offset."""
+        played = min(self.played, self.length)
+        if played >= self.length:
+            return self.text
+
+        index = bisect_right(self._ends, played)
+        head = "".join(self._chunks[:index])
+        if index < len(self._chunks):
+            chunk_start = self._ends[index - 1] if index else 0
+            head += self._chunks[index][:played - chunk_start]
+        return head
@@ -1,13 +1,20 @@
-from typing import Optional
+import asyncio
+import weakref
+from typing import Mapping, Optional
 
 from agentic_data.llms import pydantic_openai_like_async
 from pydantic import BaseModel, Field
 
-from voice_agent_flow.agents import AgentSession
+from voice_agent_flow.agents import AgentSession, EventSink, register_tool_state
 from voice_agent_flow.agents.agent_node import AgentNode, DoHangUp, HangUpNode
+from voice_agent_flow.agents.fast_path import FastPath
 from voice_agent_flow.agents.multi_agent_runner import MultiAgentRunner
-from voice_agent_flow.llms import create_pydantic_azure_openai
+from voice_agent_flow.agents.openers import OpenerCache
+from voice_agent_flow.agents.registry import default_registry
+from voice_agent_flow.llms import HedgedModel, create_pydantic_azure_openai
+from voice_agent_flow.memory import HistoryPolicy
 from voice_agent_flow.tools import create_phone_num_check_tool
+from voice_agent_flow.tools.phone_num import PhoneNumIntegrityChecker
 
 class CustomerName(BaseModel):
     
@@ -176,7 +183,41 @@ Each step has:
 - **Examples**: Model dialogue patterns
 """
     
-def create_agent_session(model:str = "Qwen3-32B-AWQ") -> AgentSession:
+# the phone number tool's call count and partial number are kept in session snapshots
+register_tool_state(PhoneNumIntegrityChecker, PhoneNumIntegrityChecker.dump_state, PhoneNumIntegrityChecker.load_state)
+
+
+# event loop -> {(model, hedge_threshold): model}; a model's HTTP client belongs to the loop it first ran on
+_models: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[tuple, object]] = weakref.WeakKeyDictionary()
+
+
+def create_model(model:str = "Qwen3-32B-AWQ", hedge_threshold: float | None = None):
+    """
+    The model of `model` name, created once per event loop and shared by the sessions on it. With
+    `hedge_threshold` (seconds, about the p95 TTFT) slow requests are hedged, see `HedgedModel`.
+    Outside a running loop every call builds a new model.
+    """
+    
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return _build_model(model, hedge_threshold)
+    
+    models = _models.get(loop)
+    if models is None:
+        for closed in [other for other in _models if other.is_closed()]:
+            # the compiled agents of a closed loop's models could only fail
+            for stale in _models.pop(closed).values():
+                default_registry.discard_model(stale)
+        models = _models[loop] = {}
+    
+    key = (model, hedge_threshold)
+    if key not in models:
+        models[key] = _build_model(model, hedge_threshold)
+    return models[key]
+
+
+def _build_model(model:str, hedge_threshold: float | None):
     
     if model == "gpt-4o-mini":
         # use gpt-4o-mini
@@ -188,8 +229,22 @@ def create_agent_session(model:str = "Qwen3-32B-AWQ") -> AgentSession:
         
     else:
         raise ValueError(f"Model {model} not supported, please choose from ['gpt-4o-mini', 'Qwen3-32B-AWQ']")
+    
+    if hedge_threshold is not None:
+        model = HedgedModel(model, threshold=hedge_threshold)
+    
+    return model
 
 
+def create_agents(
+    model, 
+    fast_paths: Mapping[str, FastPath] | None = None, 
+    fallback_models: list | None = None
+) -> dict[str, AgentNode]:
+    """
+    The flow steps; tools are created per call, everything else is shared through the agent registry.
+    Every step falls back to `fallback_models` when the endpoint of `model` is unhealthy.
+    """
 
     agents = {
         
@@ -201,12 +256,13 @@ def create_agent_session(model:str = "Qwen3-32B-AWQ") -> AgentSession:
             task_cls= CustomerName,
             step_instruction=(
                 "Confirm the customer's name with a greeting message(customer name included in the message)."
-                "Amubiguous response from customer should be treated as confirmation and create the schema. Current Customer Name: 李老三"
+                "Amubiguous response from customer should be treated as confirmation and create the schema. Current Customer Name: ${customer_name}"
                 "Any response for the message will be treated as confirmation unless the customer explicitly says he/she is not the person or dialed wrong number."
                 "Event a simple ‘嗯’, ‘呃’, '哪里'，‘你说’ indicates a confirmation. You should create the schema immediately"
             ),
                 
             examples=["您好，请问是xxx(plug customer name here)吗？"],
+            next_agents=["financial_support_inquiry", "hangup"],
             ),
         
         # Complex business rules, you need more prompt, but just in this step.
@@ -222,6 +278,7 @@ def create_agent_session(model:str = "Qwen3-32B-AWQ") -> AgentSession:
                 "If user explicity reject or refuse, ask again, if the reject is truely confirmed, create FinancialSupportStatus(require_financial_support=False)."
             ),
             examples=["您好，这边是易鑫集团的金融顾问，看到你的申请的资金方案，您最近是有资金需求吗？"],
+            next_agents=["vehicle_payment_status", "hangup"],
             ),
         
         # simple business rules, you can be direct and concise.
@@ -239,6 +296,7 @@ def create_agent_session(model:str = "Qwen3-32B-AWQ") -> AgentSession:
                 "Overall, you if there are ongoing installments, is_not_under_repayment = False, else True"
             ),
             examples=["您名下的车目前是已经还清贷款了吗？"],
+            next_agents=["vehicle_liscence_under_control", "hangup"],
             ),
         
         # simple business rules, you can be direct and concise.
@@ -254,6 +312,7 @@ def create_agent_session(model:str = "Qwen3-32B-AWQ") -> AgentSession:
                 "If the vehicle liscense ir under his/her company's control, create VehicleLiscenceUnderControl(green_book_available=False)."
             ),
             examples=["那这个绿本现在是在您本人手上吗？"],
+            next_agents=["wechat_account_confirm", "hangup"],
             ),
         
         "wechat_account_confirm": AgentNode(
@@ -262,20 +321,21 @@ def create_agent_session(model:str = "Qwen3-32B-AWQ") -> AgentSession:
         instruction = INSTRUCTION,
         task_cls=WeChatAccount,
         step_instruction = (
-            "The only task in this step is to ask the customer whether the current taking phone can be used to add wechat account. (方便用您尾号xxxx的手机号加您的微信么？)"
+            "The only task in this step is to ask the customer whether the current taking phone can be used to add wechat account. (方便用您尾号${phone_tail}的手机号加您的微信么？)"
             "If the customer acknowledge with the current talking phone, create WeChatAccount(wechat_account=current_talking_phone)."
             "If the current talking phone is not associated with the customer's wechat account, continue persuade the customer to provide a valid phone number(associated with wechat account)"
             "progressively collect the valid phone number.(Use `check_wechat_account_validity` whenever you receive a new alpha numeric part)"
             "When guiding the customer to provide complete phone number, response in extremely short sentence like: '您继续', '嗯嗯'"
-            "Current Talking Phone Number: 15001395923"
+            "Current Talking Phone Number: ${phone_number}"
         ),
         examples = [
-            "Assistant: 方便用您尾号xxxx的手机号加您的微信么？ Customer: 可以 -> create WeChatAccount(wechat_account=current_talking_phone).",
-            "Assistant: 方便用您尾号xxxx的手机号加您的微信么？ Customer: 不方便 Assistant: 那您方便提供一个能加微信的手机号吗.",
+            "Assistant: 方便用您尾号${phone_tail}的手机号加您的微信么？ Customer: 可以 -> create WeChatAccount(wechat_account=current_talking_phone).",
+            "Assistant: 方便用您尾号${phone_tail}的手机号加您的微信么？ Customer: 不方便 Assistant: 那您方便提供一个能加微信的手机号吗.",
             "Customer: 150 Assistant: 您继续 Customer:0123 -> Assistant: 嗯嗯 -> Customer:0245 -> (check validity with `check_wechat_account_validity`) -> if True Assistant: 好的，确认一下是，15001230245吗？ Customer: 对的 -> create WeChatAccount(wechat_account=15001230245)", 
             "Customer: 不方便，加微信干嘛？ Assistant: 加微信是后续办理业务方便，咱们在微信上提供一些资料，最快当天就能放款，您请放心"
         ],
-        tools = [create_phone_num_check_tool()]
+        tools = [create_phone_num_check_tool()],
+        next_agents = ["wechat_add_request"]
         ),
         
         "wechat_add_request": AgentNode(
@@ -298,7 +358,8 @@ def create_agent_session(model:str = "Qwen3-32B-AWQ") -> AgentSession:
                 "Customer: 没收到 Assistant: 可能是网络有延迟，您下拉刷新看下有没新的消息",
                 "Customer: 还是没收到 Assistant: 那我这边再给你重新发送一次 -> Call add_wechat_account(...) again"
             ],
-            tools = [add_wechat_account]
+            tools = [add_wechat_account],
+            next_agents = ["wechat_guide", "hangup"]
         ),
         
         "wechat_guide": AgentNode(
@@ -330,19 +391,100 @@ def create_agent_session(model:str = "Qwen3-32B-AWQ") -> AgentSession:
                 "User: '太麻烦了/不弄了/不想加了' -> Agent: '马上就完成了呢，你稍微操作几个步骤就好了，很快的。'"
                 "User：嗯嗯/哦/ambiguous response -> Agent: [short answer to guide the next step or explain the current step] 看到了吗？ 进去了吗？打开了么？，点了吗？" 
                 "User: 你们利率是多少/能贷款多少/... Agent: 您先加上微信，我稍后在微信给您详细介绍好么？"
-                ]
+                ],
+            next_agents = ["hangup"]
         ),
         
         "hangup": HangUpNode(model = model)
     }
+    
+    for name, fast_path in (fast_paths or {}).items():
+        agents[name].fast_path = fast_path
+    for node in agents.values():
+        node.fallback_models = list(fallback_models or [])
+    
+    return agents
 
 
+def warmup(model:str = "Qwen3-32B-AWQ") -> int:
+    """
+    Compile every step of the flow at startup, so the first call does not pay for it. Call it on
+    the event loop that serves the calls (e.g. as the `Supervisor` `worker_init`), models are per loop.
+    """
+    return default_registry.warmup(create_agents(create_model(model)))
+
+
+# what the steps open with (see their step instructions and examples), streamed without a model run
+OPENERS = {
+    "customer_name_inquiry": "喂，您好，请问是${customer_name}吗？",
+    "financial_support_inquiry": "您好，这边是易鑫集团的金融顾问，看到你的申请的资金方案，您最近是有资金需求吗？",
+    "vehicle_payment_status": "您的车是全款买的还是按揭买的？",
+}
+
+
+# trivial answers to the steps' questions, turned into their output without a model run
+FAST_PATH_RULES = {
+    "customer_name_inquiry": {
+        r"[嗯呃]+|是的?|对的?|我是|是我|你说|哪里": {"name_checked": True},
+    },
+    "financial_support_inquiry": {
+        r"[嗯呃]+|是的?|对的?|有的?|有啊|需要": {"require_financial_support": True},
+    },
+    "vehicle_payment_status": {
+        r"全款的?|全款买的|(已经)?还(清|完)了": {"is_not_under_repayment": True},
+    },
+    "vehicle_liscence_under_control": {
+        r"[嗯呃]+|在的?|是的?|在(我)?手(里|上)|在家里?": {"green_book_available": True},
+    },
+    "wechat_add_request": {
+        r"(收|看)到了?|有了?|嗯+": {"received": True},
+    },
+}
+
+
+def create_fast_paths(shadow: bool = False) -> dict[str, FastPath]:
+    """Fast paths of the steps, shared by all calls so their stats cover the whole flow."""
+    return {name: FastPath(rules, shadow=shadow) for name, rules in FAST_PATH_RULES.items()}
+
+
+def session_variables(customer_name:str = "李老三", phone_number:str = "15001395923") -> dict[str, str]:
+    """The per-call variables of the step instructions (`${customer_name}`, ...)."""
+    return {
+        "customer_name": customer_name,
+        "phone_number": phone_number,
+        "phone_tail": phone_number[-4:],
+    }
+
+
+def create_agent_session(
+    model:str = "Qwen3-32B-AWQ", 
+    history_policy: HistoryPolicy | None = None,
+    speculative: bool = False,
+    variables: dict[str, str] | None = None,
+    openers: OpenerCache | None = None,
+    fast_paths: Mapping[str, FastPath] | None = None,
+    fallback: str | None = None,
+    sinks: list[EventSink] | None = None
+) -> AgentSession:
+    """
+    One call. Pass an `OpenerCache` shared by all calls (e.g. `OpenerCache(OPENERS)`) to stream
+    the steps' opening utterances without waiting for the model, and fast paths shared by all
+    calls (`create_fast_paths()`) to answer trivial replies without it. With `fallback`
+    (e.g. "gpt-4o-mini") turns move to that model while the endpoint of `model` breaches its
+    latency SLO or fails, see `voice_agent_flow.llms.router`. `sinks` are the session's event
+    sinks (default: print to the console); pass `sinks=[]` when hosting it in `VoiceGateway`.
+    """
+
+    fallback_models = [create_model(fallback)] if fallback else None
     runner = MultiAgentRunner(
-        agents=agents, 
+        agents=create_agents(create_model(model), fast_paths, fallback_models), 
         entry_agent_name="customer_name_inquiry",
-        ending_message="好的，我们稍后会加您的微信，请你注意在服务通知后查看我们的企业微信请求，再见！"
+        ending_message="好的，我们稍后会加您的微信，请你注意在服务通知后查看我们的企业微信请求，再见！",
+        speculative=speculative,
+        variables=variables if variables is not None else session_variables(),
+        openers=openers
     )  
 
-    chat = AgentSession(runner)
+    chat = AgentSession(runner, history_policy=history_policy, sinks=sinks)
 
     return chat
\ No newline at end of file
@@ -0,0 +1,3 @@
+from .protocol import ProtocolError
+from .server import GatewayStats, VoiceGateway
+from .supervisor import Supervisor, SupervisorStats, worker_metrics
@@ -0,0 +1,110 @@
+"""
+Frames of the voice gateway's WebSocket protocol.
+
+Every WebSocket text message is one JSON object with a `type`.
+
+Client to gateway:
+
+    {"type": "utterance", "text": "我叫李老三"}     # starts a turn, barging in on a running one
+    {"type": "playback", "offset": 12}              # see `AgentSession.report_playback`
+    {"type": "cancel"}                              # barge-in without a new utterance
+
+Gateway to client:
+
+    {"type": "ready", "session_id": "...", "agent": "step_1"}
+    {"type": "text", "delta": "您好，", "offset": 0, "agent": "step_1"}
+    {"type": "handoff_pending", "source": "step_1", "target": "step_2"}
+    {"type": "handoff", "source": "step_1", "target": "step_2"}
+    {"type": "hangup", "agent": "hangup"}           # the gateway closes the connection after it
+    {"type": "cancelled", "reason": "barge_in"}
+    {"type": "turn_end", "agent": "step_2", "finish_reason": "stop", "ttft": 0.31, "total": 1.2}
+    {"type": "draining"}                            # the gateway shuts down after the running turn
+    {"type": "error", "message": "..."}
+
+Tool calls and results stay in the session, they are not sent.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from voice_agent_flow.agents.events import (
+    AgentHandoff,
+    AgentResult,
+    AgentTextStream,
+    HandoffPending,
+    HangupSignal,
+    InferenceFinish,
+    TurnCancelled,
+)
+
+# client frames
+UTTERANCE = "utterance"
+PLAYBACK = "playback"
+CANCEL = "cancel"
+
+# gateway frames
+READY = "ready"
+TEXT = "text"
+HANDOFF_PENDING = "handoff_pending"
+HANDOFF = "handoff"
+HANGUP = "hangup"
+CANCELLED = "cancelled"
+TURN_END = "turn_end"
+DRAINING = "draining"
+ERROR = "error"
+
+
+class ProtocolError(ValueError):
+    """A client frame that does not follow the protocol."""
+
+
+def encode(frame: dict[str, Any]) -> str:
+    return json.dumps(frame, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode(message: str | bytes) -> dict[str, Any]:
+    """A client frame, checked against the protocol."""
+    try:
+        frame = json.loads(message)
+    except ValueError as exc:
+        raise ProtocolError(f"Frame is not JSON: {exc}") from None
+    if not isinstance(frame, dict):
+        raise ProtocolError("Frame is not a JSON object.")
+    kind = frame.get("type")
+    if kind == UTTERANCE:
+        if not isinstance(frame.get("text"), str):
+            raise ProtocolError("An utterance needs a 'text' string.")
+    elif kind == PLAYBACK:
+        if not isinstance(frame.get("offset"), int):
+            raise ProtocolError("A playback report needs an integer 'offset'.")
+    elif kind != CANCEL:
+        raise ProtocolError(f"Unknown frame type {kind!r}, choose from {[UTTERANCE, PLAYBACK, CANCEL]}.")
+    return frame
+
+
+def result_frame(result: AgentResult) -> dict[str, Any] | None:
+    """The frame of a turn's result, None for results that are not sent."""
+    event = result.event
+    if isinstance(event, AgentTextStream):
+        return {"type": TEXT, "delta": event.delta, "offset": event.offset, "agent": result.last_agent_name}
+    if isinstance(event, (HandoffPending, AgentHandoff)):
+        return {
+            "type": HANDOFF_PENDING if isinstance(event, HandoffPending) else HANDOFF,
+            "source": event.message["source_agent_name"],
+            "target": event.message["target_agent_name"],
+        }
+    if isinstance(event, HangupSignal):
+        return {"type": HANGUP, "agent": result.last_agent_name}
+    if isinstance(event, TurnCancelled):
+        return {"type": CANCELLED, "reason": event.message["reason"]}
+    if isinstance(event, InferenceFinish):
+        timings = event.timings
+        return {
+            "type": TURN_END,
+            "agent": result.last_agent_name,
+            "finish_reason": result.finish_reason,
+            "ttft": timings.ttft if timings is not None else None,
+            "total": timings.total if timings is not None else None,
+        }
+    return None
@@ -0,0 +1,301 @@
+"""
+Asyncio WebSocket server hosting many `AgentSession`s, one per connection.
+
+    def create_session(session_id: str, params: dict[str, str]) -> AgentSession:
+        variables = car_loan.session_variables(params["customer_name"], params["phone_number"])
+        return car_loan.create_agent_session(variables=variables, sinks=[])
+
+    gateway = VoiceGateway(create_session, max_sessions=5000, max_lag=0.1, idle_timeout=300)
+    await gateway.start("0.0.0.0", 8765)
+    ...
+    await gateway.shutdown()
+
+A client connects to `ws://host:port/?name=value...`, and the gateway creates its session
+with `session_factory(session_id, params)` (sync or async); the query parameters are the
+params and `session_id` is the `session_id` parameter, if given, or a new id. The frames
+are those of `voice_agent_flow.gateway.protocol`. Build the sessions with `sinks=[]`: the
+gateway adds a coalescing `QueueSink` per session, drained by the connection's writer task,
+so a slow client gets fewer, longer text deltas and never holds up other sessions.
+
+- Isolation: every turn runs in its own task. An utterance during a turn cancels it
+  (barge-in) before the next turn starts. A turn that raises is logged and reported to
+  its client with an `error` frame; the session stays open.
+- Admission: a ticker task measures the event loop's lag (how late a timer fires,
+  smoothed). While it exceeds `max_lag`, or `max_sessions` sessions are open, or the
+  gateway is draining, new connections get HTTP 503 before the WebSocket handshake.
+- Idle reaping: a session without a turn and without client frames for `idle_timeout`
+  seconds is closed (code 1000, "idle").
+- Drain: `shutdown()` stops accepting connections, sends `draining` to every client, lets
+  running turns finish and closes each connection once its turn is done (code 1001).
+  Turns still running after `drain_timeout` seconds are cancelled.
+
+`stats` counts accepted and rejected connections, turns, turn errors and reaped
+sessions, with the current loop lag. Requires the `websockets` package.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable
+from urllib.parse import parse_qsl, urlsplit
+
+from websockets.asyncio.server import Server, ServerConnection, serve
+from websockets.exceptions import ConnectionClosed
+from websockets.http11 import Request, Response
+
+from voice_agent_flow.agents.chat import AgentSession
+from voice_agent_flow.agents.sinks import COALESCE, QueueSink
+from voice_agent_flow.gateway.protocol import (
+    CANCEL,
+    DRAINING,
+    ERROR,
+    PLAYBACK,
+    READY,
+    UTTERANCE,
+    ProtocolError,
+    decode,
+    encode,
+    result_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+SessionFactory = Callable[[str, dict[str, str]], AgentSession | Awaitable[AgentSession]]
+
+
+@dataclass(slots=True)
+class GatewayStats:
+    accepted: int = 0
+    # connections refused by admission control, and why
+    rejected: int = 0
+    rejected_lag: int = 0
+    active: int = 0
+    peak: int = 0
+    turns: int = 0
+    # turns that raised
+    errors: int = 0
+    # sessions closed by the idle reaper
+    reaped: int = 0
+    # smoothed event loop lag in seconds
+    lag: float = 0.0
+
+
+class VoiceGateway:
+    """Hosts one `AgentSession` per WebSocket connection, see the module docstring."""
+
+    def __init__(
+        self,
+        session_factory: SessionFactory,
+        max_sessions: int = 10000,
+        max_lag: float = 0.1,
+        idle_timeout: float = 300.0,
+        drain_timeout: float = 30.0,
+        queue_size: int = 256,
+        lag_interval: float = 0.05,
+    ):
+        self.session_factory = session_factory
+        self.max_sessions = max_sessions
+        self.max_lag = max_lag
+        self.idle_timeout = idle_timeout
+        self.drain_timeout = drain_timeout
+        self.queue_size = queue_size
+        self.lag_interval = lag_interval
+        self.stats = GatewayStats()
+        self.draining = False
+        self._server: Server | None = None
+        self._connections: dict[str, _Connection] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Listen on `host`:`port` (0: any free port), returns the gateway's URL."""
+        self._server = await serve(
+            self._handle, host, port,
+            process_request=self._admit,
+            # frames are small and many, per-connection compression state costs more than it saves
+            compression=None,
+        )
+        self._tasks = [asyncio.create_task(self._measure_lag()), asyncio.create_task(self._reap())]
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+    async def shutdown(self, timeout: float | None = None) -> None:
+        """Drain: refuse new connections, let running turns finish, then close every session."""
+        timeout = self.drain_timeout if timeout is None else timeout
+        self.draining = True
+        if self._server is not None:
+            self._server.close(close_connections=False)
+        connections = list(self._connections.values())
+        drains = [asyncio.create_task(connection.drain()) for connection in connections]
+        if drains:
+            _, pending = await asyncio.wait(drains, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*drains, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _admit(self, connection: ServerConnection, request: Request) -> Response | None:
+        if self.draining:
+            reason = "draining"
+        elif len(self._connections) >= self.max_sessions:
+            reason = "too many sessions"
+        elif self.stats.lag > self.max_lag:
+            reason = "overloaded"
+            self.stats.rejected_lag += 1
+        else:
+            return None
+        self.stats.rejected += 1
+        return connection.respond(HTTPStatus.SERVICE_UNAVAILABLE, f"Gateway {reason}, retry later.\n")
+
+    async def _handle(self, websocket: ServerConnection) -> None:
+        params = dict(parse_qsl(urlsplit(websocket.request.path).query))
+        session_id = params.pop("session_id", None) or uuid.uuid4().hex
+        if session_id in self._connections:
+            await websocket.close(1008, "session already connected")
+            return
+        try:
+            session = self.session_factory(session_id, params)
+            if inspect.isawaitable(session):
+                session = await session
+        except Exception:
+            logger.exception("creating session %s failed", session_id)
+            await websocket.close(1011, "session creation failed")
+            return
+
+        connection = _Connection(self, session_id, session, websocket)
+        self._connections[session_id] = connection
+        self.stats.accepted += 1
+        self.stats.active = len(self._connections)
+        self.stats.peak = max(self.stats.peak, self.stats.active)
+        try:
+            await connection.serve()
+        finally:
+            del self._connections[session_id]
+            self.stats.active = len(self._connections)
+
+    async def _measure_lag(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(time.monotonic() - start - self.lag_interval, 0.0)
+            self.stats.lag = 0.7 * self.stats.lag + 0.3 * lag
+
+    async def _reap(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.idle_timeout / 4, 10.0))
+            now = time.monotonic()
+            idle = [connection for connection in self._connections.values()
+                    if connection.turn is None and now - connection.last_active > self.idle_timeout]
+            if idle:
+                logger.info("closing %d idle sessions", len(idle))
+                self.stats.reaped += len(idle)
+                await asyncio.gather(*(connection.websocket.close(1000, "idle") for connection in idle))
+
+
+class _Connection:
+    """One client: its session, the running turn and the writer of its frames."""
+
+    def __init__(self, gateway: VoiceGateway, session_id: str, session: AgentSession,
+                 websocket: ServerConnection):
+        self.gateway = gateway
+        self.session_id = session_id
+        self.session = session
+        self.websocket = websocket
+        self.sink = QueueSink(maxsize=gateway.queue_size, policy=COALESCE)
+        session.add_sink(self.sink)
+        self.turn: asyncio.Task | None = None
+        self.last_active = time.monotonic()
+        self._writer: asyncio.Task | None = None
+
+    async def serve(self) -> None:
+        await self._send({"type": READY, "session_id": self.session_id, "agent": self.session.current_agent.name})
+        self._writer = asyncio.create_task(self._write())
+        try:
+            async for message in self.websocket:
+                self.last_active = time.monotonic()
+                try:
+                    frame = decode(message)
+                except ProtocolError as exc:
+                    await self._send({"type": ERROR, "message": str(exc)})
+                    continue
+                await self._receive(frame)
+        except ConnectionClosed:
+            pass
+        finally:
+            # the client is gone: stop the turn, the writer ends once the sink is drained
+            if self.turn is not None:
+                self.session.cancel("disconnected")
+                await asyncio.gather(self.turn, return_exceptions=True)
+            await self.session.close()
+            await asyncio.gather(self._writer, return_exceptions=True)
+
+    async def drain(self) -> None:
+        """Close the connection once the running turn, if any, is done."""
+        await self._send({"type": DRAINING})
+        try:
+            if self.turn is not None:
+                await asyncio.shield(self.turn)
+        except asyncio.CancelledError:
+            # the drain timed out
+            self.session.cancel("shutdown")
+            raise
+        finally:
+            await self.session.close()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            await self.websocket.close(1001, "shutdown")
+
+    async def _receive(self, frame: dict[str, Any]) -> None:
+        kind = frame["type"]
+        if kind == UTTERANCE:
+            if self.gateway.draining:
+                await self._send({"type": ERROR, "message": "The gateway is shutting down."})
+                return
+            if self.turn is not None:
+                self.session.cancel("barge_in")
+                await asyncio.gather(self.turn, return_exceptions=True)
+            if self.session.finished:
+                return
+            self.turn = asyncio.create_task(self._run_turn(frame["text"]))
+        elif kind == PLAYBACK:
+            self.session.report_playback(frame["offset"])
+        elif kind == CANCEL:
+            self.session.cancel("barge_in")
+
+    async def _run_turn(self, text: str) -> None:
+        self.gateway.stats.turns += 1
+        try:
+            await self.session.chat(text)
+        except Exception as exc:
+            self.gateway.stats.errors += 1
+            logger.exception("turn of session %s failed", self.session_id)
+            await self._send({"type": ERROR, "message": f"The turn failed: {type(exc).__name__}."})
+        self.last_active = time.monotonic()
+        if self.session.finished:
+            # hung up: the client gets the remaining frames, then the close
+            await self.session.close()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            await self.websocket.close(1000, "hangup")
+        self.turn = None
+
+    async def _write(self) -> None:
+        async for result in self.sink:
+            frame = result_frame(result)
+            if frame is not None and not await self._send(frame):
+                # the client is gone, later results are dropped instead of filling the queue
+                await self.sink.close()
+                return
+
+    async def _send(self, frame: dict[str, Any]) -> bool:
+        try:
+            await self.websocket.send(encode(frame))
+            return True
+        except ConnectionClosed:
+            return False
@@ -0,0 +1,297 @@
+"""
+Sessions sharded over worker processes, one event loop per CPU core.
+
+One loop saturates one core at a few hundred concurrent calls (pydantic validation and
+event mapping are CPU bound). `Supervisor` starts `workers` processes, each running its
+own loop and `VoiceGateway`, with its own `default_registry` and `default_pool` (module
+state is per process), and sends every new call to one of them:
+
+    supervisor = Supervisor(create_session, workers=os.cpu_count(), gateway_options={"max_sessions": 2000},
+                            advertise_host="voice-1.internal")
+    url = await supervisor.start("0.0.0.0", 8765)
+    ...
+    supervisor.metrics.percentiles(TTFT)      # over all workers
+    await supervisor.shutdown()
+
+`create_session` (and `worker_init`, run once in every worker before it serves, e.g. to
+`warmup` the registry or `prewarm` the pool) is called in the workers, so it must be a
+module level function. Sessions report their timings to `worker_metrics`, the
+`HistogramSink` of their worker process:
+
+    MultiAgentRunner(agents, "step_1", metrics_sink=worker_metrics)
+
+Routing: clients connect to the supervisor's URL and are redirected (HTTP 307, followed by
+WebSocket clients such as `websockets`) to a worker's gateway. The worker is chosen by a
+stable hash of the `affinity` query parameter (`session_id` by default), so a reconnecting
+call lands on the worker that holds its session. A call without one gets a new
+`session_id` in the redirect. Front ends that do not follow redirects can ask
+`worker_url(key)` and connect to the worker directly. Workers listen on the supervisor's
+bind host; the URLs handed to clients use `advertise_host`, the name clients reach this
+machine by (by default the bind host, or the machine's host name for a wildcard bind
+such as "0.0.0.0").
+
+Every `report_interval` seconds each worker sends its `GatewayStats` and the histograms
+observed since its last report; `stats` and `metrics` aggregate them. A worker that dies
+is restarted, its calls meanwhile go to the next worker. `shutdown()` drains every worker
+(SIGTERM, see `VoiceGateway.shutdown`).
+"""
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import inspect
+import logging
+import multiprocessing
+import queue
+import signal
+import socket
+import time
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any, Callable
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from websockets.asyncio.server import Server, ServerConnection, serve
+from websockets.http11 import Request, Response
+
+from voice_agent_flow.agents.metrics import HistogramSink
+from voice_agent_flow.gateway.server import GatewayStats, SessionFactory, VoiceGateway
+
+logger = logging.getLogger(__name__)
+
+# timings of the sessions of this worker process, sent to the supervisor with every report
+worker_metrics = HistogramSink()
+
+_READY = "ready"
+_REPORT = "report"
+
+
+@dataclass(slots=True)
+class SupervisorStats:
+    workers: int = 0
+    # calls sent to a worker, and workers restarted after they died
+    routed: int = 0
+    restarts: int = 0
+    # summed over the workers' last reports, `lag` is the worst worker's
+    gateway: GatewayStats = field(default_factory=GatewayStats)
+    # per worker index
+    per_worker: dict[int, GatewayStats] = field(default_factory=dict)
+
+
+class Supervisor:
+    """Starts `VoiceGateway` worker processes and routes calls to them, see the module docstring."""
+
+    def __init__(
+        self,
+        session_factory: SessionFactory,
+        workers: int | None = None,
+        gateway_options: dict[str, Any] | None = None,
+        worker_init: Callable[[], Any] | None = None,
+        affinity: str = "session_id",
+        report_interval: float = 1.0,
+        start_timeout: float = 60.0,
+        advertise_host: str | None = None,
+    ):
+        self.session_factory = session_factory
+        self.workers = workers or multiprocessing.cpu_count()
+        self.gateway_options = dict(gateway_options or {})
+        self.worker_init = worker_init
+        self.affinity = affinity
+        self.report_interval = report_interval
+        self.start_timeout = start_timeout
+        # host name in the URLs given to clients, None: derived from the bind host
+        self.advertise_host = advertise_host
+        self.stats = SupervisorStats(workers=self.workers)
+        self.metrics = HistogramSink()
+        self._context = multiprocessing.get_context("spawn")
+        self._reports = self._context.Queue()
+        self._processes: list[multiprocessing.Process | None] = [None] * self.workers
+        self._urls: list[str | None] = [None] * self.workers
+        self._host = "127.0.0.1"
+        self._advertised = "127.0.0.1"
+        self._server: Server | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._closing = False
+        # counters of the workers that died, so the totals do not drop when they restart
+        self._retired = GatewayStats()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start the workers and listen for calls on `host`:`port`, returns the supervisor's URL."""
+        self._host = host
+        self._advertised = self.advertise_host or _advertised_host(host)
+        for index in range(self.workers):
+            self._spawn(index)
+        self._tasks = [asyncio.create_task(self._collect()), asyncio.create_task(self._watch())]
+        deadline = time.monotonic() + self.start_timeout
+        while not all(self._urls):
+            if time.monotonic() > deadline:
+                await self.shutdown()
+                raise TimeoutError(f"Workers did not start within {self.start_timeout} seconds.")
+            await asyncio.sleep(0.05)
+        self._server = await serve(self._refuse, host, port, process_request=self._route, compression=None)
+        port = self._server.sockets[0].getsockname()[1]
+        return _ws_url(self._advertised, port)
+
+    def worker_url(self, key: str) -> str | None:
+        """The gateway URL of the worker for affinity `key`; the next one while it restarts."""
+        start = zlib.crc32(key.encode()) % self.workers
+        for offset in range(self.workers):
+            url = self._urls[(start + offset) % self.workers]
+            if url is not None:
+                return url
+        return None
+
+    async def shutdown(self) -> None:
+        """Stop routing calls and drain every worker."""
+        self._closing = True
+        if self._server is not None:
+            self._server.close()
+        processes = [process for process in self._processes if process is not None]
+        for process in processes:
+            process.terminate()
+        drain = self.gateway_options.get("drain_timeout", 30.0)
+        await asyncio.gather(*(asyncio.to_thread(process.join, drain + 5.0) for process in processes))
+        for process in processes:
+            if process.is_alive():
+                logger.warning("worker process %d did not drain in time, killing it", process.pid)
+                process.kill()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._drain_reports()
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    def _spawn(self, index: int) -> None:
+        self._urls[index] = None
+        process = self._context.Process(
+            target=_run_worker,
+            args=(index, self.session_factory, self.gateway_options, self.worker_init, self._host,
+                  self.report_interval, self._reports),
+            name=f"voice-gateway-{index}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[index] = process
+
+    def _route(self, connection: ServerConnection, request: Request) -> Response:
+        target = urlsplit(request.path)
+        params = dict(parse_qsl(target.query))
+        if not params.get("session_id"):
+            params["session_id"] = uuid.uuid4().hex
+        url = self.worker_url(params.get(self.affinity) or params["session_id"])
+        if url is None:
+            return connection.respond(HTTPStatus.SERVICE_UNAVAILABLE, "No worker available, retry later.\n")
+        self.stats.routed += 1
+        response = connection.respond(HTTPStatus.TEMPORARY_REDIRECT, "")
+        response.headers["Location"] = f"{url}{target.path or '/'}?{urlencode(params)}"
+        return response
+
+    async def _refuse(self, websocket: ServerConnection) -> None:
+        # every handshake is redirected by `_route`, no connection is accepted here
+        await websocket.close(1011)
+
+    async def _collect(self) -> None:
+        while True:
+            try:
+                message = await asyncio.to_thread(self._reports.get, True, 0.5)
+            except queue.Empty:
+                continue
+            self._receive(message)
+
+    def _drain_reports(self) -> None:
+        while True:
+            try:
+                self._receive(self._reports.get_nowait())
+            except queue.Empty:
+                return
+
+    def _receive(self, message: tuple) -> None:
+        kind, index, payload = message[0], message[1], message[2:]
+        if kind == _READY:
+            # workers report their port, the URL is built with the advertised host
+            self._urls[index] = _ws_url(self._advertised, payload[0])
+            return
+        stats, histograms = payload
+        self.stats.per_worker[index] = stats
+        for key, histogram in histograms.items():
+            merged = self.metrics.histograms.get(key)
+            if merged is None:
+                self.metrics.histograms[key] = histogram
+            else:
+                merged.merge(histogram)
+        total = dataclasses.replace(self._retired)
+        for worker in self.stats.per_worker.values():
+            _add(total, worker)
+            total.active += worker.active
+            total.peak += worker.peak
+            total.lag = max(total.lag, worker.lag)
+        self.stats.gateway = total
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(1.0)
+            for index, process in enumerate(self._processes):
+                if process is not None and not process.is_alive() and not self._closing:
+                    logger.error("worker %d exited with %s, restarting it", index, process.exitcode)
+                    self.stats.restarts += 1
+                    retired = self.stats.per_worker.pop(index, None)
+                    if retired is not None:
+                        _add(self._retired, retired)
+                    self._spawn(index)
+
+
+def _advertised_host(host: str) -> str:
+    """The host name clients can reach a server bound to `host` by."""
+    if host in ("", "0.0.0.0", "::"):
+        return socket.gethostname()
+    return host
+
+
+def _ws_url(host: str, port: int) -> str:
+    if ":" in host:
+        host = f"[{host}]"
+    return f"ws://{host}:{port}"
+
+
+def _add(total: GatewayStats, stats: GatewayStats) -> None:
+    for name in ("accepted", "rejected", "rejected_lag", "turns", "errors", "reaped"):
+        setattr(total, name, getattr(total, name) + getattr(stats, name))
+
+
+def _run_worker(index: int, session_factory: SessionFactory, gateway_options: dict[str, Any],
+                worker_init: Callable[[], Any] | None, host: str, report_interval: float,
+                reports: multiprocessing.Queue) -> None:
+    asyncio.run(_serve_worker(index, session_factory, gateway_options, worker_init, host, report_interval, reports))
+
+
+async def _serve_worker(index: int, session_factory: SessionFactory, gateway_options: dict[str, Any],
+                        worker_init: Callable[[], Any] | None, host: str, report_interval: float,
+                        reports: multiprocessing.Queue) -> None:
+    if worker_init is not None:
+        value = worker_init()
+        if inspect.isawaitable(value):
+            await value
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, stop.set)
+    loop.add_signal_handler(signal.SIGINT, stop.set)
+
+    gateway = VoiceGateway(session_factory, **gateway_options)
+    url = await gateway.start(host, 0)
+    reports.put((_READY, index, urlsplit(url).port))
+
+    def report() -> None:
+        histograms, worker_metrics.histograms = worker_metrics.histograms, {}
+        reports.put((_REPORT, index, dataclasses.replace(gateway.stats), histograms))
+
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), report_interval)
+        except asyncio.TimeoutError:
+            pass
+        report()
+    await gateway.shutdown()
+    report()
@@ -1,2 +1,5 @@
 from .pydantic_provider import create_pydantic_azure_openai
-from .pydantic_provider import create_ollama_model
\ No newline at end of file
+from .pydantic_provider import create_ollama_model
+from .client_pool import ClientPool, default_pool
+from .hedging import HedgeBudget, HedgedModel
+from .router import SLO, CircuitBreakers, ModelRouter
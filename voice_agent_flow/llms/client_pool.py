@@ -0,0 +1,198 @@
+"""
+Shared, pooled model clients.
+
+Every `AsyncOpenAI` / `AsyncAzureOpenAI` client owns an HTTP connection pool, so creating
+one per session means a TCP/TLS handshake on the first request of every call and idle
+keep-alive sockets per session. `ClientPool` keeps one keep-alive HTTP client per
+endpoint and one model per (endpoint, model name); sessions borrow the shared model
+instead of creating their own:
+
+    model = default_pool.azure_openai("gpt-4o-mini")        # same instance for every session
+    await default_pool.prewarm(connections=4)                # optional, at startup
+    default_pool.stats()                                     # in-use / idle connections per endpoint
+
+`create_pydantic_azure_openai` and `create_ollama_model` borrow from `default_pool`.
+
+Connection limits are `httpx.Limits`: `max_connections` caps concurrent requests per
+endpoint (further requests wait for a free connection), `max_keepalive_connections` the
+idle sockets kept open. httpx connections belong to the event loop that opened them, so
+each shared HTTP client keeps one connection pool per running loop (`LoopTransport`): the
+same model works in consecutive `asyncio.run` calls, e.g. eval runs, and the pools of
+closed loops are dropped. Limits apply per loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import weakref
+from dataclasses import dataclass
+from typing import Callable
+
+import httpx
+from openai import AsyncAzureOpenAI, AsyncOpenAI
+from pydantic_ai.models.openai import OpenAIChatModel
+from pydantic_ai.providers.ollama import OllamaProvider
+from pydantic_ai.providers.openai import OpenAIProvider
+
+from voice_agent_flow.load_env import get_env_var, load_environment
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60.0)
+
+
+@dataclass(slots=True)
+class EndpointStats:
+    """Connections of one endpoint's shared HTTP client, and how often its models were borrowed."""
+
+    endpoint: str
+    models: int = 0
+    borrowed: int = 0
+    connections: int = 0
+    in_use: int = 0
+    idle: int = 0
+
+
+class LoopTransport(httpx.AsyncBaseTransport):
+    """An `httpx.AsyncHTTPTransport` (connection pool) per running event loop."""
+
+    def __init__(self, limits: httpx.Limits = DEFAULT_LIMITS):
+        self.limits = limits
+        self._transports: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport] = (
+            weakref.WeakKeyDictionary())
+
+    def current(self) -> httpx.AsyncHTTPTransport:
+        """The transport of the running loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        transport = self._transports.get(loop)
+        if transport is None:
+            for closed in [other for other in self._transports if other.is_closed()]:
+                # its sockets died with the loop, nothing left to close
+                del self._transports[closed]
+            transport = self._transports[loop] = httpx.AsyncHTTPTransport(limits=self.limits)
+        return transport
+
+    def transports(self) -> list[httpx.AsyncHTTPTransport]:
+        return list(self._transports.values())
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.current().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        """Close the running loop's connections, forget the other loops' pools."""
+        transport = self._transports.pop(asyncio.get_running_loop(), None)
+        self._transports.clear()
+        if transport is not None:
+            await transport.aclose()
+
+
+class ClientPool:
+    """One keep-alive client per endpoint and one model per (endpoint, model name), see the module docstring."""
+
+    def __init__(self, limits: httpx.Limits = DEFAULT_LIMITS, timeout: float | httpx.Timeout = 600.0):
+        self.limits = limits
+        self.timeout = timeout
+        # endpoint -> (openai client, its http client)
+        self._clients: dict[str, tuple[AsyncOpenAI, httpx.AsyncClient]] = {}
+        self._models: dict[tuple[str, str], OpenAIChatModel] = {}
+        self._stats: dict[str, EndpointStats] = {}
+
+    def azure_openai(self, model_name: str, **client_kwargs) -> OpenAIChatModel:
+        """The shared Azure OpenAI model; the endpoint and key come from the environment unless given."""
+        load_environment()
+        endpoint = "azure:" + (client_kwargs.get("azure_endpoint") or get_env_var("AZURE_OPENAI_ENDPOINT", ""))
+        if client_kwargs:
+            # clients with different settings (keys, api versions) are not shared, keep secrets out of the name
+            endpoint += f"#{hash(repr(sorted(client_kwargs.items()))) & 0xffffffff:08x}"
+        return self._model(
+            endpoint, model_name,
+            lambda http_client: AsyncAzureOpenAI(http_client=http_client, **client_kwargs),
+            lambda client: OpenAIProvider(openai_client=client),
+        )
+
+    def openai_compatible(self, model_name: str, base_url: str, api_key: str = "api-key-not-set") -> OpenAIChatModel:
+        """The shared model of an OpenAI compatible server (vLLM, Ollama, ...)."""
+        return self._model(
+            base_url, model_name,
+            lambda http_client: AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=http_client),
+            lambda client: OpenAIProvider(openai_client=client),
+        )
+
+    def ollama(self, model_name: str, base_url: str = "http://localhost:11434/v1") -> OpenAIChatModel:
+        return self._model(
+            "ollama:" + base_url, model_name,
+            lambda http_client: AsyncOpenAI(base_url=base_url, api_key="api-key-not-set", http_client=http_client),
+            lambda client: OllamaProvider(openai_client=client),
+        )
+
+    async def prewarm(self, connections: int = 1, endpoints: list[str] | None = None) -> dict[str, EndpointStats]:
+        """
+        Open `connections` keep-alive connections to each endpoint (all by default) with
+        concurrent `GET /models` requests, so the first calls skip the TCP/TLS handshake.
+        Error responses still leave the connection open; failures are logged, not raised.
+        At most `limits.max_keepalive_connections` stay open.
+        """
+        requests = []
+        for endpoint, (client, _) in self._clients.items():
+            if endpoints is None or endpoint in endpoints:
+                requests += [self._touch(endpoint, client) for _ in range(connections)]
+        await asyncio.gather(*requests)
+        return self.stats()
+
+    def stats(self) -> dict[str, EndpointStats]:
+        """Connection counts right now, per endpoint."""
+        for endpoint, (_, http_client) in self._clients.items():
+            stats = self._stats[endpoint]
+            stats.connections = stats.in_use = stats.idle = 0
+            # httpx does not expose its connection pool, the transport's httpcore pool does
+            transport: LoopTransport = http_client._transport
+            connections = [connection for loop_transport in transport.transports()
+                           for connection in getattr(getattr(loop_transport, "_pool", None), "connections", ())]
+            for connection in connections:
+                if connection.is_closed():
+                    continue
+                stats.connections += 1
+                if connection.is_idle():
+                    stats.idle += 1
+                else:
+                    stats.in_use += 1
+        return self._stats
+
+    async def aclose(self) -> None:
+        """Close every shared client; models borrowed before can not be used afterwards."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        self._models.clear()
+        self._stats.clear()
+        for _, http_client in clients:
+            await http_client.aclose()
+
+    def _model(
+        self,
+        endpoint: str,
+        model_name: str,
+        create_client: Callable[[httpx.AsyncClient], AsyncOpenAI],
+        create_provider: Callable[[AsyncOpenAI], object],
+    ) -> OpenAIChatModel:
+        model = self._models.get((endpoint, model_name))
+        if model is None:
+            if endpoint not in self._clients:
+                http_client = httpx.AsyncClient(transport=LoopTransport(self.limits), timeout=self.timeout)
+                self._clients[endpoint] = (create_client(http_client), http_client)
+                self._stats[endpoint] = EndpointStats(endpoint=endpoint)
+            client, _ = self._clients[endpoint]
+            model = self._models[(endpoint, model_name)] = OpenAIChatModel(
+                model_name=model_name, provider=create_provider(client))
+            self._stats[endpoint].models += 1
+        self._stats[endpoint].borrowed += 1
+        return model
+
+    async def _touch(self, endpoint: str, client: AsyncOpenAI) -> None:
+        try:
+            await client.models.list()
+        except Exception as exc:
+            logger.debug("prewarm request to %s failed: %s", endpoint, exc)
+
+
+# shared by `create_pydantic_azure_openai` and `create_ollama_model`
+default_pool = ClientPool()
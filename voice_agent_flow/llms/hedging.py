@@ -0,0 +1,300 @@
+"""
+Hedged model requests.
+
+A few upstream requests take far longer than the rest to their first token (a busy
+replica, a slow prefill, a stalled connection), and they set the p99 TTFT. `HedgedModel`
+wraps a pydantic_ai model: when a streamed request has not produced its first event
+after `threshold` seconds, it sends the same request again, to the same model or to an
+alternate one, streams from whichever answers first and cancels the other:
+
+    model = HedgedModel(create_pydantic_azure_openai("gpt-4o-mini"), threshold=0.8)
+    AgentNode(..., model=model)
+
+Set `threshold` around the p95 TTFT of the endpoint (`HistogramSink.percentiles(TTFT, ...)`),
+so only the slow tail is hedged.
+
+Hedges are capped per endpoint by a `HedgeBudget`: every request earns `ratio` of a hedge,
+up to `burst` saved up, and a hedge spends one. Hedging therefore adds at most `ratio` of
+the endpoint's requests (plus `burst`), also when the endpoint itself is slow for
+everyone; once the budget is used up, slow requests just wait for the primary. The budget is shared by
+all `HedgedModel`s of the process unless one is given.
+
+`stats` counts requests, hedges, hedge wins and hedges denied by the budget. The latency
+a winning hedge saved is only known once the cancelled primary would have answered, so it
+is sampled: for a `probe` share of the hedge wins the primary is kept until its first
+event (at most `probe_timeout` seconds) and cancelled then, and `stats.saved_per_win` is
+the mean saving of these probes. With a `metrics_sink` every streamed request reports
+its TTFT (`HEDGED_TTFT`), and every probe the saving (`HEDGE_SAVED`), tagged with the
+model name.
+
+Only streamed requests (`request_stream`, used by the runners) are hedged.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Any
+
+from pydantic_ai.messages import FinalResultEvent, ModelMessage, ModelResponse, ModelResponseStreamEvent
+from pydantic_ai.models import KnownModelName, Model, ModelRequestParameters, StreamedResponse, infer_model
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+
+if TYPE_CHECKING:
+    from pydantic_ai import RunContext
+
+    from voice_agent_flow.agents.metrics import MetricsSink
+
+# metric names reported to a `MetricsSink`, values in seconds
+HEDGED_TTFT = "hedged_ttft"
+HEDGE_SAVED = "hedge_saved"
+
+# end of an attempt's events
+_END = object()
+
+
+@dataclass(slots=True)
+class HedgeStats:
+    requests: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+    # hedges the budget did not allow
+    denied: int = 0
+    # hedge wins whose primary was followed to its first event, and the seconds they saved
+    probes: int = 0
+    saved: float = 0.0
+
+    @property
+    def hedge_rate(self) -> float | None:
+        return self.hedged / self.requests if self.requests else None
+
+    @property
+    def win_rate(self) -> float | None:
+        return self.hedge_wins / self.hedged if self.hedged else None
+
+    @property
+    def saved_per_win(self) -> float | None:
+        return self.saved / self.probes if self.probes else None
+
+
+class HedgeBudget:
+    """Hedges allowed per endpoint: each request earns `ratio` of one, at most `burst` are saved up."""
+
+    def __init__(self, ratio: float = 0.1, burst: float = 10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens: dict[str, float] = {}
+
+    def earn(self, endpoint: str) -> None:
+        self._tokens[endpoint] = min(self._tokens.get(endpoint, self.burst) + self.ratio, self.burst)
+
+    def spend(self, endpoint: str) -> bool:
+        """Take one hedge from the endpoint's budget, False if there is none left."""
+        tokens = self._tokens.get(endpoint, self.burst)
+        if tokens < 1.0:
+            return False
+        self._tokens[endpoint] = tokens - 1.0
+        return True
+
+
+# shared by the `HedgedModel`s without a budget of their own
+default_budget = HedgeBudget()
+
+
+@dataclass(init=False)
+class HedgedModel(WrapperModel):
+    """Sends a second request when the first is slow to its first event, see the module docstring."""
+
+    def __init__(
+        self,
+        wrapped: Model | KnownModelName,
+        hedge: Model | KnownModelName | None = None,
+        threshold: float = 1.0,
+        budget: HedgeBudget | None = None,
+        metrics_sink: MetricsSink | None = None,
+        probe: float = 0.05,
+        probe_timeout: float = 10.0,
+    ):
+        super().__init__(wrapped)
+        self.hedge = infer_model(hedge) if hedge is not None else self.wrapped
+        self.threshold = threshold
+        self.budget = budget if budget is not None else default_budget
+        self.metrics_sink = metrics_sink
+        self.probe = probe
+        self.probe_timeout = probe_timeout
+        self.stats = HedgeStats()
+        self.endpoint = f"{self.wrapped.system}:{self.wrapped.base_url or self.wrapped.model_name}"
+        # primaries followed after their hedge won
+        self._probes: set[asyncio.Task] = set()
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context: RunContext[Any] | None = None,
+    ) -> AsyncGenerator[StreamedResponse, None]:
+        args = (messages, model_settings, model_request_parameters, run_context)
+        started = time.monotonic()
+        self.stats.requests += 1
+        self.budget.earn(self.endpoint)
+
+        primary = _Attempt(self.wrapped, args)
+        attempts = [primary]
+        try:
+            done, _ = await asyncio.wait({primary.first}, timeout=self.threshold)
+            if not done:
+                if self.budget.spend(self.endpoint):
+                    attempts.append(_Attempt(self.hedge, args))
+                    self.stats.hedged += 1
+                else:
+                    self.stats.denied += 1
+            winner = await _race(attempts)
+            ttft = time.monotonic() - started
+            if self.metrics_sink is not None:
+                self.metrics_sink.observe(HEDGED_TTFT, ttft, self.model_name)
+
+            if winner is not primary:
+                self.stats.hedge_wins += 1
+                if int(self.stats.hedge_wins * self.probe) > int((self.stats.hedge_wins - 1) * self.probe):
+                    # measure the saving: the primary runs on until its first event
+                    attempts.remove(primary)
+                    task = asyncio.create_task(self._follow(primary, started, ttft))
+                    self._probes.add(task)
+                    task.add_done_callback(self._probes.discard)
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.task.cancel()
+            yield _HedgedStreamedResponse(model_request_parameters, winner)
+        finally:
+            await _close(attempts)
+
+    async def _follow(self, primary: _Attempt, started: float, ttft: float) -> None:
+        """Wait for the primary's first event after its hedge won, and record the time saved."""
+        try:
+            await asyncio.wait({primary.first}, timeout=self.probe_timeout)
+            if primary.first.done() and primary.first.exception() is not None:
+                return
+            primary_ttft = primary.first_at - started if primary.first.done() else self.probe_timeout
+        finally:
+            await _close([primary])
+
+        saved = max(primary_ttft - ttft, 0.0)
+        self.stats.probes += 1
+        self.stats.saved += saved
+        if self.metrics_sink is not None:
+            self.metrics_sink.observe(HEDGE_SAVED, saved, self.model_name)
+
+
+class _Attempt:
+    """One request, streamed into a queue by its own task, so it can be raced and cancelled."""
+
+    def __init__(self, model: Model, args: tuple):
+        self.events: asyncio.Queue = asyncio.Queue()
+        # the response, once its first event (or its end) arrived
+        self.first: asyncio.Future[StreamedResponse] = asyncio.get_running_loop().create_future()
+        self.first_at: float | None = None
+        self.task = asyncio.create_task(self._run(model, args))
+
+    async def _run(self, model: Model, args: tuple) -> None:
+        try:
+            async with model.request_stream(*args) as response:
+                async for event in response:
+                    if not self.first.done():
+                        self._answered(response)
+                    self.events.put_nowait(event)
+                if not self.first.done():
+                    self._answered(response)
+                self.events.put_nowait(_END)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            if not self.first.done():
+                self.first.set_exception(exc)
+            else:
+                self.events.put_nowait(exc)
+
+
+    def _answered(self, response: StreamedResponse) -> None:
+        self.first_at = time.monotonic()
+        self.first.set_result(response)
+
+
+async def _close(attempts: list[_Attempt]) -> None:
+    """Cancel the attempts and wait for their requests to close."""
+    for attempt in attempts:
+        attempt.task.cancel()
+    await asyncio.gather(*(attempt.task for attempt in attempts), return_exceptions=True)
+    for attempt in attempts:
+        # failures of the attempts that lost are not raised
+        if attempt.first.done() and not attempt.first.cancelled():
+            attempt.first.exception()
+
+
+async def _race(attempts: list[_Attempt]) -> _Attempt:
+    """The attempt that answered first; raises the primary's error if all of them failed."""
+    pending = {attempt.first for attempt in attempts}
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for attempt in attempts:
+            if attempt.first in done and attempt.first.exception() is None:
+                return attempt
+    raise attempts[0].first.exception()
+
+
+class _HedgedStreamedResponse(StreamedResponse):
+    """The winning attempt's response, its events read from the attempt's queue."""
+
+    def __init__(self, model_request_parameters: ModelRequestParameters, attempt: _Attempt):
+        super().__init__(model_request_parameters)
+        self.attempt = attempt
+        self.response = attempt.first.result()
+
+    def __aiter__(self) -> AsyncIterator[ModelResponseStreamEvent]:
+        # the events already passed through the winner's own `__aiter__`
+        if self._event_iterator is None:
+            self._event_iterator = self._get_event_iterator()
+        return self._event_iterator
+
+    async def _get_event_iterator(self) -> AsyncIterator[ModelResponseStreamEvent]:
+        while True:
+            event = await self.attempt.events.get()
+            self._usage = self.response._usage
+            if event is _END:
+                return
+            if isinstance(event, BaseException):
+                raise event
+            if isinstance(event, FinalResultEvent):
+                self.final_result_event = event
+            yield event
+
+    async def close_stream(self) -> None:
+        await self.response.cancel()
+
+    def get(self) -> ModelResponse:
+        return self.response.get()
+
+    @property
+    def model_name(self) -> str:
+        return self.response.model_name
+
+    @property
+    def provider_name(self) -> str | None:
+        return self.response.provider_name
+
+    @property
+    def provider_url(self) -> str | None:
+        return self.response.provider_url
+
+    @property
+    def timestamp(self) -> datetime:
+        return self.response.timestamp
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled or self.response.cancelled
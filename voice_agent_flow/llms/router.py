@@ -0,0 +1,383 @@
+"""
+SLO-aware model routing with circuit breakers.
+
+A flow pins one model per step, so when its endpoint degrades (slow first tokens, errors)
+every live call degrades with it. `ModelRouter` wraps a chain of models, primary first:
+
+    model = ModelRouter([qwen, gpt_4o_mini], slo=SLO(ttft=1.5, error_rate=0.2))
+    AgentNode(..., model=qwen, fallback_models=[gpt_4o_mini])    # the same, per node
+
+Every streamed request records its time to first event and whether it failed on the
+endpoint's `CircuitBreaker` (endpoints are shared by all routers of the process through
+`default_breakers`). The breaker keeps a rolling window of `slo.window` seconds; once it
+holds `slo.min_requests` requests and their `slo.percentile` TTFT exceeds `slo.ttft`, or
+their error rate exceeds `slo.error_rate`, the breaker opens and requests go to the next
+model of the chain whose breaker is closed. After `slo.cooldown` seconds one request
+probes the endpoint again (half open): within the SLO the breaker closes, otherwise it
+stays open for another cooldown.
+
+A request that fails before its first event is retried on the next model. Errors after
+that are raised, as the caller has already seen part of the response. If every breaker of
+the chain is open the models are tried in order anyway, a call must still be answered.
+
+Routing is per model request, so a turn's requests after a tool call may run on another
+model of the chain than the first one.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator, Iterator
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Any
+
+from pydantic_ai.messages import ModelMessage, ModelResponse, ModelResponseStreamEvent
+from pydantic_ai.models import KnownModelName, Model, ModelRequestParameters, StreamedResponse, infer_model
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+
+if TYPE_CHECKING:
+    from pydantic_ai import RunContext
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass(frozen=True, slots=True)
+class SLO:
+    """Latency / error objective of an endpoint, over a rolling window of `window` seconds."""
+
+    ttft: float = 2.0
+    percentile: float = 0.95
+    error_rate: float = 0.2
+    # requests in the window before it is judged
+    min_requests: int = 10
+    window: float = 60.0
+    # seconds an open breaker waits before probing the endpoint again
+    cooldown: float = 30.0
+
+
+@dataclass(slots=True)
+class BreakerStats:
+    endpoint: str
+    state: str
+    requests: int
+    errors: int
+    ttft: float | None
+    # times the breaker opened
+    opened: int
+
+
+class CircuitBreaker:
+    """Rolling TTFT and error rate of one endpoint, and whether requests may go to it."""
+
+    def __init__(self, endpoint: str, slo: SLO):
+        self.endpoint = endpoint
+        self.slo = slo
+        self.state = CLOSED
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+        # (monotonic time, ttft or None, ok)
+        self._window: deque[tuple[float, float | None, bool]] = deque()
+
+    def allow(self) -> bool:
+        """Whether a request may go to the endpoint now; in half open state only the probe may."""
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.slo.cooldown:
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return self.state != OPEN
+
+    def record(self, ttft: float | None, ok: bool) -> None:
+        """The outcome of a request allowed by `allow`."""
+        now = time.monotonic()
+        if self.state == HALF_OPEN:
+            if ok and (ttft is None or ttft <= self.slo.ttft):
+                logger.info("endpoint %s recovered, closing its circuit breaker", self.endpoint)
+                self.state = CLOSED
+                self._window.clear()
+            else:
+                self._open(now)
+            self._probing = False
+            return
+
+        self._window.append((now, ttft, ok))
+        self._trim(now)
+        if self.state == CLOSED and self._breached():
+            logger.warning("endpoint %s breaches its SLO (%s), opening its circuit breaker",
+                           self.endpoint, self.stats())
+            self._open(now)
+
+    def release(self) -> None:
+        """A request allowed by `allow` ended without an outcome (cancelled)."""
+        self._probing = False
+
+    def stats(self) -> BreakerStats:
+        self._trim(time.monotonic())
+        return BreakerStats(
+            endpoint=self.endpoint,
+            state=self.state,
+            requests=len(self._window),
+            errors=sum(1 for _, _, ok in self._window if not ok),
+            ttft=self._ttft_percentile(),
+            opened=self.opened,
+        )
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self._opened_at = now
+        self.opened += 1
+
+    def _breached(self) -> bool:
+        requests = len(self._window)
+        if requests < self.slo.min_requests:
+            return False
+        errors = sum(1 for _, _, ok in self._window if not ok)
+        if errors / requests > self.slo.error_rate:
+            return True
+        ttft = self._ttft_percentile()
+        return ttft is not None and ttft > self.slo.ttft
+
+    def _ttft_percentile(self) -> float | None:
+        ttfts = sorted(ttft for _, ttft, ok in self._window if ok and ttft is not None)
+        if not ttfts:
+            return None
+        return ttfts[min(int(self.slo.percentile * len(ttfts)), len(ttfts) - 1)]
+
+    def _trim(self, now: float) -> None:
+        while self._window and now - self._window[0][0] > self.slo.window:
+            self._window.popleft()
+
+
+class CircuitBreakers:
+    """One `CircuitBreaker` per endpoint, shared by the routers that use it."""
+
+    def __init__(self, slo: SLO = SLO()):
+        self.slo = slo
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, endpoint: str, slo: SLO | None = None) -> CircuitBreaker:
+        """The endpoint's breaker, created with `slo` (or the default SLO) on first use."""
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = self._breakers[endpoint] = CircuitBreaker(endpoint, slo or self.slo)
+        return breaker
+
+    def stats(self) -> dict[str, BreakerStats]:
+        return {endpoint: breaker.stats() for endpoint, breaker in self._breakers.items()}
+
+
+# shared by the routers without breakers of their own
+default_breakers = CircuitBreakers()
+
+
+@dataclass(slots=True)
+class RouterStats:
+    requests: int = 0
+    # requests sent to a model after the primary, and requests retried after an error
+    fallbacks: int = 0
+    failovers: int = 0
+    # requests per model name
+    models: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass(init=False)
+class ModelRouter(WrapperModel):
+    """Routes each request to the first model of the chain whose endpoint meets its SLO, see the module docstring."""
+
+    def __init__(
+        self,
+        models: list[Model | KnownModelName],
+        slo: SLO | None = None,
+        breakers: CircuitBreakers | None = None,
+    ):
+        chain = [infer_model(model) for model in models]
+        super().__init__(chain[0])
+        self.chain = chain
+        self.breakers = breakers if breakers is not None else default_breakers
+        self.slo = slo
+        self.stats = RouterStats()
+
+    def breaker(self, model: Model) -> CircuitBreaker:
+        return self.breakers.get(endpoint_name(model), self.slo)
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context: RunContext[Any] | None = None,
+    ) -> AsyncGenerator[StreamedResponse, None]:
+        self.stats.requests += 1
+        async with AsyncExitStack() as stack:
+            error = None
+            for model, breaker in self._route():
+                self._count(model, error)
+                outcome = _Outcome(breaker, time.monotonic())
+                try:
+                    response = await stack.enter_async_context(
+                        model.request_stream(messages, model_settings, model_request_parameters, run_context))
+                    break
+                except Exception as exc:
+                    outcome.finish(ok=False)
+                    logger.warning("request to %s failed", endpoint_name(model), exc_info=True)
+                    error = exc
+                except BaseException:
+                    outcome.finish(ok=None)
+                    raise
+            else:
+                raise error
+
+            try:
+                # errors while streaming are recorded by the response, and raised
+                yield _ObservedStreamedResponse(model_request_parameters, response, outcome)
+                outcome.finish(ok=True)
+            finally:
+                outcome.finish(ok=None)
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        self.stats.requests += 1
+        error = None
+        for model, breaker in self._route():
+            self._count(model, error)
+            outcome = _Outcome(breaker, time.monotonic())
+            try:
+                response = await model.request(messages, model_settings, model_request_parameters)
+            except Exception as exc:
+                outcome.finish(ok=False)
+                logger.warning("request to %s failed", endpoint_name(model), exc_info=True)
+                error = exc
+                continue
+            except BaseException:
+                outcome.finish(ok=None)
+                raise
+            # a whole response, its latency is no TTFT: only the outcome counts
+            outcome.finish(ok=True, ttft=None)
+            return response
+        raise error
+
+    def _route(self) -> Iterator[tuple[Model, CircuitBreaker | None]]:
+        """Models to try in order, with the breaker to report to (None: tried although open)."""
+        routed = False
+        for model in self.chain:
+            # asked only when the model is tried, a half open breaker lets its probe through
+            breaker = self.breaker(model)
+            if breaker.allow():
+                routed = True
+                yield model, breaker
+        if not routed:
+            # every endpoint is open, still answer
+            for model in self.chain:
+                yield model, None
+
+    def _count(self, model: Model, error: Exception | None) -> None:
+        if error is not None:
+            self.stats.failovers += 1
+        if model is not self.chain[0]:
+            self.stats.fallbacks += 1
+        self.stats.models[model.model_name] = self.stats.models.get(model.model_name, 0) + 1
+
+
+def endpoint_name(model: Model) -> str:
+    """The endpoint a model's requests go to, the key of its circuit breaker."""
+    return f"{model.system}:{model.base_url or model.model_name}"
+
+
+class _Outcome:
+    """Reports one request to its breaker exactly once."""
+
+    def __init__(self, breaker: CircuitBreaker | None, started: float):
+        self.breaker = breaker
+        self.started = started
+        self.first_event: float | None = None
+        self.done = False
+
+    def first(self) -> None:
+        if self.first_event is None:
+            self.first_event = time.monotonic()
+
+    def finish(self, ok: bool | None, ttft: float | None = ...) -> None:
+        """`ok` None: no outcome (cancelled, or already reported)."""
+        if self.done:
+            return
+        self.done = True
+        if self.breaker is None:
+            return
+        if ok is None:
+            self.breaker.release()
+            return
+        if ttft is ...:
+            ttft = self.first_event - self.started if self.first_event is not None else None
+        self.breaker.record(ttft, ok)
+
+
+class _ObservedStreamedResponse(StreamedResponse):
+    """A response that notes its first event for the breaker, otherwise the wrapped response."""
+
+    def __init__(self, model_request_parameters: ModelRequestParameters, response: StreamedResponse,
+                 outcome: _Outcome):
+        super().__init__(model_request_parameters)
+        self.response = response
+        self.outcome = outcome
+
+    def __aiter__(self) -> AsyncIterator[ModelResponseStreamEvent]:
+        if self._event_iterator is None:
+            self._event_iterator = self._get_event_iterator()
+        return self._event_iterator
+
+    async def _get_event_iterator(self) -> AsyncIterator[ModelResponseStreamEvent]:
+        try:
+            async for event in self.response:
+                self.outcome.first()
+                self.final_result_event = self.response.final_result_event
+                self._usage = self.response._usage
+                yield event
+        except Exception:
+            if not self.response.cancelled:
+                self.outcome.finish(ok=False)
+            raise
+        self._usage = self.response._usage
+        # an empty response answered too
+        self.outcome.first()
+
+    async def close_stream(self) -> None:
+        await self.response.cancel()
+
+    def get(self) -> ModelResponse:
+        return self.response.get()
+
+    @property
+    def model_name(self) -> str:
+        return self.response.model_name
+
+    @property
+    def provider_name(self) -> str | None:
+        return self.response.provider_name
+
+    @property
+    def provider_url(self) -> str | None:
+        return self.response.provider_url
+
+    @property
+    def timestamp(self) -> datetime:
+        return self.response.timestamp
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled or self.response.cancelled
@@ -1,2 +1,5 @@
 from .schema import Message
-from .schema import Memory
\ No newline at end of file
+from .schema import Memory
+from .schema import CompactMessage
+from .store import SegmentLogStore, TranscriptReader, TranscriptStore
+from .window import HistoryPolicy, HistoryWindowStats
\ No newline at end of file
@@ -1,5 +1,8 @@
 from __future__ import annotations
-from pydantic import BaseModel, Field
+import sys
+import time
+from dataclasses import dataclass, field
+from pydantic import BaseModel, Field, PrivateAttr, field_serializer
 from typing import Literal
 from datetime import datetime
 from voice_agent_flow.agents.message_adaptor import pmsg
@@ -38,6 +41,24 @@ class Message(BaseModel):
                     tool_call_id:str="fake"):
         return ToolReturnMessage(tool_name=tool_name, content=content, tool_call_id=tool_call_id)
     
+    @classmethod
+    def from_record(cls, data: dict):
+        """Rebuild a message from its `model_dump()` dict, keeping the original timestamp."""
+        data = dict(data)
+        if isinstance(data.get("timestamp"), (int, float)):
+            data["timestamp"] = datetime.fromtimestamp(data["timestamp"]).isoformat()
+        
+        role = data.get("role")
+        if role == "user":
+            return UserMessage(**data)
+        if role == "system":
+            return SystemMessage(**data)
+        if role == "tool":
+            return ToolReturnMessage(**data)
+        if role == "assistant":
+            return AssistantMessage(**data) if "content" in data else ToolRequestMessage(**data)
+        raise ValueError(f"Unknown role: {role}")
+    
 class SystemMessage(Message):
     role: str = Field("system")
     content: str = Field(...)
@@ -62,34 +83,196 @@ class ToolReturnMessage(Message):
     content:str = Field(...)
     tool_call_id:str = Field(...)
 
+
+@dataclass(slots=True)
+class CompactMessage:
+    """
+    Slotted message record used by `Memory(compact=True)`.
+    
+    Same fields as the `Message` subclasses, but without per-instance pydantic overhead:
+    the timestamp is epoch seconds and role/tool names are interned strings.
+    """
+    role: str
+    content: str | None = None
+    tool_name: str | None = None
+    args: str | None = None
+    tool_call_id: str | None = None
+    timestamp: float = field(default_factory=time.time)
+    
+    @classmethod
+    def system(cls, content:str):
+        return cls("system", content=content)
+    
+    @classmethod
+    def user(cls, content:str):
+        return cls("user", content=content)
+    
+    @classmethod
+    def assistant(cls, content:str):
+        return cls("assistant", content=content)
+    
+    @classmethod
+    def tool_request(cls, tool_name:str, args:str, tool_call_id:str="fake"):
+        return cls("assistant", tool_name=sys.intern(tool_name), args=args, tool_call_id=tool_call_id)
+    
+    @classmethod
+    def tool_return(cls, tool_name:str, content:str, tool_call_id:str="fake"):
+        return cls("tool", content=content, tool_name=sys.intern(tool_name), tool_call_id=tool_call_id)
+    
+    @classmethod
+    def from_record(cls, data: dict) -> CompactMessage:
+        """Rebuild a record from a `model_dump()` dict of either message representation."""
+        timestamp = data.get("timestamp")
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp).timestamp()
+        tool_name = data.get("tool_name")
+        return cls(
+            role=sys.intern(data["role"]),
+            content=data.get("content"),
+            tool_name=sys.intern(tool_name) if tool_name is not None else None,
+            args=data.get("args"),
+            tool_call_id=data.get("tool_call_id"),
+            timestamp=timestamp if timestamp is not None else time.time(),
+        )
+    
+    @classmethod
+    def from_message(cls, message: Message) -> CompactMessage:
+        return cls.from_record(message.model_dump())
+    
+    def model_dump(self) -> dict:
+        """Same dict layout as `Message.model_dump()`, unset fields left out."""
+        data = {"role": self.role, "timestamp": self.timestamp}
+        for key in ("content", "tool_name", "args", "tool_call_id"):
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = value
+        return data
+
+
+def _dump(msg: Any) -> dict:
+    return msg if isinstance(msg, dict) else msg.model_dump()
+
+def _field(msg: Any, key: str) -> Any:
+    return msg.get(key) if isinstance(msg, dict) else getattr(msg, key, None)
+
+def _text(msg: Any) -> str:
+    """Text of a message that ends up in the prompt: content, tool name and tool args."""
+    return "".join(_field(msg, key) or "" for key in ("content", "tool_name", "args"))
+
 class Memory(BaseModel):
     messages: list[Any] = Field(default_factory=list)
     
-    def add(self, message: Message):
+    """store messages as `CompactMessage` records instead of pydantic `Message` objects"""
+    compact: bool = Field(False, exclude=True)
+    
+    # converted pydantic_ai history, grown incrementally by `to_pydantic`
+    _history: list = PrivateAttr(default_factory=list)
+    _history_source: list | None = PrivateAttr(default=None)
+    _history_len: int = PrivateAttr(default=0)
+    _history_start: int = PrivateAttr(default=0)
+    
+    # per-message token counts, grown incrementally by `token_counts`
+    _token_counts: list = PrivateAttr(default_factory=list)
+    _token_source: list | None = PrivateAttr(default=None)
+    _token_counter: Any = PrivateAttr(default=None)
+    
+    # durable transcript backend, see `voice_agent_flow.memory.store`
+    _store: Any = PrivateAttr(default=None)
+    _call_id: str | None = PrivateAttr(default=None)
+    
+    @property
+    def _factory(self):
+        return CompactMessage if self.compact else Message
+    
+    def add(self, message: Message | CompactMessage):
+        if self.compact and not isinstance(message, CompactMessage):
+            message = CompactMessage.from_message(message)
         self.messages.append(message)
+        if self._store is not None:
+            self._store.append(self._call_id, _dump(message))
+            
+    def attach_store(self, store, call_id: str, backfill: bool = False):
+        """Mirror every message added from now on to a `TranscriptStore` under `call_id`.
+        
+        With `backfill=True` the messages already in memory are written first.
+        """
+        self._store = store
+        self._call_id = call_id
+        if backfill:
+            for message in self.messages:
+                store.append(call_id, _dump(message))
         
     def add_user(self, content:str):
-        self.add(Message.user(content))
+        self.add(self._factory.user(content))
         
     def add_assistant(self, content:str):
-        self.add(Message.assistant(content))
+        self.add(self._factory.assistant(content))
         
     def add_system(self, content:str):
-        self.add(Message.system(content))
+        self.add(self._factory.system(content))
         
     def add_tool_request(self, tool_name:str, args:str, tool_call_id:str="fake"):
-        self.add(Message.tool_request(tool_name, args, tool_call_id))
+        self.add(self._factory.tool_request(tool_name, args, tool_call_id))
         
     def add_tool_return(self, tool_name:str, content:str, tool_call_id:str="fake"):
-        self.add(Message.tool_return(tool_name, content, tool_call_id))
+        self.add(self._factory.tool_return(tool_name, content, tool_call_id))
+        
+    @field_serializer("messages")
+    def _serialize_messages(self, messages: list[Any]) -> list[dict]:
+        return [_dump(msg) for msg in messages]
+        
+    def to_pydantic(self, start: int = 0):
+        """Return the pydantic_ai history of `messages[start:]`, converting only messages added since the last call.
         
-    def to_pydantic(self):
-        return pmsg.to_history(self.model_dump()['messages'])
+        The converted history is rebuilt from scratch only when `messages` was replaced 
+        or truncated, or `start` moved; in-place edits of already converted messages are not detected.
+        """
+        messages = self.messages
+        if (messages is not self._history_source 
+            or len(messages) < self._history_len 
+            or start != self._history_start):
+            self._history = []
+            self._history_source = messages
+            self._history_start = start
+            self._history_len = start
+        
+        if len(messages) > self._history_len:
+            pmsg.extend_history(
+                self._history, 
+                [_dump(msg) for msg in messages[self._history_len:]]
+            )
+            self._history_len = len(messages)
+            
+        return list(self._history)
+    
+    def token_counts(self, counter) -> list[int]:
+        """Token count of every message, counting only messages added since the last call with the same counter."""
+        messages = self.messages
+        if (messages is not self._token_source 
+            or len(messages) < len(self._token_counts) 
+            or counter is not self._token_counter):
+            self._token_counts = []
+            self._token_source = messages
+            self._token_counter = counter
+            
+        counts = self._token_counts
+        for msg in messages[len(counts):]:
+            counts.append(counter(_text(msg)))
+        return counts
+    
+    @classmethod
+    def from_records(cls, records, compact: bool = False):
+        """Rebuild a Memory from `model_dump()` message dicts, keeping their timestamps."""
+        factory = CompactMessage if compact else Message
+        return cls(
+            messages=[factory.from_record(record) for record in records], 
+            compact=compact
+        )
     
     @classmethod
-    def from_dict(cls, message_history: dict):
+    def from_dict(cls, message_history: dict, compact: bool = False):
         """Convert openai standard messasge history dict to Memory instance."""
-        memory = cls()
+        memory = cls(compact=compact)
         for msg in message_history:
             role = msg.get("role")
             if role == "user":
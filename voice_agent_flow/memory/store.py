@@ -0,0 +1,349 @@
+"""
+Durable, append-only transcript storage for `Memory`.
+
+Layout of a store directory
+---------------------------
+    segment-000001.log   records: <payload_len:u32><crc32:u32><call_no:u32><json message>
+    segment-000002.log   a new segment is started once the current one exceeds `segment_bytes`
+    calls.log            entries: <call_no:u32><call_id_len:u16><call_id>, one per call
+    index.log            fixed-size entries: <call_no:u32><segment:u32><offset:u64><length:u32>
+
+Writes never block the asyncio loop: `append` only puts the message on a queue, a
+background thread encodes, writes and fsyncs in batches (every `fsync_batch` records
+or `fsync_interval` seconds, whichever comes first). The thread still takes its share of
+the GIL to encode the records, so under heavy append load the loop runs a little slower.
+
+Opening a store after a crash cuts the torn tail entries off the files (an incomplete
+calls entry, records failing their checksum in the last segment, index entries of
+unknown calls or cut records), so new entries are appended on an entry boundary.
+
+`TranscriptReader` memory-maps the segments and uses the per-call offset index to
+decode only the records of the requested call.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Iterator
+
+from voice_agent_flow.memory.schema import Memory
+
+RECORD_HEADER = struct.Struct("<III")
+CALL_ENTRY = struct.Struct("<IH")
+INDEX_ENTRY = struct.Struct("<IIQI")
+
+SEGMENT_TEMPLATE = "segment-{:06d}.log"
+CALLS_FILE = "calls.log"
+INDEX_FILE = "index.log"
+
+_STOP = object()
+
+
+class TranscriptStore:
+    """Backend interface used by `Memory.attach_store`."""
+
+    def append(self, call_id: str, message: dict) -> None:
+        raise NotImplementedError
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Block until everything appended so far is written and fsynced."""
+
+    def close(self) -> None:
+        """Flush and release the backend."""
+
+
+class SegmentLogStore(TranscriptStore):
+
+    def __init__(
+        self,
+        directory: str | Path,
+        segment_bytes: int = 64 * 1024 * 1024,
+        fsync_batch: int = 256,
+        fsync_interval: float = 0.05,
+        logger: logging.Logger = None,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.logger = logger if logger else logging.getLogger(self.__class__.__name__)
+
+        segments = _list_segments(self.directory)
+        self._segment_id = segments[-1] if segments else 1
+        self._call_numbers = {call_id: no for no, call_id in self._recover().items()}
+        self._segment = open(self.directory / SEGMENT_TEMPLATE.format(self._segment_id), "ab")
+        self._index = open(self.directory / INDEX_FILE, "ab")
+        self._calls = open(self.directory / CALLS_FILE, "ab")
+
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._writer, name="SegmentLogStore", daemon=True)
+        self._thread.start()
+
+    def append(self, call_id: str, message: dict) -> None:
+        """Queue one message of `call_id` for writing; never blocks on disk I/O."""
+        if self._closed:
+            raise RuntimeError("SegmentLogStore is closed.")
+        self._queue.put((call_id, message))
+
+    def flush(self, timeout: float | None = None) -> None:
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    async def aflush(self) -> None:
+        """`flush` for async callers, waits in a worker thread."""
+        await asyncio.to_thread(self.flush)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._segment.close()
+        self._index.close()
+        self._calls.close()
+
+    def _writer(self):
+        pending = 0
+        last_sync = time.monotonic()
+        waiters: list[threading.Event] = []
+        stop = False
+
+        while not stop:
+            timeout = self.fsync_interval if pending else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            # drain whatever else is already queued so a burst becomes one write/fsync
+            while item is not None:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    try:
+                        self._write(*item)
+                        pending += 1
+                    except Exception:
+                        self.logger.exception("Failed to write transcript record.")
+                if pending >= self.fsync_batch:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            now = time.monotonic()
+            if pending and (stop or waiters or pending >= self.fsync_batch
+                            or now - last_sync >= self.fsync_interval):
+                self._sync()
+                pending = 0
+                last_sync = now
+
+            for waiter in waiters:
+                waiter.set()
+            waiters.clear()
+
+    def _recover(self) -> dict[int, str]:
+        """Cut the torn tail entries a crash left in the files, so new entries start on an entry boundary.
+        
+        Returns the calls of the truncated calls.log.
+        """
+        calls, calls_end = _read_calls(self.directory, 0)
+        _truncate(self.directory / CALLS_FILE, calls_end)
+
+        segment_path = self.directory / SEGMENT_TEMPLATE.format(self._segment_id)
+        segment_end = _valid_records_end(segment_path)
+        _truncate(segment_path, segment_end)
+
+        # the index is written last, but buffered entries may reach the disk before the
+        # records they point at: drop tail entries of unknown calls or cut records
+        path = self.directory / INDEX_FILE
+        if path.exists():
+            size = path.stat().st_size
+            end = size - size % INDEX_ENTRY.size
+            with open(path, "rb") as f:
+                while end > 0:
+                    f.seek(end - INDEX_ENTRY.size)
+                    call_no, segment, offset, length = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))
+                    if (call_no in calls and segment <= self._segment_id
+                            and (segment < self._segment_id or offset + length <= segment_end)):
+                        break
+                    end -= INDEX_ENTRY.size
+            _truncate(path, end)
+        return calls
+
+    def _write(self, call_id: str, message: dict):
+        call_no = self._call_numbers.get(call_id)
+        if call_no is None:
+            call_no = self._call_numbers[call_id] = len(self._call_numbers)
+            key = call_id.encode("utf-8")
+            self._calls.write(CALL_ENTRY.pack(call_no, len(key)) + key)
+
+        payload = json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        record = RECORD_HEADER.pack(len(payload), zlib.crc32(payload), call_no) + payload
+
+        if self._segment.tell() > 0 and self._segment.tell() + len(record) > self.segment_bytes:
+            self._sync()
+            self._segment.close()
+            self._segment_id += 1
+            self._segment = open(self.directory / SEGMENT_TEMPLATE.format(self._segment_id), "ab")
+
+        offset = self._segment.tell()
+        self._segment.write(record)
+        self._index.write(INDEX_ENTRY.pack(call_no, self._segment_id, offset, len(record)))
+
+    def _sync(self):
+        # data before index, so an index entry never points at unsynced data
+        for f in (self._segment, self._calls, self._index):
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class TranscriptReader:
+    """Random access to the calls of a `SegmentLogStore` directory."""
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self._offsets: dict[str, list[tuple[int, int, int]]] = {}
+        self._call_ids: dict[int, str] = {}
+        self._calls_pos = 0
+        self._index_pos = 0
+        self._maps: dict[int, tuple[int, mmap.mmap]] = {}
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Pick up calls and index entries written since the last refresh."""
+        call_ids, self._calls_pos = _read_calls(self.directory, self._calls_pos)
+        self._call_ids.update(call_ids)
+
+        path = self.directory / INDEX_FILE
+        if not path.exists():
+            return
+        with open(path, "rb") as f:
+            f.seek(self._index_pos)
+            data = f.read()
+
+        # a torn tail entry is left for a later refresh
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        consumed = 0
+        offsets = self._offsets
+        for call_no, segment, offset, length in INDEX_ENTRY.iter_unpack(memoryview(data)[:usable]):
+            call_id = self._call_ids.get(call_no)
+            if call_id is None:
+                # calls.log not synced this far yet
+                break
+            offsets.setdefault(call_id, []).append((segment, offset, length))
+            consumed += INDEX_ENTRY.size
+        self._index_pos += consumed
+
+    def calls(self) -> list[str]:
+        return list(self._offsets)
+
+    def iter_messages(self, call_id: str) -> Iterator[dict]:
+        """Decode the messages of one call in append order, skipping torn or corrupt records."""
+        for segment, offset, length in self._offsets.get(call_id, ()):
+            buf = self._segment_map(segment, offset + length)
+            if buf is None:
+                continue
+            payload_len, crc, _ = RECORD_HEADER.unpack_from(buf, offset)
+            start = offset + RECORD_HEADER.size
+            payload = buf[start:start + payload_len]
+            if len(payload) != payload_len or zlib.crc32(payload) != crc:
+                continue
+            yield json.loads(payload)
+
+    def load_memory(self, call_id: str, compact: bool = False) -> Memory:
+        """Rebuild the `Memory` of a call, timestamps included."""
+        return Memory.from_records(self.iter_messages(call_id), compact=compact)
+
+    def close(self) -> None:
+        for _, mapped in self._maps.values():
+            mapped.close()
+        self._maps.clear()
+
+    def _segment_map(self, segment: int, required: int) -> mmap.mmap | None:
+        cached = self._maps.get(segment)
+        if cached is not None and cached[0] >= required:
+            return cached[1]
+
+        path = self.directory / SEGMENT_TEMPLATE.format(segment)
+        if not path.exists() or path.stat().st_size < required:
+            return None
+        if cached is not None:
+            cached[1].close()
+
+        # segments only grow, remap when a record lies past the current mapping
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[segment] = (len(mapped), mapped)
+        return mapped
+
+
+def _read_calls(directory: Path, pos: int) -> tuple[dict[int, str], int]:
+    """Read `calls.log` from byte `pos`, returning new call numbers and the position reached."""
+    path = directory / CALLS_FILE
+    if not path.exists():
+        return {}, pos
+    with open(path, "rb") as f:
+        f.seek(pos)
+        data = f.read()
+
+    calls = {}
+    cursor = 0
+    while cursor + CALL_ENTRY.size <= len(data):
+        call_no, key_len = CALL_ENTRY.unpack_from(data, cursor)
+        end = cursor + CALL_ENTRY.size + key_len
+        if end > len(data):
+            break
+        calls[call_no] = data[cursor + CALL_ENTRY.size:end].decode("utf-8")
+        cursor = end
+    return calls, pos + cursor
+
+
+def _valid_records_end(path: Path) -> int:
+    """Byte offset after the last whole, checksum-valid record of a segment."""
+    if not path.exists():
+        return 0
+    with open(path, "rb") as f:
+        data = f.read()
+    cursor = 0
+    while cursor + RECORD_HEADER.size <= len(data):
+        payload_len, crc, _ = RECORD_HEADER.unpack_from(data, cursor)
+        start = cursor + RECORD_HEADER.size
+        payload = data[start:start + payload_len]
+        if len(payload) != payload_len or zlib.crc32(payload) != crc:
+            break
+        cursor = start + payload_len
+    return cursor
+
+
+def _truncate(path: Path, size: int) -> None:
+    if path.exists() and path.stat().st_size > size:
+        with open(path, "r+b") as f:
+            f.truncate(size)
+            os.fsync(f.fileno())
+
+
+def _list_segments(directory: Path) -> list[int]:
+    ids = []
+    for path in directory.glob("segment-*.log"):
+        try:
+            ids.append(int(path.stem.split("-")[1]))
+        except ValueError:
+            continue
+    return sorted(ids)
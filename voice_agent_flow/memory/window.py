@@ -0,0 +1,153 @@
+"""
+Token-budgeted history window.
+
+Long calls make every prompt longer. A `HistoryPolicy` keeps the history sent to an
+agent under a token budget by dropping (or summarizing) the oldest turns:
+
+- the window always starts at a user message, so turns are kept whole,
+- a cut never separates a tool request from its tool return,
+- leading system messages are always kept,
+- the latest turn is always kept, even if it alone exceeds the budget.
+
+Token counts are cached per message on the `Memory`, so each turn only counts the
+messages added since the previous turn.
+"""
+from __future__ import annotations
+
+import inspect
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from voice_agent_flow.agents.message_adaptor import pmsg
+from voice_agent_flow.memory.schema import Memory, _dump, _field
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate: one token per CJK character, one per four other characters."""
+    cjk = sum(1 for ch in text if ch >= "⺀")
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+@dataclass
+class HistoryWindowStats:
+    """What the history window did for one agent run."""
+
+    agent_name: str
+    budget: int | None
+    total_tokens: int
+    sent_tokens: int
+    dropped_messages: int = 0
+    summarized: bool = False
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.total_tokens - self.sent_tokens
+
+
+@dataclass
+class HistoryPolicy:
+    """
+    Per-agent token budget for the history sent to the model.
+
+    Attributes:
+    - max_tokens: default budget, None means unbounded
+    - agent_budgets: budget overrides keyed by agent name
+    - token_counter: counts tokens of one message text, results are cached per message
+    - summarizer: optional (sync or async) callable that turns the dropped messages
+      (as dicts) into a short summary, sent as a system message in front of the window
+    """
+
+    max_tokens: int | None = None
+    agent_budgets: dict[str, int] = field(default_factory=dict)
+    token_counter: Callable[[str], int] = estimate_tokens
+    summarizer: Callable[[list[dict]], str | Awaitable[str]] | None = None
+
+    def budget_for(self, agent_name: str) -> int | None:
+        return self.agent_budgets.get(agent_name, self.max_tokens)
+
+    async def apply(
+        self,
+        memory: Memory,
+        agent_name: str,
+        summaries: dict[int, str] | None = None,
+    ) -> tuple[list, HistoryWindowStats]:
+        """
+        Return the pydantic_ai history to send to `agent_name` and the window stats.
+
+        `summaries` caches summaries by cut position across turns of one session.
+        """
+        budget = self.budget_for(agent_name)
+        counts = memory.token_counts(self.token_counter)
+        total = sum(counts)
+        if budget is None or total <= budget:
+            return memory.to_pydantic(), HistoryWindowStats(agent_name, budget, total, total)
+
+        messages = memory.messages
+        pinned = 0
+        while pinned < len(messages) and _field(messages[pinned], "role") == "system":
+            pinned += 1
+        pinned_tokens = sum(counts[:pinned])
+
+        cut = _find_cut(messages, counts, pinned, budget - pinned_tokens)
+        history = memory.to_pydantic(start=cut)
+        sent = pinned_tokens + sum(counts[cut:])
+
+        head = [_dump(msg) for msg in messages[:pinned]]
+        summary = None
+        if self.summarizer is not None and cut > pinned:
+            summary = await self._summarize(messages[pinned:cut], cut, summaries)
+            head.append({"role": "system", "content": summary})
+            sent += self.token_counter(summary)
+        if head:
+            history = pmsg.to_history(head) + history
+
+        return history, HistoryWindowStats(
+            agent_name=agent_name,
+            budget=budget,
+            total_tokens=total,
+            sent_tokens=sent,
+            dropped_messages=cut - pinned,
+            summarized=summary is not None,
+        )
+
+    async def _summarize(self, dropped: list[Any], cut: int, summaries: dict[int, str] | None) -> str:
+        if summaries is not None and cut in summaries:
+            return summaries[cut]
+        summary = self.summarizer([_dump(msg) for msg in dropped])
+        if inspect.isawaitable(summary):
+            summary = await summary
+        if summaries is not None:
+            summaries[cut] = summary
+        return summary
+
+
+def _find_cut(messages: list[Any], counts: list[int], pinned: int, budget: int) -> int:
+    """Earliest turn start whose suffix fits the budget, or the latest turn start if none fits."""
+    allowed = []
+    open_calls: dict[str, int] = {}
+    for i in range(pinned, len(messages)):
+        msg = messages[i]
+        role = _field(msg, "role")
+        if role == "user" and not open_calls:
+            allowed.append(i)
+        if role == "assistant" and _field(msg, "tool_name") is not None:
+            call_id = _field(msg, "tool_call_id")
+            open_calls[call_id] = open_calls.get(call_id, 0) + 1
+        elif role == "tool":
+            call_id = _field(msg, "tool_call_id")
+            if open_calls.get(call_id, 0) > 1:
+                open_calls[call_id] -= 1
+            else:
+                open_calls.pop(call_id, None)
+
+    if not allowed:
+        return pinned
+
+    suffix = sum(counts[allowed[-1]:])
+    cut = allowed[-1]
+    for i in range(len(allowed) - 2, -1, -1):
+        suffix += sum(counts[allowed[i]:allowed[i + 1]])
+        if suffix > budget:
+            break
+        cut = allowed[i]
+    return cut
@@ -1,3 +1,4 @@
+import struct
 from dataclasses import dataclass
 
 INVALID_INPUT_RESPONSE = """The provided phone number contains non-numeric characters. 
@@ -106,6 +107,14 @@ class PhoneNumIntegrityChecker:
         
         return LONG_NUMBER_RESPONSE.format(phone_num=phone_num)
     
+    def dump_state(self) -> bytes:
+        """The per-call state (call count and partial number), for `register_tool_state`."""
+        return struct.pack("<I", self.call_count) + self.current_phone_num_part.encode()
+    
+    def load_state(self, data: bytes) -> None:
+        (self.call_count,) = struct.unpack_from("<I", data)
+        self.current_phone_num_part = bytes(data[4:]).decode()
+    
    
 def create_phone_num_check_tool(
     max_call_count:int = 5, 
@@ -125,6 +134,9 @@ def create_phone_num_check_tool(
 		return checker.check(account_name)
 
 	check_wechat_account_validity.__doc__ = TOOL_PROMPT
+	# kept in `AgentSession.snapshot()` once its type is registered (see car_loan);
+	# a `tool_wrapper` returning a new function should use `functools.wraps`
+	check_wechat_account_validity.tool_state = checker
 
 	if tool_wrapper:
 		return tool_wrapper(check_wechat_account_validity)